@@ -5,24 +5,25 @@ API 工具函数
 作者：项目开发团队
 """
 
+import json
+import base64
 import logging
 from flask import jsonify, request
 from functools import wraps
 from flask_login import current_user
-from db_manager import get_duckdb_connection
+from audit_logger import audit_logger
 
 logger = logging.getLogger(__name__)
 
 def add_audit_log(action, status, details=""):
+    """
+    记录一条审计日志。请求上下文（用户名、IP、时间）在调用时立即获取，
+    写入 DuckDB 由 audit_logger 的后台线程批量完成，不阻塞当前请求。
+    """
     try:
         username = current_user.username if current_user.is_authenticated else 'anonymous'
         ip_address = request.remote_addr
-        conn = get_duckdb_connection()
-        conn.execute(
-            "INSERT INTO audit_log (username, ip_address, action, status, details) VALUES (?, ?, ?, ?, ?)",
-            (username, ip_address, action, status, details)
-        )
-        conn.close()
+        audit_logger.log(username, ip_address, action, status, details)
     except Exception as e:
         logger.error(f"Failed to add audit log: {e}")
 
@@ -153,4 +154,38 @@ def format_pagination_response(paginated_data, items_key='items'):
             'has_next': paginated_data.has_next,
             'has_prev': paginated_data.has_prev
         }
-    }
\ No newline at end of file
+    }
+
+def encode_cursor(values):
+    """
+    将键集分页的位置（最后一行的排序键值列表）编码为不透明的游标字符串
+
+    参数:
+        values (list): 可 JSON 序列化的排序键值
+
+    返回:
+        str: URL 安全的 base64 字符串
+    """
+    raw = json.dumps(values, separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, length=None):
+    """
+    解码 encode_cursor 生成的游标
+
+    参数:
+        cursor (str): 游标字符串
+        length (int): 期望的键值个数，不符时视为无效
+
+    返回:
+        list: 排序键值；游标无效时抛出 ValueError
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(values, list) or (length is not None and len(values) != length):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return values
@@ -17,6 +17,8 @@ from app_init import init_database_and_admin, print_startup_completion
 from process_manager import start_process, stop_process, restart_process # 添加 restart_process
 from api_utils import error_response, success_response, add_audit_log
 from db_manager import get_process_logs, get_historical_processes_from_logs
+from sqlite_tuning import SqliteMaintenance # 导入即为所有 SQLite 连接注册 PRAGMA 配置
+from point_search import include_object, rebuild_point_search_command
 
 def create_app():
     """创建并配置 Flask 应用实例"""
@@ -32,7 +34,12 @@ def create_app():
 
     # --- 扩展初始化 ---
     db.init_app(app)
-    Migrate(app, db)
+    Migrate(app, db, include_object=include_object)
+    app.cli.add_command(rebuild_point_search_command)
+
+    # 定期执行 SQLite WAL 检查点和 optimize；gunicorn preload_app 模式下只在主进程中运行
+    app.sqlite_maintenance = SqliteMaintenance(db_path)
+    app.sqlite_maintenance.start()
     
     login_manager = LoginManager()
     login_manager.init_app(app)
@@ -57,6 +64,8 @@ def create_app():
     from routes.telegraf_api import telegraf_api_bp # <-- 新增导入
     from routes.system_api import system_api_bp
     from routes.process_api import process_api_bp
+    from routes.logs_api import logs_api_bp
+    from routes.export_api import export_api_bp
 
     app.register_blueprint(main_bp)
     app.register_blueprint(auth_bp)
@@ -71,6 +80,8 @@ def create_app():
     app.register_blueprint(telegraf_api_bp) # <-- 新增注册
     app.register_blueprint(system_api_bp)
     app.register_blueprint(process_api_bp)
+    app.register_blueprint(logs_api_bp)
+    app.register_blueprint(export_api_bp)
 
     # --- 初始化数据库和管理员 ---
     with app.app_context():
@@ -158,7 +158,7 @@ access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s"
 # 进程命名
 proc_name = "telegraf_manager"
 
-# 预加载应用
+# 预加载应用：create_app 只在主进程执行一次，SQLite 定期维护线程也只在主进程中运行
 preload_app = True
 
 # PID 文件
@@ -3,58 +3,142 @@
 
 import sys
 import os
-from datetime import datetime
-from db_manager import get_duckdb_connection, insert_log_entry
+import glob
+import time
+import shutil
+import tempfile
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-def archive_log_file(log_file_path):
+import duckdb
+
+from db_manager import get_duckdb_connection, bulk_load_log_file, ingest_log_rows, file_mtime_utc, LOG_PARSE_SELECT
+
+def parse_log_file_metadata(log_file_path):
     """
-    读取指定的日志文件，将其内容存入 DuckDB，然后清空该文件。
+    从文件名中解析元数据，返回 (pid, process_name, config_file, log_type)。
+    文件名格式: telegraf_{config_file_name}_{pid}_{timestamp}.log
     """
-    if not os.path.exists(log_file_path):
-        print(f"Error: Log file not found: {log_file_path}")
-        return
-
-    # 从文件名中解析元数据
-    # 文件名格式: telegraf_{config_file_name}_{pid}_{timestamp}.log
     try:
         parts = os.path.basename(log_file_path).removesuffix('.log').split('_')
         config_file_name = parts[1]
         pid = int(parts[2])
         process_name = f"archived_{config_file_name}_{pid}"
         config_file = "unknown" # 无法从文件名中得知确切的配置文件路径
-        log_type = "archived"
     except (IndexError, ValueError) as e:
         print(f"Error: Could not parse metadata from log file name: {os.path.basename(log_file_path)} - {e}")
         # 使用默认值
         pid = None
         process_name = "archived_log"
         config_file = "unknown"
-        log_type = "archived"
+    return pid, process_name, config_file, "archived"
+
+def archive_log_file(log_file_path):
+    """
+    读取指定的日志文件，将其内容一次性批量存入 DuckDB，然后删除该文件。
+    返回写入的行数，失败时返回 None。
+    """
+    if not os.path.exists(log_file_path):
+        print(f"Error: Log file not found: {log_file_path}")
+        return None
+
+    pid, process_name, config_file, log_type = parse_log_file_metadata(log_file_path)
 
     conn = None
     try:
         conn = get_duckdb_connection()
-        with open(log_file_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                message = line.strip()
-                if message:
-                    insert_log_entry(conn, datetime.now(), pid, process_name, config_file, log_type, message)
-        
+        rows = bulk_load_log_file(conn, log_file_path, pid, process_name, config_file, log_type)
+
         # 删除文件
         os.remove(log_file_path)
-            
-        print(f"Successfully archived and deleted log file: {log_file_path}")
+
+        print(f"Successfully archived and deleted log file: {log_file_path} ({rows} rows)")
+        return rows
 
     except Exception as e:
         print(f"Error archiving log file {log_file_path}: {e}")
+        return None
     finally:
         if conn:
             conn.close()
 
+def _stage_log_file(log_file_path, staging_dir):
+    """
+    工作进程：用内存 DuckDB 解析单个日志文件并写成 Parquet 暂存文件。
+    DuckDB 文件同一时间只允许一个写入者，因此解析并行进行，写库由主进程统一完成。
+    """
+    pid, process_name, config_file, log_type = parse_log_file_metadata(log_file_path)
+    fallback_timestamp = file_mtime_utc(log_file_path)
+    staged_path = os.path.join(staging_dir, os.path.basename(log_file_path) + '.parquet')
+
+    conn = duckdb.connect()
+    try:
+        conn.execute(
+            f"COPY ({LOG_PARSE_SELECT}) TO '{staged_path}' (FORMAT parquet)",
+            [log_file_path, fallback_timestamp, pid, process_name, config_file, log_type]
+        )
+        rows = conn.execute("SELECT count(*) FROM read_parquet(?)", [staged_path]).fetchone()[0]
+    finally:
+        conn.close()
+    return log_file_path, staged_path, rows
+
+def archive_log_directory(log_dir, pattern='*.log', workers=None):
+    """
+    并行归档目录下所有匹配的日志文件：多个工作进程并行解析，主进程用一条语句写入 DuckDB。
+    返回汇总信息，包括总行数和每秒行数。
+    """
+    log_files = sorted(glob.glob(os.path.join(log_dir, pattern)))
+    if not log_files:
+        print(f"No log files matching {pattern} in {log_dir}")
+        return {'files': 0, 'rows': 0, 'seconds': 0.0, 'rows_per_sec': 0.0}
+
+    started = time.perf_counter()
+    staging_dir = tempfile.mkdtemp(prefix='telegraf_archive_')
+    staged = []
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_stage_log_file, path, staging_dir) for path in log_files]
+            for future in as_completed(futures):
+                try:
+                    staged.append(future.result())
+                except Exception as e:
+                    print(f"Error parsing log file: {e}")
+
+        if not staged:
+            return {'files': 0, 'rows': 0, 'seconds': time.perf_counter() - started, 'rows_per_sec': 0.0}
+
+        conn = get_duckdb_connection()
+        try:
+            # 各暂存文件的 line_no 都从 1 开始，按文件名和行号确定顺序
+            ingest_log_rows(conn, "SELECT * FROM read_parquet(?, filename=true)",
+                            [[staged_path for _, staged_path, _ in staged]], close_runs=True, order_by='filename, line_no')
+        finally:
+            conn.close()
+
+        for log_file_path, _, _ in staged:
+            os.remove(log_file_path)
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+    seconds = time.perf_counter() - started
+    total_rows = sum(rows for _, _, rows in staged)
+    rows_per_sec = total_rows / seconds if seconds > 0 else 0.0
+    print(f"Archived {len(staged)} files, {total_rows} rows in {seconds:.2f}s ({rows_per_sec:,.0f} rows/sec)")
+    return {'files': len(staged), 'rows': total_rows, 'seconds': seconds, 'rows_per_sec': rows_per_sec}
+
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python archive_logs.py <log_file_path>")
+    parser = argparse.ArgumentParser(description="Archive Telegraf log files into DuckDB.")
+    parser.add_argument('log_file_path', nargs='?', help="single log file to archive")
+    parser.add_argument('--dir', dest='log_dir', help="archive every matching log file in this directory in parallel")
+    parser.add_argument('--pattern', default='*.log', help="glob pattern used with --dir (default: *.log)")
+    parser.add_argument('--workers', type=int, default=None, help="number of parser processes (default: CPU count)")
+    args = parser.parse_args()
+
+    if args.log_dir:
+        archive_log_directory(args.log_dir, args.pattern, args.workers)
+    elif args.log_file_path:
+        if archive_log_file(args.log_file_path) is None:
+            sys.exit(1)
+    else:
+        print("Usage: python archive_logs.py <log_file_path> | --dir <log_dir> [--workers N]")
         sys.exit(1)
-    
-    log_file_path = sys.argv[1]
-    archive_log_file(log_file_path)
\ No newline at end of file
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+异步缓冲审计日志
+
+请求线程只在调用时记录用户名、IP 和时间并放入内存缓冲区，不再每次打开 DuckDB 连接。
+后台线程在攒够 AUDIT_BATCH_SIZE 条或距上次写入超过 AUDIT_FLUSH_INTERVAL 秒时批量写入 audit_log；
+其他工作进程持有 DuckDB 写锁等暂时性错误时保留缓冲并退避重试，进程退出时写完剩余记录。
+"""
+
+import os
+import time
+import atexit
+import logging
+import threading
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from db_manager import get_duckdb_connection
+
+logger = logging.getLogger(__name__)
+
+AUDIT_BATCH_SIZE = int(os.environ.get('AUDIT_BATCH_SIZE', 100))
+AUDIT_FLUSH_INTERVAL = float(os.environ.get('AUDIT_FLUSH_INTERVAL', 2.0))  # 秒
+AUDIT_BUFFER_MAX = int(os.environ.get('AUDIT_BUFFER_MAX', 10000))  # 超出后丢弃最早的记录并记录错误日志
+AUDIT_RETRY_MAX_DELAY = 30.0  # 秒
+AUDIT_SHUTDOWN_TIMEOUT = 10.0  # 进程退出时最多等待的秒数
+
+AUDIT_COLUMNS = ['timestamp', 'username', 'ip_address', 'action', 'status', 'details']
+
+
+class AuditLogger:
+    """进程内的审计日志缓冲区和后台写入线程"""
+
+    def __init__(self, batch_size=AUDIT_BATCH_SIZE, flush_interval=AUDIT_FLUSH_INTERVAL, buffer_max=AUDIT_BUFFER_MAX):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.buffer_max = buffer_max
+        self._reset()
+
+    def _reset(self):
+        # gunicorn preload_app 模式下 fork 出的工作进程不会继承后台线程，按 PID 重新初始化
+        self._pid = os.getpid()
+        self._cond = threading.Condition()
+        self._buffer = []
+        self._writer = None
+        self._closing = False
+        self._dropped = 0
+        self._write_lock = threading.Lock()
+
+    def log(self, username, ip_address, action, status, details="", timestamp=None):
+        """放入一条审计记录，立即返回"""
+        if self._pid != os.getpid():
+            self._reset()
+        if timestamp is None:
+            timestamp = datetime.now(timezone.utc).replace(tzinfo=None)
+        with self._cond:
+            self._buffer.append((timestamp, username, ip_address, action, status, details))
+            if len(self._buffer) > self.buffer_max:
+                overflow = len(self._buffer) - self.buffer_max
+                del self._buffer[:overflow]
+                self._dropped += overflow
+                logger.error(f"审计日志缓冲区已满，丢弃最早的 {overflow} 条记录 (累计 {self._dropped} 条)")
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._run, name="audit-writer")
+                self._writer.daemon = True
+                self._writer.start()
+            if len(self._buffer) >= self.batch_size:
+                self._cond.notify()
+
+    def _run(self):
+        retry_delay = 1.0
+        while True:
+            with self._cond:
+                if not self._closing and len(self._buffer) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                if self._closing and not self._buffer:
+                    return
+            try:
+                self.flush()
+                retry_delay = 1.0
+            except Exception as e:
+                # 通常是其他工作进程持有 DuckDB 写锁，记录保留在缓冲区中等待重试
+                logger.warning(f"写入审计日志失败，{retry_delay:.0f} 秒后重试: {e}")
+                time.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, AUDIT_RETRY_MAX_DELAY)
+
+    def flush(self):
+        """把缓冲区中的记录写入 audit_log，失败时放回缓冲区并抛出异常。返回写入条数"""
+        with self._write_lock:
+            with self._cond:
+                batch, self._buffer = self._buffer, []
+            if not batch:
+                return 0
+            try:
+                self._write(batch)
+            except Exception:
+                with self._cond:
+                    self._buffer[:0] = batch
+                raise
+            return len(batch)
+
+    def _write(self, batch):
+        audit_batch = pd.DataFrame(batch, columns=AUDIT_COLUMNS)
+        conn = get_duckdb_connection()
+        try:
+            conn.register('audit_batch', audit_batch)
+            conn.execute("""
+                INSERT INTO audit_log (timestamp, username, ip_address, action, status, details)
+                SELECT timestamp::TIMESTAMP, username::VARCHAR, ip_address::VARCHAR,
+                       action::VARCHAR, status::VARCHAR, details::VARCHAR
+                FROM audit_batch
+            """)
+        finally:
+            conn.close()
+
+    def shutdown(self, timeout=AUDIT_SHUTDOWN_TIMEOUT):
+        """进程退出时调用：通知后台线程写完剩余记录，超时后放弃"""
+        if self._pid != os.getpid():
+            return
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+            writer = self._writer
+        if writer is not None and writer.is_alive():
+            writer.join(timeout)
+        with self._cond:
+            remaining = len(self._buffer)
+        if remaining:
+            logger.error(f"进程退出时仍有 {remaining} 条审计日志未能写入")
+
+    def get_stats(self):
+        with self._cond:
+            return {
+                'buffered': len(self._buffer),
+                'dropped': self._dropped,
+                'writer_alive': self._writer is not None and self._writer.is_alive()
+            }
+
+
+audit_logger = AuditLogger()
+atexit.register(audit_logger.shutdown)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+审计日志查询基准测试
+功能：生成按时间顺序写入的合成 audit_log，比较旧版查询（每次新建连接、两次 COUNT(*)、ILIKE 搜索、
+LIMIT/OFFSET 分页）与 routes/admin_api 中的时间窗口 + 键集分页、估算/缓存总数在复用连接上的耗时。
+
+用法: PYTHONPATH=. python benchmarks/audit_log_benchmark.py [--rows 10000000] [--dir /tmp/audit_log_bench]
+"""
+
+import os
+import time
+import shutil
+import argparse
+
+import duckdb
+
+import db_manager
+from routes import admin_api
+
+PAGE = 10
+DEEP_OFFSET = 100_000  # 旧版深分页的 OFFSET；键集分页从同一位置的游标开始
+DAYS = 365
+
+
+def _generate(path, rows):
+    """用 init_duckdb 建表后写入 rows 条审计记录：一年内均匀分布，按时间顺序插入"""
+    db_manager.DUCKDB_PATH = path
+    db_manager.init_duckdb()
+    conn = duckdb.connect(path)
+    conn.execute(f"""
+        INSERT INTO audit_log (id, timestamp, username, ip_address, action, status, details)
+        SELECT uuid(),
+               TIMESTAMP '2025-01-01' + to_microseconds(i::BIGINT * ({DAYS}::BIGINT * 86400 * 1000000 // {rows})),
+               'user_' || (i % 50),
+               '10.0.' || (i % 7) || '.' || (i % 250),
+               (['login', 'logout', 'point_update', 'point_import', 'config_update', 'process_start', 'process_stop'])[1 + i % 7],
+               CASE WHEN hash(i) % 50 = 0 THEN 'failure' ELSE 'success' END,
+               'Changed object ' || (i % 100000) || ' via API request ' || i
+        FROM range({rows}) t(i)
+        ORDER BY i
+    """)
+    conn.execute("CHECKPOINT")
+    conn.close()
+
+
+def _best_of(fn, repeat=3, setup=None):
+    best = None
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+def _legacy_page(path, offset=0, search=None):
+    """基线提交中 get_audit_log 的查询方式"""
+    conn = duckdb.connect(path)
+    try:
+        where_clause, params = "", []
+        if search:
+            like_term = f'%{search}%'
+            where_clause = " WHERE username ILIKE ? OR ip_address ILIKE ? OR action ILIKE ? OR status ILIKE ? OR details ILIKE ?"
+            params = [like_term] * 5
+        conn.execute("SELECT COUNT(*) FROM audit_log").fetchone()
+        conn.execute(f"SELECT COUNT(*) FROM audit_log{where_clause}", params).fetchone()
+        return conn.execute(f"""
+            SELECT id, timestamp, username, ip_address, action, status, details
+            FROM audit_log{where_clause}
+            ORDER BY timestamp desc
+            LIMIT ? OFFSET ?
+        """, params + [PAGE, offset]).fetchall()
+    finally:
+        conn.close()
+
+
+def _keyset_page(filters, after=None):
+    """与 get_audit_log 带 cursor 参数时的查询一致"""
+    where_clause, params, since, until = admin_api.build_audit_filters(filters)
+    with db_manager.duckdb_cursor() as cur:
+        keyset_clause, keyset_params, upper = where_clause, list(params), until
+        if after:
+            keyset_clause += " AND " if keyset_clause else " WHERE "
+            keyset_clause += "(timestamp < ?::TIMESTAMP OR (timestamp = ?::TIMESTAMP AND id < ?::UUID))"
+            keyset_params += [after[0], after[0], after[1]]
+            upper = after[0]
+        rows = admin_api._fetch_recent_audit_rows(cur, keyset_clause, keyset_params, PAGE + 1, upper=upper, since=since)
+        admin_api._count_audit_log(cur, where_clause, params)
+        return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark audit log queries")
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--dir', default='/tmp/audit_log_bench')
+    args = parser.parse_args()
+
+    shutil.rmtree(args.dir, ignore_errors=True)
+    os.makedirs(args.dir)
+    path = os.path.join(args.dir, 'audit.duckdb')
+
+    started = time.perf_counter()
+    _generate(path, args.rows)
+    print(f"generated {args.rows:,} audit rows in {time.perf_counter() - started:.1f}s")
+
+    conn = duckdb.connect(path, read_only=True)
+    deep_ts, deep_id = conn.execute(
+        "SELECT timestamp, id FROM audit_log ORDER BY timestamp DESC, id DESC LIMIT 1 OFFSET ?",
+        [min(DEEP_OFFSET, args.rows - 1)]
+    ).fetchone()
+    last_month = conn.execute("SELECT max(timestamp) - INTERVAL 30 DAY FROM audit_log").fetchone()[0]
+    conn.close()
+    deep_cursor = (deep_ts, str(deep_id))
+    filtered = {'action': 'point_import', 'status': 'failure', 'since': last_month.isoformat()}
+    clear_cache = admin_api._audit_count_cache.clear
+
+    cases = [
+        ('legacy: first page', lambda: _legacy_page(path), None),
+        (f'legacy: OFFSET {DEEP_OFFSET:,}', lambda: _legacy_page(path, offset=DEEP_OFFSET), None),
+        ('legacy: ILIKE search', lambda: _legacy_page(path, search='user_7'), None),
+        ('keyset: first page', lambda: _keyset_page({}), None),
+        (f'keyset: cursor at row {DEEP_OFFSET:,}', lambda: _keyset_page({}, after=deep_cursor), None),
+        ('keyset: filtered, count uncached', lambda: _keyset_page(filtered), clear_cache),
+        ('keyset: filtered, count cached', lambda: _keyset_page(filtered), None),
+    ]
+    print()
+    print(f"{'query':40} {'best of 3':>12}")
+    for label, fn, setup in cases:
+        print(f"{label:40} {_best_of(fn, setup=setup):10.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+基准测试公共部分
+功能：在指定路径创建经 Alembic 迁移的 SQLite 数据库并返回绑定它的 Flask 应用，不导入 app 模块
+（导入时会按默认路径创建应用并初始化 database/ 下的数据库）；提供合成数据点的批量写入。
+"""
+
+import os
+import time
+import random
+from datetime import datetime, timezone
+
+from flask import Flask
+from flask_migrate import Migrate, upgrade
+from sqlalchemy import insert
+
+import sqlite_tuning  # noqa: F401  导入即注册 PRAGMA 配置，与应用一致
+from models import db, ConfigFile
+from point_search import include_object, deferred_point_search_inserts
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MIGRATIONS = os.path.join(ROOT, 'migrations')
+
+# 合成测点名称的组成部分，使常见词（如 pump）命中大量数据点、编号类词只命中少数
+AREAS = ['boiler', 'pump', 'turbine', 'cooling', 'feedwater', 'condenser', 'compressor', 'valve']
+SIGNALS = ['temperature', 'pressure', 'flow', 'level', 'speed', 'current', 'vibration', 'motor']
+
+
+def create_app(db_path):
+    """创建 Flask 应用并把 db_path 迁移到最新版本"""
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI=f"sqlite:///{db_path}", SQLALCHEMY_TRACK_MODIFICATIONS=False)
+    db.init_app(app)
+    Migrate(app, db, directory=MIGRATIONS, include_object=include_object)
+    with app.app_context():
+        upgrade(directory=MIGRATIONS)
+    return app
+
+
+def seed_points(rows, config_files=500, chunk=50_000, import_batch=None):
+    """
+    写入 config_files 个配置文件和 rows 个合成数据点，插入期间延迟维护全文索引。需在应用上下文中调用。
+    返回耗时（秒）。
+    """
+    started = time.perf_counter()
+    now = datetime.now(timezone.utc)
+    rng = random.Random(42)
+    if not db.session.query(ConfigFile.id).first():
+        db.session.execute(insert(ConfigFile), [
+            {'file_name': f'plant_{i}_{AREAS[i % len(AREAS)]}.conf', 'content': '[agent]',
+             'content_hash': f'{i:064d}', 'version': 1, 'change_type': 'system', 'is_active': True}
+            for i in range(1, config_files + 1)
+        ])
+    connection = db.session.connection()
+    with deferred_point_search_inserts(connection):
+        for start in range(0, rows, chunk):
+            batch = []
+            for i in range(start, min(start + chunk, rows)):
+                area, signal = AREAS[rng.randrange(len(AREAS))], SIGNALS[rng.randrange(len(SIGNALS))]
+                name = f'{area}_{signal}_{i:07d}'
+                batch.append((name, f'ns=2;s={area.upper()}-{signal}.{i:07d}', name,
+                              f'{area} {signal} sensor on unit {i % 40}', now, now,
+                              1 + i % config_files, import_batch))
+            connection.exec_driver_sql(
+                "INSERT INTO point_info (measurement, original_point_name, normalized_point_name, point_comment, "
+                "tags, fields, timestamp, created_at, data_source, config_file_id, is_enabled, is_locked, "
+                "import_batch, current_version) VALUES (?, ?, ?, ?, '{}', '{}', ?, ?, 'opcua', ?, 1, 0, ?, 0)",
+                batch)
+    db.session.commit()
+    return time.perf_counter() - started
+
+
+def best_of(fn, repeat=3):
+    """执行 repeat 次，返回最短耗时（毫秒）和最后一次的结果"""
+    best, result = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000, result
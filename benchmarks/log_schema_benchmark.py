@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+telegraf_logs 紧凑结构基准测试
+功能：生成旧版结构（每行重复保存进程名、配置文件路径和日志类型字符串）的合成日志库，
+执行 init_duckdb 中的迁移，比较迁移前后的文件大小和常用查询耗时；
+另生成一份 level/log_type 为 VARCHAR 的紧凑表，单独衡量 ENUM 的作用。
+
+用法: PYTHONPATH=. python benchmarks/log_schema_benchmark.py [--rows 50000000] [--dir /tmp/log_schema_bench]
+"""
+
+import os
+import time
+import shutil
+import argparse
+
+import duckdb
+
+import db_manager
+
+CONFIGS = 200  # 配置文件数，每个配置文件运行 RUNS 次
+RUNS = 5
+
+
+def _generate_legacy(path, rows):
+    """生成旧版 telegraf_logs：约 1% E!、4% W!、85% I!、10% D!，每次运行的第一行为启动消息，PID 在运行之间复用"""
+    conn = duckdb.connect(path)
+    conn.execute(f"""
+        CREATE TABLE telegraf_logs AS
+        WITH g AS (
+            SELECT i, i % {CONFIGS} AS cfg, i * {RUNS} // {rows} AS run_no, hash(i) % 100 AS r,
+                   TIMESTAMP '2024-01-01' + to_microseconds(i::BIGINT * (30::BIGINT * 86400 * 1000000 // {rows})) AS ts
+            FROM range({rows}) t(i)
+        )
+        SELECT ts AS timestamp,
+               10000 + (cfg + run_no * 37) % 400 AS process_pid,
+               'telegraf_cfg' || cfg AS process_name,
+               '/opt/telegraf_manager/configs/plant_area_' || cfg || '/telegraf_cfg' || cfg || '_v3.conf' AS config_file,
+               CASE WHEN r < 5 THEN 'stderr' ELSE 'stdout' END AS log_type,
+               CASE WHEN i % ({rows} // {RUNS}) < {CONFIGS} THEN strftime(ts, '%Y-%m-%dT%H:%M:%SZ') || ' I! Starting Telegraf 1.30.0'
+                    WHEN r < 1 THEN strftime(ts, '%Y-%m-%dT%H:%M:%SZ') || ' E! [outputs.influxdb] When writing to [http://10.0.' || cfg || '.5:8086]: connection refused'
+                    WHEN r < 5 THEN strftime(ts, '%Y-%m-%dT%H:%M:%SZ') || ' W! [inputs.opcua] Collection took longer than expected; not complete after interval of ' || (r * 3) || 's'
+                    WHEN r < 90 THEN strftime(ts, '%Y-%m-%dT%H:%M:%SZ') || ' I! [inputs.opcua] read ns=2;s=Area' || cfg || '.Tag' || (i % 5000) || ' ok'
+                    ELSE strftime(ts, '%Y-%m-%dT%H:%M:%SZ') || ' D! [outputs.influxdb] Wrote batch of ' || (i % 1000) || ' metrics in ' || (r % 50) || 'ms'
+               END AS message,
+               CASE WHEN r < 1 THEN 'E' WHEN r < 5 THEN 'W' WHEN r < 90 THEN 'I' ELSE 'D' END AS level,
+               CASE WHEN r < 1 OR r >= 90 THEN 'outputs.influxdb' ELSE 'inputs.opcua' END AS plugin
+        FROM g
+        ORDER BY ts
+    """)
+    conn.execute("CHECKPOINT")
+    conn.close()
+
+
+def _copy_tables(source_path, target_path, tables, varchar_enums=False):
+    """把表复制到新文件，得到不含迁移遗留空闲块的文件大小；varchar_enums 时把 ENUM 列存为 VARCHAR"""
+    conn = duckdb.connect(target_path)
+    conn.execute(f"ATTACH '{source_path}' AS src (READ_ONLY)")
+    if not varchar_enums:
+        conn.execute(f"CREATE TYPE log_level AS ENUM {db_manager.LOG_LEVELS}")
+        conn.execute(f"CREATE TYPE log_type_enum AS ENUM {db_manager.LOG_TYPES}")
+    for table in tables:
+        select = f"SELECT * FROM src.{table}"
+        if table == 'telegraf_logs' and varchar_enums:
+            select = f"SELECT * REPLACE (log_type::VARCHAR AS log_type, level::VARCHAR AS level) FROM src.{table}"
+        conn.execute(f"CREATE TABLE {table} AS {select}")
+    conn.execute("DETACH src")
+    conn.execute("CHECKPOINT")
+    conn.close()
+
+
+def _size_mb(path):
+    return os.path.getsize(path) / 1e6
+
+
+def _best_of(conn, sql, params=None, repeat=3):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        conn.execute(sql, params or []).fetchall()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+# 与应用中的查询对应：{logs} 为需要名称/路径的查询所用的表（新版为 telegraf_logs_expanded 视图），{raw} 为日志表本身
+QUERIES = [
+    ('errors per process, last day',
+     "SELECT process_pid, count(*) FROM {raw} WHERE level = 'E' AND timestamp >= TIMESTAMP '2024-01-30' GROUP BY ALL"),
+    ('process log tail (500 rows)',
+     "SELECT timestamp, log_type, message FROM {raw} WHERE process_pid = 10042 ORDER BY timestamp DESC LIMIT 500"),
+    ('filter by config file, 1 day',
+     "SELECT count(*) FROM {logs} WHERE config_file LIKE '%plant_area_7/%' "
+     "AND timestamp BETWEEN TIMESTAMP '2024-01-10' AND TIMESTAMP '2024-01-11'"),
+    ('full-text scan', "SELECT count(*) FROM {logs} WHERE message ILIKE '%connection refused%'"),
+    ('level histogram, full table', "SELECT level, log_type, count(*) FROM {raw} GROUP BY ALL"),
+]
+
+
+def _run_queries(path, logs, raw):
+    conn = duckdb.connect(path, read_only=True)
+    try:
+        return [_best_of(conn, sql.format(logs=logs, raw=raw)) for _, sql in QUERIES]
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the compact telegraf_logs schema")
+    parser.add_argument('--rows', type=int, default=50_000_000)
+    parser.add_argument('--dir', default='/tmp/log_schema_bench')
+    args = parser.parse_args()
+
+    shutil.rmtree(args.dir, ignore_errors=True)
+    os.makedirs(args.dir)
+    legacy = os.path.join(args.dir, 'legacy.duckdb')
+    migrated = os.path.join(args.dir, 'migrated.duckdb')
+    compact = os.path.join(args.dir, 'compact.duckdb')
+    compact_varchar = os.path.join(args.dir, 'compact_varchar.duckdb')
+
+    started = time.perf_counter()
+    _generate_legacy(legacy, args.rows)
+    print(f"generated {args.rows:,} legacy rows in {time.perf_counter() - started:.1f}s")
+
+    shutil.copy(legacy, migrated)
+    db_manager.DUCKDB_PATH = migrated
+    started = time.perf_counter()
+    db_manager.init_duckdb()
+    print(f"migration (init_duckdb) took {time.perf_counter() - started:.1f}s")
+
+    tables = ['log_sources', 'process_runs', 'telegraf_logs']
+    _copy_tables(migrated, compact, tables)
+    _copy_tables(migrated, compact_varchar, tables, varchar_enums=True)
+    expanded_view = """
+        CREATE VIEW telegraf_logs_expanded AS
+        SELECT l.timestamp, l.process_pid, l.run_id,
+               nullif(s.process_name, '') AS process_name, nullif(s.config_file, '') AS config_file,
+               l.log_type::VARCHAR AS log_type, l.message, l.level::VARCHAR AS level, l.plugin
+        FROM telegraf_logs l LEFT JOIN log_sources s ON s.id = l.source_id
+    """
+    for path in (compact, compact_varchar):
+        conn = duckdb.connect(path)
+        conn.execute(expanded_view)
+        conn.close()
+
+    conn = duckdb.connect(migrated, read_only=True)
+    runs = conn.execute("SELECT count(*) FROM process_runs").fetchone()[0]
+    conn.close()
+    print(f"process_runs rebuilt: {runs} (expected {CONFIGS * RUNS})")
+
+    variants = [
+        ('legacy (VARCHAR strings per row)', legacy, 'telegraf_logs', 'telegraf_logs'),
+        ('compact, ENUM level/log_type', compact, 'telegraf_logs_expanded', 'telegraf_logs'),
+        ('compact, VARCHAR level/log_type', compact_varchar, 'telegraf_logs_expanded', 'telegraf_logs'),
+    ]
+    print()
+    print(f"{'variant':36} {'file MB':>9} " + ' '.join(f"{name[:22]:>24}" for name, _ in QUERIES))
+    for label, path, logs, raw in variants:
+        timings = _run_queries(path, logs, raw)
+        print(f"{label:36} {_size_mb(path):9.0f} " + ' '.join(f"{ms:22.1f}ms" for ms in timings))
+    print(f"{'migrated file in place':36} {_size_mb(migrated):9.0f}")
+
+
+if __name__ == '__main__':
+    main()
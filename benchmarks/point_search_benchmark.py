@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+数据点搜索基准测试
+功能：生成合成数据点库，比较旧版搜索（六列 ILIKE '%词%' 加配置文件外连接，按 id 排序）与 FTS5 全文索引
+（point_search.apply_point_search，按相关度排序）取总数和第一页的耗时，并给出索引重建耗时和索引大小。
+
+用法: PYTHONPATH=. python benchmarks/point_search_benchmark.py [--rows 1000000] [--dir /tmp/point_search_bench]
+"""
+
+import os
+import time
+import shutil
+import argparse
+
+from sqlalchemy import or_, text
+
+from benchmark_app import create_app, seed_points, best_of
+from models import db, PointInfo, ConfigFile
+from point_search import apply_point_search, rebuild_point_search_index, POINT_SEARCH_TABLE
+
+PAGE = 25
+# 编号（命中 1 个）、常见词、带分隔符的词组、不存在的词、trigram 无法索引的短词（仍按 ILIKE 过滤）
+TERMS = ['0012345', 'pump', 'PUMP-motor', 'zzz', 'pu']
+
+
+def _legacy(term):
+    """基线提交中 get_point_info 的搜索方式"""
+    search_term = f"%{term}%"
+    query = PointInfo.query.outerjoin(ConfigFile, PointInfo.config_file_id == ConfigFile.id).filter(or_(
+        PointInfo.measurement.ilike(search_term),
+        PointInfo.original_point_name.ilike(search_term),
+        PointInfo.normalized_point_name.ilike(search_term),
+        PointInfo.point_comment.ilike(search_term),
+        PointInfo.import_batch.ilike(search_term),
+        ConfigFile.file_name.ilike(search_term),
+    )).order_by(PointInfo.id)
+    return query.count(), query.limit(PAGE).all()
+
+
+def _fts(term):
+    query, rank = apply_point_search(PointInfo.query, term)
+    order = [rank, PointInfo.id] if rank is not None else [PointInfo.id]
+    return query.count(), query.order_by(*order).limit(PAGE).all()
+
+
+def _index_size_mb():
+    try:
+        size = db.session.execute(text(
+            f"SELECT sum(pgsize) FROM dbstat WHERE name LIKE '{POINT_SEARCH_TABLE}%'")).scalar()
+        table = db.session.execute(text("SELECT sum(pgsize) FROM dbstat WHERE name = 'point_info'")).scalar()
+    except Exception:
+        return None, None  # SQLite 未编译 dbstat 虚拟表
+    return size / 1e6, table / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark point search: ILIKE vs FTS5")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--dir', default='/tmp/point_search_bench')
+    args = parser.parse_args()
+
+    shutil.rmtree(args.dir, ignore_errors=True)
+    os.makedirs(args.dir)
+    app = create_app(os.path.join(args.dir, 'telegraf_manager.db'))
+
+    with app.app_context():
+        elapsed = seed_points(args.rows)
+        print(f"generated {args.rows:,} points in {elapsed:.1f}s")
+
+        print()
+        print(f"{'term':12} {'matches':>9} {'ILIKE':>12} {'FTS5':>12}")
+        for term in TERMS:
+            legacy_ms, (legacy_count, _) = best_of(lambda: _legacy(term))
+            fts_ms, (fts_count, _) = best_of(lambda: _fts(term))
+            assert legacy_count == fts_count, (term, legacy_count, fts_count)
+            print(f"{term:12} {fts_count:9,} {legacy_ms:10.1f}ms {fts_ms:10.1f}ms")
+
+        started = time.perf_counter()
+        with db.engine.begin() as connection:
+            rebuild_point_search_index(connection)
+        print()
+        print(f"rebuild ({POINT_SEARCH_TABLE}): {time.perf_counter() - started:.1f}s")
+        index_mb, table_mb = _index_size_mb()
+        if index_mb is not None:
+            print(f"index size: {index_mb:.0f} MB (point_info: {table_mb:.0f} MB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+导入批次回滚基准测试
+功能：生成合成数据点库并导入一个批次（更新已有数据点、创建新数据点，其中一部分在后续块中再次导入），
+导入后再批量修改一部分被更新的数据点，然后比较旧版逐个数据点回滚（每个更新的数据点一次历史查询）与
+point_import.rollback_batch_points 的耗时，并检查回滚后 point_info、历史表和全文索引是否与导入前一致。
+两种方式都在事务中执行后回滚，互不影响。
+
+用法: PYTHONPATH=. python benchmarks/rollback_benchmark.py [--rows 1000000] [--dir /tmp/rollback_bench]
+"""
+
+import os
+import time
+import shutil
+import hashlib
+import argparse
+
+from benchmark_app import create_app, seed_points
+from models import db, PointInfo, PointInfoHistory
+from point_import import POINT_HISTORY_COLUMNS, bulk_upsert_points, ids_condition, rollback_batch_points, snapshot_points
+from point_search import POINT_SEARCH_TABLE
+
+BATCH = 'bench_batch'
+
+FINGERPRINTS = {
+    'point_info': f"SELECT id, current_version, {', '.join(POINT_HISTORY_COLUMNS)} FROM point_info ORDER BY id",
+    'point_info_history': f"SELECT id, point_info_id, version, {', '.join(POINT_HISTORY_COLUMNS)} "
+                          f"FROM point_info_history ORDER BY id",
+    POINT_SEARCH_TABLE: f"SELECT rowid, * FROM {POINT_SEARCH_TABLE} ORDER BY rowid",
+}
+
+
+def _fingerprint():
+    """各表内容的摘要，用于比较回滚后的状态与导入前是否一致"""
+    digests = {}
+    for name, sql in FINGERPRINTS.items():
+        digest = hashlib.sha256()
+        for row in db.session.execute(db.text(sql)):
+            digest.update(repr(tuple(row)).encode())
+        digests[name] = digest.hexdigest()
+    return digests
+
+
+def _import_batch(rows, updates, creates, reimports, patched):
+    """
+    模拟分块文件导入：第一块更新 updates 个已有数据点并创建 creates 个新数据点，第二块再次导入其中 reimports 个
+    新数据点（批次内先创建后更新）；导入后对 patched 个被更新的数据点做一次批量修改（写历史快照）。
+    """
+    step = rows // updates
+    existing = db.session.scalars(db.select(PointInfo.measurement).where(PointInfo.id % step == 0).limit(updates)).all()
+    first = [(i, {'measurement': name, 'point_comment': f'imported comment {i}', 'unit': 'kPa'})
+             for i, name in enumerate(existing)]
+    first += [(updates + i, {'measurement': f'imported_point_{i:07d}', 'point_comment': 'new', 'data_source': 'opcua'})
+              for i in range(creates)]
+    bulk_upsert_points(first, key='measurement', batch_id=BATCH)
+    second = [(i, {'measurement': f'imported_point_{i:07d}', 'point_comment': 'reimported'})
+              for i in range(reimports)]
+    bulk_upsert_points(second, key='measurement', batch_id=BATCH)
+
+    patched_ids = db.session.scalars(db.select(PointInfo.id).where(
+        PointInfo.import_batch == BATCH, PointInfo.import_status == 'updated').limit(patched)).all()
+    condition = ids_condition(patched_ids)
+    snapshot_points(condition, 'bulk patch')
+    db.session.execute(db.update(PointInfo).where(condition).values(is_enabled=False),
+                       execution_options={'synchronize_session': False})
+    db.session.commit()
+
+
+def _legacy_rollback(batch_id):
+    """基线提交中 rollback_import_batch 的回滚方式（不含提交和审计日志）"""
+    for point in PointInfo.query.filter_by(import_batch=batch_id).all():
+        if point.import_status == 'created':
+            db.session.delete(point)
+        elif point.import_status == 'updated':
+            last_version = PointInfoHistory.query.filter(
+                PointInfoHistory.point_info_id == point.id
+            ).order_by(PointInfoHistory.version.desc()).first()
+            if last_version:
+                for name in ('original_point_name', 'normalized_point_name', 'point_comment', 'tags', 'fields',
+                             'timestamp', 'data_type', 'unit', 'data_source', 'config_file_id', 'is_enabled',
+                             'is_locked', 'import_batch', 'import_status'):
+                    setattr(point, name, getattr(last_version, name))
+                db.session.delete(last_version)
+                point.current_version = last_version.version - 1
+            else:
+                point.import_batch = None
+                point.import_status = None
+    db.session.flush()
+
+
+def _run(name, rollback, expected):
+    started = time.perf_counter()
+    rollback(BATCH)
+    elapsed = time.perf_counter() - started
+    restored = _fingerprint() == expected
+    db.session.rollback()
+    print(f"{name:16} {elapsed:8.1f}s  {'restored to pre-import state' if restored else 'state NOT restored'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark import batch rollback: per-point loop vs set-based")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--updates', type=int, default=12_500)
+    parser.add_argument('--creates', type=int, default=37_500)
+    parser.add_argument('--reimports', type=int, default=1_000)
+    parser.add_argument('--patched', type=int, default=500)
+    parser.add_argument('--dir', default='/tmp/rollback_bench')
+    args = parser.parse_args()
+
+    shutil.rmtree(args.dir, ignore_errors=True)
+    os.makedirs(args.dir)
+    app = create_app(os.path.join(args.dir, 'telegraf_manager.db'))
+
+    with app.app_context():
+        elapsed = seed_points(args.rows)
+        print(f"generated {args.rows:,} points in {elapsed:.1f}s")
+        expected = _fingerprint()
+
+        started = time.perf_counter()
+        _import_batch(args.rows, args.updates, args.creates, args.reimports, args.patched)
+        print(f"imported batch ({args.updates:,} updated, {args.creates:,} created, {args.reimports:,} re-imported, "
+              f"{args.patched:,} patched afterwards) in {time.perf_counter() - started:.1f}s")
+        print()
+
+        _run('per-point loop', _legacy_rollback, expected)
+        _run('set-based', rollback_batch_points, expected)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+SQLite 并发基准测试
+功能：多个写进程和读进程同时访问同一个 SQLite 文件（模拟多个 gunicorn 工作进程），
+分别使用 SQLite 默认设置和 sqlite_tuning 中的 PRAGMA 配置，比较吞吐量、p50/p99 延迟和 "database is locked" 错误数。
+
+用法: PYTHONPATH=. python benchmarks/sqlite_concurrency_benchmark.py [--writers 4] [--readers 4] [--seconds 5] [--dir /tmp/sqlite_bench]
+"""
+
+import os
+import time
+import random
+import shutil
+import sqlite3
+import argparse
+import multiprocessing
+
+import sqlite_tuning
+
+ROWS = 50_000
+MEASUREMENTS = 200
+DEFAULT_TIMEOUT = 5.0  # pysqlite 默认的锁等待秒数，与未调优时应用的行为一致
+
+
+def _prepare(path, profile):
+    conn = sqlite3.connect(path)
+    sqlite_tuning.apply_sqlite_pragmas(conn, profile)
+    conn.executescript("""
+        CREATE TABLE point_info (
+            id INTEGER PRIMARY KEY,
+            measurement TEXT NOT NULL,
+            point_name TEXT NOT NULL,
+            comment TEXT,
+            updated_at REAL
+        );
+        CREATE INDEX ix_point_info_measurement ON point_info (measurement);
+    """)
+    conn.executemany(
+        "INSERT INTO point_info (measurement, point_name, comment, updated_at) VALUES (?, ?, ?, ?)",
+        ((f"m{i % MEASUREMENTS}", f"ns=2;s=Tag{i}", f"point {i}", 0.0) for i in range(ROWS))
+    )
+    conn.commit()
+    conn.close()
+
+
+def _worker(path, profile, role, seconds, results):
+    conn = sqlite3.connect(path, timeout=DEFAULT_TIMEOUT)
+    sqlite_tuning.apply_sqlite_pragmas(conn, profile)
+    rng = random.Random(os.getpid())
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            if role == 'write':
+                # 一次请求内的小事务：更新几个点位后提交
+                for _ in range(5):
+                    conn.execute("UPDATE point_info SET comment = ?, updated_at = ? WHERE id = ?",
+                                 (f"edit {rng.random()}", time.time(), rng.randint(1, ROWS)))
+                conn.commit()
+            else:
+                # 列表页：按 measurement 过滤取一页并计数
+                measurement = f"m{rng.randrange(MEASUREMENTS)}"
+                conn.execute("SELECT id, point_name, comment FROM point_info WHERE measurement = ? ORDER BY id LIMIT 50",
+                             (measurement,)).fetchall()
+                conn.execute("SELECT count(*) FROM point_info WHERE measurement = ?", (measurement,)).fetchone()
+        except sqlite3.OperationalError:
+            errors += 1
+            conn.rollback()
+            continue
+        latencies.append(time.perf_counter() - started)
+    conn.close()
+    results.put((role, latencies, errors))
+
+
+def _percentile(values, pct):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def _run(label, path, profile, writers, readers, seconds):
+    _prepare(path, profile)
+    results = multiprocessing.Queue()
+    roles = ['write'] * writers + ['read'] * readers
+    procs = [multiprocessing.Process(target=_worker, args=(path, profile, role, seconds, results)) for role in roles]
+    for proc in procs:
+        proc.start()
+    collected = [results.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+
+    for role in ('write', 'read'):
+        latencies = [lat for r, lats, _ in collected if r == role for lat in lats]
+        errors = sum(err for r, _, err in collected if r == role)
+        print(f"{label:8} {role:6} {len(latencies) / seconds:12.0f} {_percentile(latencies, 50) * 1000:10.1f}ms "
+              f"{_percentile(latencies, 99) * 1000:10.1f}ms {errors:8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SQLite concurrency with default vs tuned pragmas")
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--dir', default='/tmp/sqlite_bench')
+    args = parser.parse_args()
+
+    shutil.rmtree(args.dir, ignore_errors=True)
+    os.makedirs(args.dir)
+
+    print(f"{args.writers} writer and {args.readers} reader processes, {args.seconds:g}s each")
+    print(f"{'profile':8} {'role':6} {'ops/s':>12} {'p50':>12} {'p99':>12} {'errors':>8}")
+    _run('default', os.path.join(args.dir, 'default.db'), {}, args.writers, args.readers, args.seconds)
+    _run('tuned', os.path.join(args.dir, 'tuned.db'), dict(sqlite_tuning.SQLITE_PRAGMAS),
+         args.writers, args.readers, args.seconds)
+
+
+if __name__ == '__main__':
+    main()
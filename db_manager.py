@@ -6,11 +6,16 @@
 """
 
 import os
+import re
 import shutil
 import sqlite3
+import time
 import logging
+import threading
 import duckdb
-from datetime import datetime
+import pandas as pd
+from contextlib import contextmanager
+from datetime import datetime, timezone
 from typing import Dict, Optional
 from flask import Flask
 from models import db, User
@@ -22,34 +27,187 @@ logger = logging.getLogger(__name__)
 # 定义 DuckDB 数据库文件路径
 DUCKDB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database', 'telegraf_logs.duckdb')
 
+# 日志去重：每个指纹在每个时间窗口内最多保存多少条原始日志（0 表示全部保存，仅统计指纹）
+LOG_DEDUP_MAX_PER_WINDOW = int(os.environ.get('LOG_DEDUP_MAX_PER_WINDOW', 0))
+LOG_DEDUP_WINDOW_SECONDS = int(os.environ.get('LOG_DEDUP_WINDOW_SECONDS', 300))
+
+# 迁移旧日志表时，同一 PID 两条日志间隔超过此秒数即视为两次运行
+LOG_RUN_GAP_SECONDS = int(os.environ.get('LOG_RUN_GAP_SECONDS', 3600))
+
+# telegraf_logs 中 ENUM 列的取值，其他值写入时存为 NULL
+LOG_LEVELS = ('E', 'W', 'I', 'D')
+LOG_TYPES = ('stdout', 'stderr', 'archived')
+
 def get_duckdb_connection():
     """
     获取一个 DuckDB 数据库连接。
     """
     return duckdb.connect(database=DUCKDB_PATH, read_only=False)
 
+# 查询复用的连接空闲多久后关闭（秒）。DuckDB 文件锁按进程持有，长期占用会阻塞其他工作进程写入
+DUCKDB_SHARED_IDLE_SECONDS = float(os.environ.get('DUCKDB_SHARED_IDLE_SECONDS', 5))
+
+class _SharedDuckDBConnection:
+    """
+    每个工作进程复用的 DuckDB 连接：查询通过 cursor() 获取独立游标，
+    连接在空闲 DUCKDB_SHARED_IDLE_SECONDS 秒后由后台定时器关闭，释放文件锁。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._conn = None
+        self._active = 0
+        self._last_used = 0.0
+        self._timer = None
+
+    @contextmanager
+    def cursor(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # fork 后不能沿用父进程的连接
+                self._conn, self._active, self._timer, self._pid = None, 0, None, os.getpid()
+            if self._conn is None:
+                self._conn = get_duckdb_connection()
+            cursor = self._conn.cursor()
+            self._active += 1
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+            with self._lock:
+                self._active -= 1
+                self._last_used = time.monotonic()
+                if self._timer is None:
+                    self._schedule_close()
+
+    def _schedule_close(self):
+        self._timer = threading.Timer(DUCKDB_SHARED_IDLE_SECONDS, self._close_if_idle)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _close_if_idle(self):
+        with self._lock:
+            self._timer = None
+            if self._conn is None:
+                return
+            if self._active == 0 and time.monotonic() - self._last_used >= DUCKDB_SHARED_IDLE_SECONDS:
+                self._conn.close()
+                self._conn = None
+            else:
+                self._schedule_close()
+
+_shared_duckdb = _SharedDuckDBConnection()
+
+def duckdb_cursor():
+    """
+    从当前工作进程复用的 DuckDB 连接获取游标，用法: with duckdb_cursor() as cur: ...
+    适合高频的短查询，避免每个请求重新打开数据库文件。
+    """
+    return _shared_duckdb.cursor()
+
 def init_duckdb():
     """
     初始化 DuckDB 数据库，创建所有需要的表（如果不存在）。
     """
     try:
         conn = get_duckdb_connection()
-        # 创建 telegraf 进程日志表
+        # 日志字典编码：级别和日志类型使用 ENUM，进程名/配置文件路径存入 log_sources 维表
+        conn.execute(f"CREATE TYPE IF NOT EXISTS log_level AS ENUM {LOG_LEVELS};")
+        conn.execute(f"CREATE TYPE IF NOT EXISTS log_type_enum AS ENUM {LOG_TYPES};")
+        conn.execute("CREATE SEQUENCE IF NOT EXISTS log_sources_id_seq;")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS log_sources (
+                id INTEGER DEFAULT nextval('log_sources_id_seq') PRIMARY KEY,
+                process_name VARCHAR NOT NULL, -- 未知时为空字符串
+                config_file VARCHAR NOT NULL,
+                UNIQUE (process_name, config_file)
+            );
+        """)
+        # 创建 telegraf 进程日志表 (紧凑结构，名称和路径通过 source_id / run_id 引用)
         conn.execute("""
             CREATE TABLE IF NOT EXISTS telegraf_logs (
                 timestamp TIMESTAMP,
                 process_pid INTEGER,
+                run_id INTEGER, -- process_runs.id
+                source_id INTEGER, -- log_sources.id
+                log_type log_type_enum,
+                level log_level,
+                plugin VARCHAR,
+                message VARCHAR
+            );
+        """)
+        # 创建按进程、按分钟汇总的日志级别统计表，由写入路径在同一事务中增量维护
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS telegraf_log_rollups (
+                process_pid INTEGER, -- 无法识别 PID 的日志记为 0
+                minute TIMESTAMP,
+                process_name VARCHAR,
+                error_count BIGINT DEFAULT 0,
+                warn_count BIGINT DEFAULT 0,
+                info_count BIGINT DEFAULT 0,
+                debug_count BIGINT DEFAULT 0,
+                line_count BIGINT DEFAULT 0,
+                bytes BIGINT DEFAULT 0,
+                PRIMARY KEY (process_pid, minute)
+            );
+        """)
+        # 创建日志指纹表：同一类消息（数字、IP、引号内容等被掩码后相同）只保留计数和一条样本
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS telegraf_log_fingerprints (
+                process_pid INTEGER, -- 无法识别 PID 的日志记为 0
+                fingerprint VARCHAR, -- md5(级别 + 掩码后的消息)
+                level VARCHAR,
+                pattern VARCHAR,
+                sample VARCHAR,
+                occurrences BIGINT DEFAULT 0,
+                suppressed_count BIGINT DEFAULT 0, -- 因超出窗口上限未写入 telegraf_logs 的行数
+                first_seen TIMESTAMP,
+                last_seen TIMESTAMP,
+                window_start TIMESTAMP,
+                window_count BIGINT DEFAULT 0,
+                PRIMARY KEY (process_pid, fingerprint)
+            );
+        """)
+        # 创建进程运行记录表：每次运行一行，由写入路径和进程退出时维护，历史进程列表直接读取此表
+        conn.execute("CREATE SEQUENCE IF NOT EXISTS process_runs_id_seq;")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS process_runs (
+                id INTEGER DEFAULT nextval('process_runs_id_seq'),
+                process_pid INTEGER, -- 无法识别 PID 的日志记为 0
+                start_time TIMESTAMP,
+                stop_time TIMESTAMP, -- 运行中为 NULL
+                last_seen TIMESTAMP,
                 process_name VARCHAR,
                 config_file VARCHAR,
-                log_type VARCHAR, -- 'stdout' or 'stderr'
-                message VARCHAR
+                log_count BIGINT DEFAULT 0,
+                status VARCHAR DEFAULT 'running', -- 'running' or 'stopped'
+                PRIMARY KEY (process_pid, start_time)
             );
         """)
+        # 旧库升级：逐行保存名称字符串的日志表迁移为紧凑结构
+        legacy_columns = {row[0] for row in conn.execute(
+            "SELECT column_name FROM information_schema.columns WHERE table_name = 'telegraf_logs'"
+        ).fetchall()}
+        if 'process_name' in legacy_columns:
+            _migrate_legacy_telegraf_logs(conn, legacy_columns)
+        # 供查询和导出使用的展开视图，列与旧版 telegraf_logs 一致
+        conn.execute("""
+            CREATE OR REPLACE VIEW telegraf_logs_expanded AS
+            SELECT l.timestamp, l.process_pid, l.run_id,
+                   nullif(s.process_name, '') AS process_name, nullif(s.config_file, '') AS config_file,
+                   l.log_type::VARCHAR AS log_type, l.message, l.level::VARCHAR AS level, l.plugin
+            FROM telegraf_logs l
+            LEFT JOIN log_sources s ON s.id = l.source_id
+        """)
+        # 旧库升级：汇总表为空而日志表已有数据时，一次性回填
+        if conn.execute("SELECT count(*) FROM telegraf_log_rollups").fetchone()[0] == 0:
+            conn.execute(f"INSERT INTO telegraf_log_rollups {LOG_ROLLUP_SELECT.format(source='telegraf_logs_expanded')}")
         # 创建审计日志表
         conn.execute("""
             CREATE TABLE IF NOT EXISTS audit_log (
                 id UUID DEFAULT uuid(),
-                timestamp TIMESTAMP DEFAULT now(),
+                timestamp TIMESTAMP DEFAULT timezone('UTC', now()), -- 不带时区的 UTC 时间
                 username VARCHAR,
                 ip_address VARCHAR,
                 action VARCHAR,
@@ -58,6 +216,13 @@ def init_duckdb():
             );
         """)
         
+        # 旧库升级：审计时间原先由 now() 按服务器本地时间写入，与按 UTC 写入的新记录统一为 UTC
+        audit_default = conn.execute(
+            "SELECT column_default FROM duckdb_columns() WHERE table_name = 'audit_log' AND column_name = 'timestamp'"
+        ).fetchone()
+        if audit_default and audit_default[0] == 'now()':
+            _migrate_audit_log_to_utc(conn)
+        
         # --- 新增：创建数据导入历史相关表 ---
 
         # 1. 导入批次表
@@ -71,14 +236,19 @@ def init_duckdb():
                 success_count INTEGER DEFAULT 0,
                 failed_count INTEGER DEFAULT 0,
                 skipped_count INTEGER DEFAULT 0,
-                status VARCHAR DEFAULT 'processing', -- 'processing', 'completed', 'failed'
+                status VARCHAR DEFAULT 'processing', -- 'processing', 'cancelling', 'completed', 'failed', 'cancelled'
                 start_time TIMESTAMP DEFAULT now(),
                 end_time TIMESTAMP,
                 user_id VARCHAR,
                 conflict_rule VARCHAR,
+                summary VARCHAR, -- JSON: created/updated/unchanged/skipped/errors 计数和耗时
+                error VARCHAR, -- 任务失败或中断的原因
                 PRIMARY KEY (id)
             );
         """)
+        # 旧库升级：后台导入任务新增的列
+        conn.execute("ALTER TABLE import_batches ADD COLUMN IF NOT EXISTS summary VARCHAR")
+        conn.execute("ALTER TABLE import_batches ADD COLUMN IF NOT EXISTS error VARCHAR")
 
         # 2. 导入行记录表
         conn.execute("""
@@ -101,18 +271,361 @@ def init_duckdb():
         logger.error(f"初始化 DuckDB 失败: {e}")
         raise
 
-def insert_log_entry(conn, timestamp, process_pid, process_name, config_file, log_type, message):
+def _migrate_legacy_telegraf_logs(conn, legacy_columns):
     """
-    向 DuckDB 插入一条日志记录。
-    接受一个已存在的连接对象。
+    将旧版 telegraf_logs (每行重复保存 process_name / config_file / log_type 字符串) 迁移为紧凑结构：
+    名称和路径写入 log_sources，按 PID 和时间用 ASOF JOIN 关联到 process_runs，级别和类型转为 ENUM。
+    整个迁移在一个事务中完成，完成后执行 CHECKPOINT 回收旧表空间。
     """
+    logger.info("正在将 telegraf_logs 迁移为字典编码的紧凑结构...")
+    conn.execute("BEGIN TRANSACTION")
     try:
+        for column in ('level', 'plugin'):
+            if column not in legacy_columns:
+                conn.execute(f"ALTER TABLE telegraf_logs ADD COLUMN {column} VARCHAR")
+        if conn.execute("SELECT count(*) FROM process_runs").fetchone()[0] == 0:
+            # PID 会被复用：同一 PID 的日志遇到 Telegraf 启动消息、进程名变化或超过 LOG_RUN_GAP_SECONDS 的间隔时
+            # 视为新的一次运行（同一时刻的多行不拆分，保证 (process_pid, start_time) 唯一）
+            conn.execute("""
+                INSERT INTO process_runs (process_pid, start_time, stop_time, last_seen, process_name, config_file, log_count, status)
+                WITH marked AS (
+                    SELECT coalesce(process_pid, 0) AS process_pid, timestamp, process_name, config_file,
+                           CASE WHEN lag(timestamp) OVER w IS NULL THEN 1
+                                WHEN timestamp > lag(timestamp) OVER w
+                                     AND (message LIKE '%Starting Telegraf%'
+                                          OR process_name IS DISTINCT FROM lag(process_name) OVER w
+                                          OR timestamp - lag(timestamp) OVER w > to_seconds(?)) THEN 1
+                                ELSE 0 END AS run_start
+                    FROM telegraf_logs
+                    WHERE timestamp IS NOT NULL
+                    WINDOW w AS (PARTITION BY coalesce(process_pid, 0)
+                                 ORDER BY timestamp, message NOT LIKE '%Starting Telegraf%', message)
+                ), numbered AS (
+                    SELECT *, sum(run_start) OVER (PARTITION BY process_pid ORDER BY timestamp, run_start DESC
+                                                   ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW) AS run_seq
+                    FROM marked
+                )
+                SELECT process_pid, min(timestamp), max(timestamp), max(timestamp),
+                       arg_min(process_name, timestamp), arg_min(config_file, timestamp), count(*), 'stopped'
+                FROM numbered
+                GROUP BY process_pid, run_seq
+            """, [LOG_RUN_GAP_SECONDS])
         conn.execute("""
-            INSERT INTO telegraf_logs (timestamp, process_pid, process_name, config_file, log_type, message)
-            VALUES (?, ?, ?, ?, ?, ?);
-        """, (timestamp, process_pid, process_name, config_file, log_type, message))
-    except Exception as e:
-        logger.error(f"插入日志到 DuckDB 失败: {e}")
+            INSERT INTO log_sources (process_name, config_file)
+            SELECT DISTINCT coalesce(process_name, ''), coalesce(config_file, '')
+            FROM telegraf_logs
+            ORDER BY 1, 2
+        """)
+        # 旧版逐行写入时未解析级别和插件，从消息中补齐，之后的汇总表回填才能统计到错误和警告
+        conn.execute(f"""
+            CREATE TABLE telegraf_logs_compact AS
+            SELECT l.timestamp, l.process_pid, r.id AS run_id, s.id AS source_id,
+                   TRY_CAST(l.log_type AS log_type_enum) AS log_type,
+                   TRY_CAST(coalesce(l.level, {LOG_LEVEL_SQL.format(column='l.message')}) AS log_level) AS level,
+                   coalesce(l.plugin, {LOG_PLUGIN_SQL.format(column='l.message')}) AS plugin, l.message
+            FROM telegraf_logs l
+            ASOF LEFT JOIN process_runs r
+                ON coalesce(l.process_pid, 0) = r.process_pid AND l.timestamp >= r.start_time
+            LEFT JOIN log_sources s
+                ON s.process_name = coalesce(l.process_name, '') AND s.config_file = coalesce(l.config_file, '')
+            ORDER BY l.timestamp
+        """)
+        conn.execute("DROP TABLE telegraf_logs")
+        conn.execute("ALTER TABLE telegraf_logs_compact RENAME TO telegraf_logs")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("CHECKPOINT")
+    logger.info("telegraf_logs 迁移完成")
+
+def _migrate_audit_log_to_utc(conn):
+    """
+    把本地时间的审计记录转换为 UTC，并把列默认值改为 UTC 时间；列默认值同时作为迁移完成的标记，只执行一次。
+    本地时间按 DuckDB 会话时区（即服务器时区）解释。
+    """
+    logger.info("正在将 audit_log 时间转换为 UTC...")
+    conn.execute("BEGIN TRANSACTION")
+    try:
+        conn.execute("UPDATE audit_log SET timestamp = timezone('UTC', timestamp::TIMESTAMPTZ)")
+        conn.execute("ALTER TABLE audit_log ALTER COLUMN timestamp SET DEFAULT timezone('UTC', now())")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+# Telegraf 日志行格式: "2024-08-27T10:00:00Z E! [inputs.cpu] message"
+# 从 {column} 中提取级别和插件的 SQL 表达式，与 LOG_PARSE_SELECT 中的规则一致
+LOG_LEVEL_SQL = r"nullif(regexp_extract({column}, '^\S+\s+([EWID])!\s', 1), '')"
+LOG_PLUGIN_SQL = r"nullif(regexp_extract({column}, '^\S+\s+[EWID]!\s+\[([^\]]+)\]', 1), '')"
+LOG_LINE_PATTERN = re.compile(r'^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?)Z?\s+([EWID])!\s+(?:\[([^\]]+)\])?')
+
+def parse_log_line(message):
+    """
+    解析 Telegraf 日志行，返回 (timestamp, level, plugin)，无法解析的部分为 None。
+    与 LOG_PARSE_SELECT 中的 SQL 解析规则保持一致。
+    """
+    match = LOG_LINE_PATTERN.match(message)
+    if not match:
+        return None, None, None
+    try:
+        timestamp = datetime.fromisoformat(match.group(1))
+    except ValueError:
+        timestamp = None
+    return timestamp, match.group(2), match.group(3)
+
+# 在 SQL 中解析整个日志文件：read_csv 以单列方式读取每一行（禁用分隔符、引号和转义），
+# 单线程读取保证 line_no 即文件中的行号；无时间戳的续行沿用上一条带时间戳的行，文件开头的续行沿用其后第一条
+# 带时间戳的行，整个文件都没有时间戳时才使用传入的兜底时间。
+# 参数顺序: 文件路径, 兜底时间, pid, 进程名, 配置文件, 日志类型
+LOG_PARSE_SELECT = r"""
+    WITH raw AS (
+        SELECT row_number() OVER () AS line_no, trim(line) AS message
+        FROM read_csv(?, columns={'line': 'VARCHAR'}, header=false, delim=chr(0),
+                      quote='', escape='', auto_detect=false, parallel=false)
+    ), parsed AS (
+        SELECT
+            line_no,
+            message,
+            TRY_CAST(regexp_extract(message, '^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?)Z?\s', 1) AS TIMESTAMP) AS ts,
+            nullif(regexp_extract(message, '^\S+\s+([EWID])!\s', 1), '') AS level,
+            nullif(regexp_extract(message, '^\S+\s+[EWID]!\s+\[([^\]]+)\]', 1), '') AS plugin
+        FROM raw
+        WHERE message IS NOT NULL AND message <> ''
+    )
+    SELECT
+        coalesce(last_value(ts IGNORE NULLS) OVER (ORDER BY line_no ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW),
+                 first_value(ts IGNORE NULLS) OVER (ORDER BY line_no ROWS BETWEEN CURRENT ROW AND UNBOUNDED FOLLOWING),
+                 ?::TIMESTAMP) AS timestamp,
+        ?::INTEGER AS process_pid,
+        ?::VARCHAR AS process_name,
+        ?::VARCHAR AS config_file,
+        ?::VARCHAR AS log_type,
+        message,
+        level,
+        plugin,
+        line_no
+    FROM parsed
+    ORDER BY line_no
+"""
+
+# 将一批日志行按 (pid, 分钟) 聚合成汇总行，{source} 为日志行来源表
+LOG_ROLLUP_SELECT = """
+    SELECT
+        coalesce(process_pid, 0) AS process_pid,
+        date_trunc('minute', timestamp) AS minute,
+        any_value(process_name) AS process_name,
+        count(*) FILTER (WHERE level = 'E') AS error_count,
+        count(*) FILTER (WHERE level = 'W') AS warn_count,
+        count(*) FILTER (WHERE level = 'I') AS info_count,
+        count(*) FILTER (WHERE level = 'D') AS debug_count,
+        count(*) AS line_count,
+        coalesce(sum(strlen(message)), 0) AS bytes
+    FROM {source}
+    WHERE timestamp IS NOT NULL
+    GROUP BY ALL
+"""
+
+# 消息归一化规则 (正则, 替换, 标志)：依次去掉行首时间戳，掩码引号内容、UUID、OPC UA 节点、IP[:端口]、十六进制和数字
+LOG_NORMALIZE_RULES = [
+    (r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d+)?Z?\s+', '', ''),
+    ('"[^"]*"|\'[^\']*\'', '<str>', 'g'),
+    (r'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}', '<uuid>', 'g'),
+    (r'ns=\d+;[sigb]=[^\s,;\]\)]+', '<node>', 'g'),
+    (r'\b\d{1,3}(\.\d{1,3}){3}(:\d+)?\b', '<ip>', 'g'),
+    (r'\b0x[0-9a-fA-F]+\b', '<hex>', 'g'),
+    (r'(^|[^A-Za-z_<])\d+(\.\d+)?', '\\1<num>', 'g'),
+]
+
+def _log_pattern_sql(column='message'):
+    """生成对 column 依次应用 LOG_NORMALIZE_RULES 的 SQL 表达式"""
+    expr = column
+    for pattern, replacement, flags in LOG_NORMALIZE_RULES:
+        pattern = pattern.replace("'", "''")
+        expr = f"regexp_replace({expr}, '{pattern}', '{replacement}'" + (f", '{flags}')" if flags else ")")
+    return expr
+
+LOG_PATTERN_EXPR = _log_pattern_sql()
+
+def ingest_log_rows(conn, source_sql, params=None, close_runs=False, order_by='line_no'):
+    """
+    在一个事务中将 source_sql 产出的日志行写入 telegraf_logs，并同步累加分钟级汇总表、指纹表和进程运行记录。
+    先维护运行记录和 log_sources，日志行只保存 run_id / source_id 而不重复保存名称字符串。
+    启用去重 (LOG_DEDUP_MAX_PER_WINDOW > 0) 时，每个指纹每个窗口只写入前 K 条原始日志，
+    汇总表仍按全部行计数。close_runs 为 True 时（归档已结束进程的日志）写入后即结束对应的运行记录。
+    source_sql 的列需与 telegraf_logs_expanded 视图同名，另外提供 order_by 引用的列（默认 line_no）确定行的先后顺序。
+    返回接收的行数。
+    """
+    conn.execute("BEGIN TRANSACTION")
+    try:
+        conn.execute(f"CREATE OR REPLACE TEMP TABLE staged_logs AS "
+                     f"SELECT row_number() OVER (ORDER BY {order_by}) AS staged_row, * FROM ({source_sql})", params or [])
+        # 为每行计算指纹及其在窗口内的序号（含此前批次已计入的数量）
+        conn.execute(f"""
+            CREATE OR REPLACE TEMP TABLE staged_fingerprints AS
+            WITH fp AS (
+                SELECT
+                    staged_row,
+                    coalesce(process_pid, 0) AS fp_pid,
+                    md5(coalesce(level, '') || ':' || pattern) AS fingerprint,
+                    pattern, level, message, timestamp,
+                    time_bucket(to_seconds(?), timestamp) AS window_start
+                FROM (SELECT *, {LOG_PATTERN_EXPR} AS pattern FROM staged_logs)
+            )
+            SELECT
+                fp.*,
+                row_number() OVER (PARTITION BY fp.fp_pid, fp.fingerprint, fp.window_start ORDER BY fp.timestamp, fp.staged_row)
+                    + CASE WHEN f.window_start = fp.window_start THEN f.window_count ELSE 0 END AS window_seq
+            FROM fp
+            LEFT JOIN telegraf_log_fingerprints f ON f.process_pid = fp.fp_pid AND f.fingerprint = fp.fingerprint
+        """, [LOG_DEDUP_WINDOW_SECONDS])
+        # 累加到该 PID 当前未结束的运行记录，没有则以本批最早时间为起点新建
+        conn.execute("""
+            CREATE OR REPLACE TEMP TABLE staged_runs AS
+            SELECT coalesce(process_pid, 0) AS process_pid, min(timestamp) AS first_seen, max(timestamp) AS last_seen,
+                   any_value(process_name) AS process_name, any_value(config_file) AS config_file, count(*) AS log_count
+            FROM staged_logs
+            WHERE timestamp IS NOT NULL
+            GROUP BY coalesce(process_pid, 0)
+        """)
+        conn.execute("""
+            UPDATE process_runs SET
+                last_seen = greatest(process_runs.last_seen, b.last_seen),
+                log_count = process_runs.log_count + b.log_count
+            FROM staged_runs b
+            WHERE process_runs.process_pid = b.process_pid AND process_runs.stop_time IS NULL
+        """)
+        conn.execute("""
+            INSERT INTO process_runs (process_pid, start_time, last_seen, process_name, config_file, log_count, status)
+            SELECT b.process_pid, b.first_seen, b.last_seen, b.process_name, b.config_file, b.log_count, 'running'
+            FROM staged_runs b
+            WHERE NOT EXISTS (
+                SELECT 1 FROM process_runs r WHERE r.process_pid = b.process_pid AND r.stop_time IS NULL
+            )
+            ON CONFLICT (process_pid, start_time) DO UPDATE SET
+                last_seen = greatest(last_seen, excluded.last_seen),
+                log_count = log_count + excluded.log_count
+        """)
+        # 名称和路径只在 log_sources 中保存一次，日志行引用其 ID 和所属运行记录的 ID
+        conn.execute("""
+            INSERT INTO log_sources (process_name, config_file)
+            SELECT DISTINCT coalesce(process_name, ''), coalesce(config_file, '')
+            FROM staged_logs s
+            WHERE NOT EXISTS (
+                SELECT 1 FROM log_sources x
+                WHERE x.process_name = coalesce(s.process_name, '') AND x.config_file = coalesce(s.config_file, '')
+            )
+        """)
+        dedup_join, dedup_params = "", []
+        if LOG_DEDUP_MAX_PER_WINDOW > 0:
+            dedup_join = "JOIN staged_fingerprints f ON s.staged_row = f.staged_row AND f.window_seq <= ?"
+            dedup_params = [LOG_DEDUP_MAX_PER_WINDOW]
+        conn.execute(f"""
+            INSERT INTO telegraf_logs (timestamp, process_pid, run_id, source_id, log_type, level, plugin, message)
+            SELECT s.timestamp, s.process_pid, r.run_id, src.id,
+                   TRY_CAST(s.log_type AS log_type_enum), TRY_CAST(s.level AS log_level), s.plugin, s.message
+            FROM staged_logs s
+            {dedup_join}
+            LEFT JOIN (
+                SELECT process_pid, max(id) AS run_id FROM process_runs WHERE stop_time IS NULL GROUP BY process_pid
+            ) r ON r.process_pid = coalesce(s.process_pid, 0)
+            LEFT JOIN log_sources src
+                ON src.process_name = coalesce(s.process_name, '') AND src.config_file = coalesce(s.config_file, '')
+            ORDER BY s.staged_row
+        """, dedup_params)
+        conn.execute("""
+            INSERT INTO telegraf_log_fingerprints
+            SELECT
+                fp_pid, fingerprint, any_value(level), any_value(pattern), arg_min(message, timestamp),
+                count(*), count(*) FILTER (WHERE ? > 0 AND window_seq > ?),
+                min(timestamp), max(timestamp),
+                max(latest_window), coalesce(max(window_seq) FILTER (WHERE window_start = latest_window), 0)
+            FROM (
+                SELECT *, max(window_start) OVER (PARTITION BY fp_pid, fingerprint) AS latest_window
+                FROM staged_fingerprints
+            )
+            GROUP BY fp_pid, fingerprint
+            ON CONFLICT (process_pid, fingerprint) DO UPDATE SET
+                occurrences = occurrences + excluded.occurrences,
+                suppressed_count = suppressed_count + excluded.suppressed_count,
+                first_seen = least(first_seen, excluded.first_seen),
+                last_seen = greatest(last_seen, excluded.last_seen),
+                window_count = CASE WHEN excluded.window_start >= window_start OR window_start IS NULL
+                                    THEN excluded.window_count ELSE window_count END,
+                window_start = CASE WHEN excluded.window_start >= window_start OR window_start IS NULL
+                                    THEN excluded.window_start ELSE window_start END
+        """, [LOG_DEDUP_MAX_PER_WINDOW, LOG_DEDUP_MAX_PER_WINDOW])
+        conn.execute(f"""
+            INSERT INTO telegraf_log_rollups {LOG_ROLLUP_SELECT.format(source='staged_logs')}
+            ON CONFLICT (process_pid, minute) DO UPDATE SET
+                process_name = excluded.process_name,
+                error_count = error_count + excluded.error_count,
+                warn_count = warn_count + excluded.warn_count,
+                info_count = info_count + excluded.info_count,
+                debug_count = debug_count + excluded.debug_count,
+                line_count = line_count + excluded.line_count,
+                bytes = bytes + excluded.bytes
+        """)
+        if close_runs:
+            conn.execute("""
+                UPDATE process_runs SET stop_time = last_seen, status = 'stopped'
+                WHERE stop_time IS NULL AND process_pid IN (SELECT process_pid FROM staged_runs)
+            """)
+        rows = conn.execute("SELECT count(*) FROM staged_logs").fetchone()[0]
+        conn.execute("DROP TABLE staged_runs")
+        conn.execute("DROP TABLE staged_fingerprints")
+        conn.execute("DROP TABLE staged_logs")
+        conn.execute("COMMIT")
+        return rows
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+def insert_log_batch(conn, entries):
+    """
+    向 DuckDB 批量插入日志记录。
+    entries 为 (timestamp, process_pid, process_name, config_file, log_type, message) 元组列表，
+    日志行自带时间戳时优先使用，否则使用传入的接收时间（统一按 UTC 存储）。
+    """
+    if not entries:
+        return 0
+    rows = []
+    for timestamp, process_pid, process_name, config_file, log_type, message in entries:
+        line_timestamp, level, plugin = parse_log_line(message)
+        if line_timestamp is None:
+            line_timestamp = timestamp
+            if line_timestamp is not None and line_timestamp.tzinfo is not None:
+                line_timestamp = line_timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+        rows.append((line_timestamp, process_pid, process_name, config_file, log_type, message, level, plugin))
+    log_batch = pd.DataFrame(rows, columns=['timestamp', 'process_pid', 'process_name', 'config_file',
+                                            'log_type', 'message', 'level', 'plugin'])
+    log_batch['line_no'] = range(len(rows))
+    conn.register('log_batch', log_batch)
+    try:
+        # 显式转换类型：整列为 None 时 DuckDB 无法从 DataFrame 推断出 VARCHAR
+        return ingest_log_rows(conn, """
+            SELECT timestamp::TIMESTAMP AS timestamp, process_pid::INTEGER AS process_pid,
+                   process_name::VARCHAR AS process_name, config_file::VARCHAR AS config_file,
+                   log_type::VARCHAR AS log_type, message::VARCHAR AS message,
+                   level::VARCHAR AS level, plugin::VARCHAR AS plugin, line_no
+            FROM log_batch
+        """)
+    finally:
+        conn.unregister('log_batch')
+
+def file_mtime_utc(path):
+    """文件修改时间，按日志表的约定转为不带时区的 UTC 时间"""
+    return datetime.fromtimestamp(os.path.getmtime(path), timezone.utc).replace(tzinfo=None)
+
+def bulk_load_log_file(conn, log_file_path, process_pid, process_name, config_file, log_type, fallback_timestamp=None):
+    """
+    用一条 INSERT ... SELECT 将整个日志文件载入 telegraf_logs，时间戳、级别和插件在 SQL 中解析。
+    返回写入的行数。
+    """
+    if fallback_timestamp is None:
+        fallback_timestamp = file_mtime_utc(log_file_path)
+    params = [log_file_path, fallback_timestamp, process_pid, process_name, config_file, log_type]
+    return ingest_log_rows(conn, LOG_PARSE_SELECT, params, close_runs=True)
 
 def get_process_logs(pid, limit=500, log_type=None):
     """
@@ -120,10 +633,10 @@ def get_process_logs(pid, limit=500, log_type=None):
     """
     try:
         conn = get_duckdb_connection()
-        query = "SELECT timestamp, log_type, message FROM telegraf_logs WHERE process_pid = ?"
+        query = "SELECT timestamp, log_type::VARCHAR, message FROM telegraf_logs WHERE process_pid = ?"
         params = [pid]
         if log_type and log_type != 'all':
-            query += " AND log_type = ?"
+            query += " AND log_type::VARCHAR = ?"
             params.append(log_type)
         query += " ORDER BY timestamp DESC LIMIT ?"
         params.append(limit)
@@ -139,52 +652,329 @@ def get_process_logs(pid, limit=500, log_type=None):
         logger.error(f"从 DuckDB 查询日志失败: {e}")
         return {'success': False, 'error': str(e)}
 
-def get_historical_processes_from_logs():
+def get_log_rates(since, process_pid=None, include_series=False):
     """
-    从 DuckDB 的日志中聚合历史进程信息。
+    从分钟级汇总表查询 since 之后各进程的日志级别计数，可选返回逐分钟序列。
+    查询代价只与进程数和时间窗口有关，与原始日志量无关。
     """
     try:
         conn = get_duckdb_connection()
-        query = """
-            SELECT 
-                process_pid, 
-                FIRST(process_name) as process_name, 
-                FIRST(config_file) as config_file, 
-                MIN(timestamp) as start_time, 
-                MAX(timestamp) as stop_time
-            FROM telegraf_logs
+        where_clause = "WHERE minute >= ?"
+        params = [since]
+        if process_pid is not None:
+            where_clause += " AND process_pid = ?"
+            params.append(process_pid)
+
+        totals = conn.execute(f"""
+            SELECT process_pid, arg_max(process_name, minute) AS process_name,
+                   sum(error_count), sum(warn_count), sum(info_count), sum(debug_count),
+                   sum(line_count), sum(bytes), max(minute)
+            FROM telegraf_log_rollups
+            {where_clause}
             GROUP BY process_pid
-            ORDER BY stop_time DESC
+            ORDER BY sum(error_count) DESC, sum(warn_count) DESC
+        """, params).fetchall()
+        series = []
+        if include_series:
+            series = conn.execute(f"""
+                SELECT process_pid, minute, error_count, warn_count, info_count, debug_count, line_count, bytes
+                FROM telegraf_log_rollups
+                {where_clause}
+                ORDER BY process_pid, minute
+            """, params).fetchall()
+        conn.close()
+
+        return {
+            'success': True,
+            'processes': [
+                {
+                    'pid': row[0],
+                    'name': row[1],
+                    'errors': int(row[2]),
+                    'warnings': int(row[3]),
+                    'infos': int(row[4]),
+                    'debugs': int(row[5]),
+                    'lines': int(row[6]),
+                    'bytes': int(row[7]),
+                    'last_minute': row[8].isoformat() if row[8] else None
+                }
+                for row in totals
+            ],
+            'series': [
+                {
+                    'pid': row[0],
+                    'minute': row[1].isoformat(),
+                    'errors': row[2],
+                    'warnings': row[3],
+                    'infos': row[4],
+                    'debugs': row[5],
+                    'lines': row[6],
+                    'bytes': row[7]
+                }
+                for row in series
+            ]
+        }
+    except Exception as e:
+        logger.error(f"从 DuckDB 查询日志速率失败: {e}")
+        return {'success': False, 'error': str(e)}
+
+def get_log_fingerprints(process_pid=None, level=None, since=None, order_by='occurrences', limit=100):
+    """
+    查询日志指纹表，按出现次数或最近出现时间排序。
+    """
+    try:
+        conn = get_duckdb_connection()
+        query = """
+            SELECT process_pid, fingerprint, level, pattern, sample, occurrences, suppressed_count,
+                   first_seen, last_seen
+            FROM telegraf_log_fingerprints
+            WHERE 1 = 1
         """
-        historical_processes = conn.execute(query).fetchall()
+        params = []
+        if process_pid is not None:
+            query += " AND process_pid = ?"
+            params.append(process_pid)
+        if level:
+            query += " AND level = ?"
+            params.append(level)
+        if since is not None:
+            query += " AND last_seen >= ?"
+            params.append(since)
+        order_column = 'last_seen' if order_by == 'last_seen' else 'occurrences'
+        query += f" ORDER BY {order_column} DESC LIMIT ?"
+        params.append(limit)
+
+        rows = conn.execute(query, params).fetchall()
         conn.close()
-        return [
-            {
-                'pid': row[0],
-                'name': row[1],
-                'config_file': row[2],
-                'start_time': row[3].isoformat() if row[3] else None,
-                'stop_time': row[4].isoformat() if row[4] else None,
-                'status': 'stopped' # 默认状态为 stopped
+
+        return {
+            'success': True,
+            'fingerprints': [
+                {
+                    'pid': row[0],
+                    'fingerprint': row[1],
+                    'level': row[2],
+                    'pattern': row[3],
+                    'sample': row[4],
+                    'occurrences': row[5],
+                    'suppressed': row[6],
+                    'first_seen': row[7].isoformat() if row[7] else None,
+                    'last_seen': row[8].isoformat() if row[8] else None
+                }
+                for row in rows
+            ]
+        }
+    except Exception as e:
+        logger.error(f"从 DuckDB 查询日志指纹失败: {e}")
+        return {'success': False, 'error': str(e)}
+
+def open_process_run(conn, process_pid, process_name, config_file, start_time):
+    """
+    登记一次新的进程运行。PID 可能被复用，因此先结束该 PID 遗留的未结束运行记录。
+    写入失败时抛出异常，由调用方（日志管道写入线程）重试；两条语句都可以安全地重复执行。
+    """
+    conn.execute("""
+        UPDATE process_runs SET stop_time = last_seen, status = 'stopped'
+        WHERE process_pid = ? AND stop_time IS NULL
+    """, [process_pid])
+    conn.execute("""
+        INSERT INTO process_runs (process_pid, start_time, last_seen, process_name, config_file, status)
+        VALUES (?, ?, ?, ?, ?, 'running')
+        ON CONFLICT (process_pid, start_time) DO NOTHING
+    """, [process_pid, start_time, start_time, process_name, config_file])
+
+def close_process_run(conn, process_pid, stop_time=None):
+    """
+    进程退出时结束其运行记录，stop_time 缺省为最后一条日志的时间。写入失败时抛出异常，由调用方重试。
+    """
+    conn.execute("""
+        UPDATE process_runs SET stop_time = coalesce(?, last_seen), status = 'stopped'
+        WHERE process_pid = ? AND stop_time IS NULL
+    """, [stop_time, process_pid])
+
+def get_historical_processes_from_logs(page=1, per_page=50):
+    """
+    从进程运行记录表分页查询历史进程信息，按最近活动时间倒序。
+    """
+    try:
+        conn = get_duckdb_connection()
+        total = conn.execute("SELECT count(*) FROM process_runs").fetchone()[0]
+        query = """
+            SELECT id, process_pid, process_name, config_file, start_time,
+                   coalesce(stop_time, last_seen) AS stop_time, status, log_count
+            FROM process_runs
+            ORDER BY coalesce(stop_time, last_seen) DESC, id DESC
+            LIMIT ? OFFSET ?
+        """
+        historical_processes = conn.execute(query, [per_page, (page - 1) * per_page]).fetchall()
+        conn.close()
+        return {
+            'success': True,
+            'items': [
+                {
+                    'run_id': row[0],
+                    'pid': row[1],
+                    'name': row[2],
+                    'config_file': row[3],
+                    'start_time': row[4].isoformat() if row[4] else None,
+                    'stop_time': row[5].isoformat() if row[5] else None,
+                    'status': row[6],
+                    'log_count': row[7]
+                }
+                for row in historical_processes
+            ],
+            'pagination': {
+                'total': total,
+                'page': page,
+                'per_page': per_page,
+                'pages': (total + per_page - 1) // per_page
             }
-            for row in historical_processes
-        ]
+        }
     except Exception as e:
         logger.error(f"从 DuckDB 查询历史进程失败: {e}")
-        return []
+        return {'success': False, 'error': str(e)}
+
+def delete_process_runs(run_ids):
+    """
+    删除指定的进程运行记录及其日志，并从分钟级汇总和指纹中去掉这些日志的计数。
+    汇总和指纹按 PID 而不是按运行记录保存：同一 PID 的其他运行（PID 复用）覆盖的分钟只减去被删除日志的计数，
+    其余分钟整行删除；PID 没有剩余运行记录时删除其全部指纹，否则按被删除的日志减少出现次数，
+    并按剩余日志重新计算首次/最后出现时间。启用去重时未写入日志表的行无法归属到运行，不会从计数中减去。
+    """
+    conn = None
+    try:
+        conn = get_duckdb_connection()
+        placeholders = ','.join(['?'] * len(run_ids))
+        conn.execute("BEGIN TRANSACTION")
+        try:
+            conn.execute(f"""
+                CREATE OR REPLACE TEMP TABLE runs_to_delete AS
+                SELECT id, process_pid, start_time, coalesce(stop_time, last_seen) AS end_time
+                FROM process_runs WHERE id IN ({placeholders})
+            """, run_ids)
+            conn.execute("""
+                CREATE OR REPLACE TEMP TABLE surviving_runs AS
+                SELECT process_pid, date_trunc('minute', start_time) AS first_minute,
+                       coalesce(stop_time, last_seen) AS end_time
+                FROM process_runs
+                WHERE process_pid IN (SELECT process_pid FROM runs_to_delete)
+                  AND id NOT IN (SELECT id FROM runs_to_delete)
+            """)
+            # 删除日志前按写入时的规则计算被删除日志在汇总表和指纹表中的计数
+            deleted_logs = "(SELECT * FROM telegraf_logs_expanded WHERE run_id IN (SELECT id FROM runs_to_delete))"
+            conn.execute(f"CREATE OR REPLACE TEMP TABLE deleted_rollups AS "
+                         f"{LOG_ROLLUP_SELECT.format(source=deleted_logs)}")
+            conn.execute(f"""
+                CREATE OR REPLACE TEMP TABLE deleted_fingerprints AS
+                SELECT coalesce(process_pid, 0) AS process_pid, md5(coalesce(level, '') || ':' || pattern) AS fingerprint,
+                       count(*) AS occurrences
+                FROM (SELECT *, {LOG_PATTERN_EXPR} AS pattern FROM {deleted_logs})
+                GROUP BY ALL
+            """)
+            conn.execute("DELETE FROM telegraf_logs WHERE run_id IN (SELECT id FROM runs_to_delete)")
+
+            conn.execute("""
+                DELETE FROM telegraf_log_rollups USING runs_to_delete r
+                WHERE telegraf_log_rollups.process_pid = r.process_pid
+                  AND telegraf_log_rollups.minute BETWEEN date_trunc('minute', r.start_time) AND r.end_time
+                  AND NOT EXISTS (
+                      SELECT 1 FROM surviving_runs s
+                      WHERE s.process_pid = telegraf_log_rollups.process_pid
+                        AND telegraf_log_rollups.minute BETWEEN s.first_minute AND s.end_time
+                  )
+            """)
+            conn.execute("""
+                UPDATE telegraf_log_rollups SET
+                    error_count = telegraf_log_rollups.error_count - d.error_count,
+                    warn_count = telegraf_log_rollups.warn_count - d.warn_count,
+                    info_count = telegraf_log_rollups.info_count - d.info_count,
+                    debug_count = telegraf_log_rollups.debug_count - d.debug_count,
+                    line_count = telegraf_log_rollups.line_count - d.line_count,
+                    bytes = telegraf_log_rollups.bytes - d.bytes
+                FROM deleted_rollups d
+                WHERE telegraf_log_rollups.process_pid = d.process_pid AND telegraf_log_rollups.minute = d.minute
+            """)
+            conn.execute("""
+                DELETE FROM telegraf_log_rollups USING deleted_rollups d
+                WHERE telegraf_log_rollups.process_pid = d.process_pid AND telegraf_log_rollups.minute = d.minute
+                  AND telegraf_log_rollups.line_count <= 0
+            """)
+
+            conn.execute("""
+                DELETE FROM telegraf_log_fingerprints
+                WHERE process_pid IN (SELECT process_pid FROM runs_to_delete)
+                  AND process_pid NOT IN (SELECT process_pid FROM surviving_runs)
+            """)
+            conn.execute("""
+                UPDATE telegraf_log_fingerprints SET occurrences = telegraf_log_fingerprints.occurrences - d.occurrences
+                FROM deleted_fingerprints d
+                WHERE telegraf_log_fingerprints.process_pid = d.process_pid
+                  AND telegraf_log_fingerprints.fingerprint = d.fingerprint
+            """)
+            conn.execute("""
+                DELETE FROM telegraf_log_fingerprints USING deleted_fingerprints d
+                WHERE telegraf_log_fingerprints.process_pid = d.process_pid
+                  AND telegraf_log_fingerprints.fingerprint = d.fingerprint
+                  AND telegraf_log_fingerprints.occurrences <= 0
+            """)
+            conn.execute(f"""
+                UPDATE telegraf_log_fingerprints SET first_seen = s.first_seen, last_seen = s.last_seen
+                FROM (
+                    SELECT coalesce(process_pid, 0) AS process_pid,
+                           md5(coalesce(level, '') || ':' || pattern) AS fingerprint,
+                           min(timestamp) AS first_seen, max(timestamp) AS last_seen
+                    FROM (
+                        SELECT *, {LOG_PATTERN_EXPR} AS pattern FROM telegraf_logs_expanded
+                        WHERE coalesce(process_pid, 0) IN (SELECT process_pid FROM deleted_fingerprints)
+                    )
+                    GROUP BY ALL
+                ) s
+                JOIN deleted_fingerprints d ON d.process_pid = s.process_pid AND d.fingerprint = s.fingerprint
+                WHERE telegraf_log_fingerprints.process_pid = s.process_pid
+                  AND telegraf_log_fingerprints.fingerprint = s.fingerprint
+            """)
+
+            deleted = conn.execute("SELECT count(*) FROM runs_to_delete").fetchone()[0]
+            conn.execute("DELETE FROM process_runs WHERE id IN (SELECT id FROM runs_to_delete)")
+            for table in ('deleted_fingerprints', 'deleted_rollups', 'surviving_runs', 'runs_to_delete'):
+                conn.execute(f"DROP TABLE {table}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return {'success': True, 'deleted': deleted}
+    except Exception as e:
+        logger.error(f"从 DuckDB 删除进程运行记录失败: {e}")
+        return {'success': False, 'error': str(e)}
+    finally:
+        if conn is not None:
+            conn.close()
 
 def delete_historical_processes(pids):
     """
-    从 DuckDB 删除指定的历史进程日志。
+    从 DuckDB 删除指定的历史进程日志，日志、分钟级汇总、指纹和运行记录在同一事务中删除。
     """
+    conn = None
     try:
         conn = get_duckdb_connection()
-        conn.execute(f"DELETE FROM telegraf_logs WHERE process_pid IN ({','.join(['?'] * len(pids))})", pids)
-        conn.close()
+        placeholders = ','.join(['?'] * len(pids))
+        conn.execute("BEGIN TRANSACTION")
+        try:
+            conn.execute(f"DELETE FROM telegraf_logs WHERE process_pid IN ({placeholders})", pids)
+            conn.execute(f"DELETE FROM telegraf_log_rollups WHERE process_pid IN ({placeholders})", pids)
+            conn.execute(f"DELETE FROM telegraf_log_fingerprints WHERE process_pid IN ({placeholders})", pids)
+            conn.execute(f"DELETE FROM process_runs WHERE process_pid IN ({placeholders})", pids)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
         return {'success': True}
     except Exception as e:
         logger.error(f"从 DuckDB 删除历史进程失败: {e}")
         return {'success': False, 'error': str(e)}
+    finally:
+        if conn is not None:
+            conn.close()
 
 class DatabaseManager:
     """数据库管理器"""
@@ -360,9 +1150,12 @@ class DatabaseManager:
                 try:
                     with self.app.app_context():
                         from models import db, User
+                        from point_search import create_point_search_schema
                         
-                        # 创建所有表
+                        # 创建所有表；全文检索虚拟表和同步触发器不在模型中，与迁移 506b1dd47844 一样单独创建
                         db.create_all()
+                        with db.engine.begin() as connection:
+                            create_point_search_schema(connection)
                         logger.info("已重新创建数据库表结构")
                         
                         # 验证数据库连接
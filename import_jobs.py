@@ -0,0 +1,322 @@
+# -*- coding: utf-8 -*-
+"""
+后台导入任务
+功能：数据点导入在后台线程中执行，进度和失败行写入 DuckDB 的 import_batches / import_log_rows，
+任何工作进程都可以查询进度或取消任务
+作者：项目开发团队
+
+导入引擎每提交一块调用一次进度回调：计数和新增的失败行先缓存在内存中，距上次写入超过 IMPORT_JOB_FLUSH_INTERVAL 秒时
+在一个 DuckDB 事务中批量写入，并读回任务状态。取消请求把状态改为 'cancelling'，任务在下一块开始前停止，
+已提交的块保留。DuckDB 被其他工作进程锁定时缓存保留到下次写入，任务结束时的最终写入按退避重试。
+
+工作进程退出（如 gunicorn 按 max_requests 回收）时，本进程中的任务在当前块提交后停止，标记为 'cancelled'。
+"""
+
+import os
+import json
+import time
+import uuid
+import atexit
+import logging
+import threading
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from models import db
+from audit_logger import audit_logger
+from db_manager import get_duckdb_connection, duckdb_cursor
+
+logger = logging.getLogger(__name__)
+
+# 进度写入 DuckDB 的最小间隔（秒），也是跨进程取消请求的最大响应延迟（另加当前块的耗时）
+IMPORT_JOB_FLUSH_INTERVAL = float(os.environ.get('IMPORT_JOB_FLUSH_INTERVAL', 1.0))
+# 工作进程退出时等待任务停止的最长时间（秒），应小于 gunicorn 的 graceful_timeout
+IMPORT_JOB_SHUTDOWN_TIMEOUT = float(os.environ.get('IMPORT_JOB_SHUTDOWN_TIMEOUT', 20))
+IMPORT_JOB_FINAL_RETRIES = 6
+IMPORT_JOB_RETRY_MAX_DELAY = 8.0  # 秒
+
+JOB_FINISHED_STATUSES = ('completed', 'failed', 'cancelled')
+
+_JOB_COLUMNS = ('id', 'batch_id', 'file_name', 'total_rows', 'processed_rows', 'success_count', 'failed_count',
+                'skipped_count', 'status', 'start_time', 'end_time', 'user_id', 'conflict_rule', 'summary', 'error')
+_SUMMARY_FIELDS = ('total', 'created', 'updated', 'unchanged', 'skipped', 'errors', 'elapsed_seconds', 'rows_per_second')
+
+_jobs = {}  # batch_id -> _ImportJob，本进程中运行的任务
+_jobs_lock = threading.Lock()
+_jobs_pid = os.getpid()
+
+
+class ImportCancelled(Exception):
+    """任务被取消，由进度回调在块之间抛出以中止导入"""
+
+
+def new_batch_id():
+    """导入批次号：秒级时间戳加随机后缀，同一秒内开始的多个任务不会冲突"""
+    return f"batch_{int(datetime.now(timezone.utc).timestamp())}_{uuid.uuid4().hex[:8]}"
+
+
+class _ImportJob:
+    """一个运行中的导入任务：缓存进度和失败行，批量写入 DuckDB"""
+
+    def __init__(self, batch_id, row_id, row_contents=None):
+        self.batch_id = batch_id
+        self.row_id = row_id  # import_batches.id
+        self.row_contents = row_contents or {}
+        self.stop = threading.Event()
+        self.interrupted = False
+        self.summary = None
+        self.started = time.monotonic()
+        self.thread = None
+        self._logged = 0  # 已放入缓存的 error_details 条数
+        self._pending = []
+        self._last_flush = time.monotonic()
+        self._flush_lock = threading.Lock()
+
+    def on_chunk(self, summary):
+        """导入引擎每提交一块后调用；收到取消请求时抛出 ImportCancelled"""
+        self.summary = summary
+        if time.monotonic() - self._last_flush >= IMPORT_JOB_FLUSH_INTERVAL:
+            try:
+                if self.flush() == 'cancelling':
+                    self.stop.set()
+            except Exception as e:
+                # 通常是其他工作进程持有 DuckDB 写锁，缓存保留到下次写入
+                logger.warning(f"写入导入进度失败 (batch {self.batch_id})，稍后重试: {e}")
+        if self.stop.is_set():
+            raise ImportCancelled()
+
+    def _progress(self):
+        summary = self.summary or {}
+        counts = {name: summary.get(name, 0) for name in _SUMMARY_FIELDS}
+        if 'elapsed_seconds' not in summary:
+            elapsed = time.monotonic() - self.started
+            counts['elapsed_seconds'] = round(elapsed, 3)
+            counts['rows_per_second'] = round(counts['total'] / elapsed) if elapsed > 0 else None
+        if 'skipped_sheets' in summary:
+            counts['skipped_sheets'] = summary['skipped_sheets']
+        return counts
+
+    def flush(self, status=None, error=None):
+        """把当前计数、缓存的失败行和最终状态写入 DuckDB，返回写入后的任务状态。失败时缓存保留并抛出异常"""
+        with self._flush_lock:
+            details = (self.summary or {}).get('error_details', [])
+            self._pending.extend(details[self._logged:])
+            self._logged = len(details)
+            rows, self._pending = self._pending, []
+            counts = self._progress()
+            conn = get_duckdb_connection()
+            try:
+                conn.execute("BEGIN TRANSACTION")
+                if rows:
+                    failed_rows = pd.DataFrame({
+                        'row_number': [row['index'] for row in rows],
+                        'row_content': [self._row_content(row) for row in rows],
+                        'details': [row['error'] for row in rows],
+                    })
+                    conn.register('failed_rows', failed_rows)
+                    conn.execute("""
+                        INSERT INTO import_log_rows (batch_id, row_number, row_content, status, details)
+                        SELECT ?::UUID, row_number::INTEGER, row_content::VARCHAR, 'failure', details::VARCHAR
+                        FROM failed_rows
+                    """, [self.row_id])
+                # DuckDB 的 UPDATE ... RETURNING 会按删除再插入执行，与 import_log_rows 的外键冲突，状态单独读取
+                conn.execute("""
+                    UPDATE import_batches
+                    SET processed_rows = ?, success_count = ?, failed_count = ?, skipped_count = ?, summary = ?
+                    WHERE id = ?
+                """, [counts['total'], counts['created'] + counts['updated'] + counts['unchanged'],
+                      counts['errors'], counts['skipped'], json.dumps(counts), self.row_id])
+                if status:
+                    conn.execute("UPDATE import_batches SET status = ?, error = ?, end_time = now() WHERE id = ?",
+                                 [status, error, self.row_id])
+                current = conn.execute("SELECT status FROM import_batches WHERE id = ?", [self.row_id]).fetchone()[0]
+                conn.execute("COMMIT")
+            except Exception:
+                self._pending[:0] = rows
+                raise
+            finally:
+                conn.close()
+            self._last_flush = time.monotonic()
+            return current
+
+    def _row_content(self, row):
+        # JSON 导入记录原始数据，XLSX 导入记录行所在的工作表
+        content = self.row_contents.get(row['index'])
+        if content is None and 'sheet' in row:
+            content = {'sheet': row['sheet']}
+        return None if content is None else json.dumps(content, ensure_ascii=False, default=str)
+
+    def finish(self, status, error=None):
+        """写入最终状态，DuckDB 被锁定时退避重试"""
+        delay = 0.5
+        for attempt in range(IMPORT_JOB_FINAL_RETRIES):
+            try:
+                self.flush(status, error)
+                return
+            except Exception as e:
+                logger.warning(f"写入导入任务最终状态失败 (batch {self.batch_id})，{delay:.1f} 秒后重试: {e}")
+                time.sleep(delay)
+                delay = min(delay * 2, IMPORT_JOB_RETRY_MAX_DELAY)
+        logger.error(f"导入任务 {self.batch_id} 的最终状态 ({status}) 未能写入 DuckDB")
+
+
+def _create_batch(batch_id, file_name, total_rows, user_id, conflict_rule):
+    conn = get_duckdb_connection()
+    try:
+        return conn.execute("""
+            INSERT INTO import_batches (batch_id, file_name, total_rows, user_id, conflict_rule, status)
+            VALUES (?, ?, ?, ?, ?, 'processing') RETURNING id
+        """, [batch_id, file_name, total_rows, None if user_id is None else str(user_id), conflict_rule]).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def start_import_job(app, run, file_name, total_rows, conflict_rule, user_id, username, ip_address,
+                     row_contents=None, on_finish=None):
+    """
+    创建导入批次记录，在后台线程（应用上下文中）执行 run(batch_id, on_chunk)，立即返回 batch_id。
+
+    参数:
+        run: 调用导入引擎（import_points_file / bulk_upsert_points）并返回其 summary 的函数，
+             须把 on_chunk 传给导入引擎
+        total_rows: 总行数，未知时可为估计值或 None，任务结束时以实际处理行数为准
+        username / ip_address: 任务结束时写入审计日志
+        row_contents: {行号: 原始内容}，失败行的内容随错误一起记录
+        on_finish: 任务结束后调用 on_finish(status)，如删除暂存文件
+
+    DuckDB 不可写时抛出异常，任务不会启动。
+    """
+    batch_id = new_batch_id()
+    row_id = _create_batch(batch_id, file_name, total_rows, user_id, conflict_rule)
+    job = _ImportJob(batch_id, row_id, row_contents)
+    job.thread = threading.Thread(target=_run_job, args=(app, job, run, file_name, username, ip_address, on_finish),
+                                  name=f"import-{batch_id}", daemon=True)
+    _register(job)
+    job.thread.start()
+    return batch_id
+
+
+def _register(job):
+    global _jobs_pid
+    with _jobs_lock:
+        if _jobs_pid != os.getpid():
+            # fork 出的工作进程不继承父进程的线程
+            _jobs.clear()
+            _jobs_pid = os.getpid()
+        _jobs[job.batch_id] = job
+
+
+def _run_job(app, job, run, file_name, username, ip_address, on_finish):
+    status, error = 'failed', None
+    try:
+        with app.app_context():
+            try:
+                job.summary = run(job.batch_id, job.on_chunk)
+                status = 'completed'
+            except ImportCancelled:
+                db.session.rollback()
+                status = 'cancelled'
+                if job.interrupted:
+                    error = 'Interrupted: worker process is shutting down'
+            except Exception as e:
+                db.session.rollback()
+                logger.exception(f"导入任务 {job.batch_id} 失败")
+                error = str(e)
+            job.finish(status, error)
+            if on_finish:
+                on_finish(status)
+    except Exception as e:
+        logger.error(f"导入任务 {job.batch_id} 收尾失败: {e}")
+    finally:
+        with _jobs_lock:
+            _jobs.pop(job.batch_id, None)
+
+    counts = job._progress()
+    audit_status = {'completed': 'success' if counts['errors'] == 0 else 'partial_failure'}.get(status, 'failure')
+    audit_logger.log(username, ip_address, 'import_data', audit_status,
+                     f"Import {status}. Batch: {job.batch_id}, file: {file_name}, rows: {counts['total']}, "
+                     f"created: {counts['created']}, updated: {counts['updated']}, unchanged: {counts['unchanged']}, "
+                     f"skipped: {counts['skipped']}, errors: {counts['errors']}, elapsed: {counts['elapsed_seconds']}s"
+                     + (f", error: {error}" if error else ""))
+
+
+def _job_dict(row):
+    job = dict(zip(_JOB_COLUMNS, row))
+    job['id'] = str(job['id'])
+    job['summary'] = json.loads(job['summary']) if job['summary'] else None
+    for name in ('start_time', 'end_time'):
+        if job[name] is not None:
+            job[name] = job[name].isoformat()
+    total, processed = job['total_rows'], job['processed_rows'] or 0
+    if job['status'] == 'completed':
+        job['progress'] = 100.0
+    else:
+        job['progress'] = round(min(processed * 100.0 / total, 100.0), 1) if total else None
+    job['finished'] = job['status'] in JOB_FINISHED_STATUSES
+    return job
+
+
+def get_import_job(batch_id):
+    """返回任务的状态和进度，不存在时抛出 LookupError"""
+    with duckdb_cursor() as cur:
+        row = cur.execute(f"SELECT {', '.join(_JOB_COLUMNS)} FROM import_batches WHERE batch_id = ?",
+                          [batch_id]).fetchone()
+    if row is None:
+        raise LookupError(f"Import job {batch_id} not found")
+    return _job_dict(row)
+
+
+def list_import_jobs(limit=20):
+    """最近开始的导入任务"""
+    with duckdb_cursor() as cur:
+        rows = cur.execute(f"SELECT {', '.join(_JOB_COLUMNS)} FROM import_batches ORDER BY start_time DESC LIMIT ?",
+                           [limit]).fetchall()
+    return [_job_dict(row) for row in rows]
+
+
+def get_import_job_errors(job, page, per_page):
+    """按行号分页返回任务的失败行，返回 (行列表, 总数)"""
+    with duckdb_cursor() as cur:
+        total = cur.execute("SELECT count(*) FROM import_log_rows WHERE batch_id = ?::UUID AND status = 'failure'",
+                            [job['id']]).fetchone()[0]
+        rows = cur.execute("""
+            SELECT row_number, row_content, details FROM import_log_rows
+            WHERE batch_id = ?::UUID AND status = 'failure'
+            ORDER BY row_number LIMIT ? OFFSET ?
+        """, [job['id'], per_page, (page - 1) * per_page]).fetchall()
+    errors = [{'row': row_number, 'content': json.loads(content) if content else None, 'error': details}
+              for row_number, content, details in rows]
+    return errors, total
+
+
+def cancel_import_job(batch_id):
+    """
+    请求取消任务：状态为 processing 时改为 cancelling，由执行任务的工作进程在下一块之前停止。
+    返回任务的当前状态，不存在时抛出 LookupError。
+    """
+    with duckdb_cursor() as cur:
+        cur.execute("UPDATE import_batches SET status = 'cancelling' WHERE batch_id = ? AND status = 'processing'",
+                    [batch_id])
+    with _jobs_lock:
+        job = _jobs.get(batch_id) if _jobs_pid == os.getpid() else None
+    if job is not None:
+        job.stop.set()
+    return get_import_job(batch_id)
+
+
+def shutdown_import_jobs(timeout=IMPORT_JOB_SHUTDOWN_TIMEOUT):
+    """进程退出时调用：让本进程中的任务在当前块提交后停止并写入最终状态，超时后放弃"""
+    with _jobs_lock:
+        jobs = list(_jobs.values()) if _jobs_pid == os.getpid() else []
+    deadline = time.monotonic() + timeout
+    for job in jobs:
+        job.interrupted = True
+        job.stop.set()
+    for job in jobs:
+        job.thread.join(max(deadline - time.monotonic(), 0))
+        if job.thread.is_alive():
+            logger.error(f"进程退出时导入任务 {job.batch_id} 仍未停止")
+
+
+atexit.register(shutdown_import_jobs)
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+导入文件暂存
+功能：上传的导入文件保存在服务器端的暂存目录中，以 upload_id 引用，预览和执行导入时直接读取暂存文件，
+文件内容不再在浏览器和服务器之间往返
+作者：项目开发团队
+
+每个暂存项是 IMPORT_STAGING_DIR 下以 upload_id 命名的目录，包含原始文件 data 和元数据 meta.json。
+暂存目录在多个 gunicorn 工作进程之间共享。超过 IMPORT_STAGING_TTL 秒未被访问的暂存项在每次上传时自动清理，
+预览和导入会刷新访问时间。
+"""
+
+import os
+import json
+import uuid
+import time
+import codecs
+import shutil
+import logging
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+IMPORT_STAGING_DIR = os.environ.get('IMPORT_STAGING_DIR', os.path.join(tempfile.gettempdir(), 'telegraf_import_staging'))
+# 暂存项在最后一次访问后保留的时间（秒）
+IMPORT_STAGING_TTL = int(os.environ.get('IMPORT_STAGING_TTL', 3600))
+IMPORT_STAGING_READ_SIZE = 1024 * 1024
+
+_DATA_FILE = 'data'
+_META_FILE = 'meta.json'
+
+
+def _stage_dir(upload_id):
+    # upload_id 由服务器生成（uuid4 hex），其他格式一律视为不存在，避免路径穿越
+    try:
+        if uuid.UUID(hex=upload_id).hex != upload_id:
+            raise ValueError
+    except (TypeError, ValueError):
+        raise LookupError(f"Upload {upload_id} not found or expired")
+    return os.path.join(IMPORT_STAGING_DIR, upload_id)
+
+
+def create_stage(stream, filename, user_id, describe, text=True):
+    """
+    把上传的文件流分块写入新的暂存目录，text 为 True 时写入时校验 UTF-8 编码。
+    describe(path) 返回合并到元数据中的字典（如表头），解析失败时抛出异常，暂存项随之删除。返回元数据字典。
+    """
+    collect_expired_stages()
+    upload_id = uuid.uuid4().hex
+    stage_dir = os.path.join(IMPORT_STAGING_DIR, upload_id)
+    os.makedirs(stage_dir)
+    path = os.path.join(stage_dir, _DATA_FILE)
+    try:
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        size = 0
+        with open(path, 'wb') as f:
+            while True:
+                block = stream.read(IMPORT_STAGING_READ_SIZE)
+                if not block:
+                    break
+                if text:
+                    decoder.decode(block)
+                f.write(block)
+                size += len(block)
+        decoder.decode(b'', final=True)
+        meta = {
+            'upload_id': upload_id,
+            'filename': filename,
+            **describe(path),
+            'size_bytes': size,
+            'user_id': user_id,
+            'created_at': time.time(),
+        }
+        with open(os.path.join(stage_dir, _META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+    except Exception:
+        shutil.rmtree(stage_dir, ignore_errors=True)
+        raise
+    return meta
+
+
+def get_stage(upload_id, user_id):
+    """
+    返回暂存项的元数据（含 path），并刷新访问时间。不存在、已过期或不属于该用户时抛出 LookupError。
+    """
+    stage_dir = _stage_dir(upload_id)
+    try:
+        with open(os.path.join(stage_dir, _META_FILE), encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        raise LookupError(f"Upload {upload_id} not found or expired")
+    if meta.get('user_id') != user_id:
+        raise LookupError(f"Upload {upload_id} not found or expired")
+    os.utime(stage_dir)
+    meta['path'] = os.path.join(stage_dir, _DATA_FILE)
+    return meta
+
+
+def delete_stage(upload_id):
+    """删除暂存项，不存在时忽略"""
+    shutil.rmtree(_stage_dir(upload_id), ignore_errors=True)
+
+
+def collect_expired_stages(ttl=None):
+    """删除超过 ttl 秒（默认 IMPORT_STAGING_TTL）未被访问的暂存项，返回删除数量"""
+    ttl = IMPORT_STAGING_TTL if ttl is None else ttl
+    if not os.path.isdir(IMPORT_STAGING_DIR):
+        os.makedirs(IMPORT_STAGING_DIR, exist_ok=True)
+        return 0
+    deadline = time.time() - ttl
+    removed = 0
+    for entry in os.scandir(IMPORT_STAGING_DIR):
+        try:
+            if entry.is_dir() and entry.stat().st_mtime < deadline:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+        except FileNotFoundError:
+            # 其他工作进程同时清理
+            continue
+    if removed:
+        logger.info(f"Removed {removed} expired import stages from {IMPORT_STAGING_DIR}")
+    return removed
@@ -0,0 +1,391 @@
+# -*- coding: utf-8 -*-
+"""
+Telegraf 日志写入管道
+
+尾随线程 (每个进程一个) 只负责读取日志文件并放入有界队列，
+唯一的写入线程持有 DuckDB 连接，从队列中取出日志并分批写入。
+DuckDB 写入卡顿 (检查点、锁竞争) 时队列被填满，此时按过载策略处理：
+
+- block: 尾随线程阻塞等待，日志不丢失，积压留在日志文件中 (表现为字节延迟)
+- drop_debug_first: 队列水位超过高水位线时丢弃 D! 日志，队列满时再丢弃 I! 日志，E!/W! 始终阻塞等待
+- sample: 队列水位超过高水位线时 D!/I! 及无级别日志每 N 行只保留 1 行，E!/W! 始终阻塞等待
+
+每个进程的读取、写入、丢弃计数以及字节/秒级延迟由 get_stats() 返回。
+"""
+
+import os
+import time
+import queue
+import logging
+import atexit
+import threading
+from collections import deque
+from datetime import datetime, timezone
+
+import psutil
+
+from db_manager import (get_duckdb_connection, insert_log_batch, open_process_run, close_process_run,
+                        parse_log_line)
+
+logger = logging.getLogger(__name__)
+
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 20000))
+LOG_OVERLOAD_POLICY = os.environ.get('LOG_OVERLOAD_POLICY', 'block')
+LOG_SAMPLE_RATE = int(os.environ.get('LOG_SAMPLE_RATE', 10))
+LOG_HIGH_WATERMARK = float(os.environ.get('LOG_HIGH_WATERMARK', 0.8))
+LOG_BATCH_SIZE = int(os.environ.get('LOG_BATCH_SIZE', 500))
+LOG_FLUSH_INTERVAL = float(os.environ.get('LOG_FLUSH_INTERVAL', 1.0))  # 秒
+LOG_POLL_INTERVAL = 0.5  # 文件末尾时的轮询间隔，秒
+LOG_WRITE_RETRY_MAX_DELAY = 30.0  # 写入失败后的最大重试间隔，秒
+# 进程的日志读完并全部写入后，其计数器继续保留的时间（秒），之后从统计中移除
+LOG_INACTIVE_RETENTION = float(os.environ.get('LOG_INACTIVE_RETENTION', 600))
+
+OVERLOAD_POLICIES = ('block', 'drop_debug_first', 'sample')
+
+# 队列中的消息类型
+_MSG_LOG = 'log'
+_MSG_OPEN_RUN = 'open_run'
+_MSG_CLOSE_RUN = 'close_run'
+
+
+class _ProcessCounters:
+    """单个进程的管道计数器，所有字段由 LogPipeline._lock 保护"""
+
+    def __init__(self, process_pid, process_name, log_file_path):
+        self.process_pid = process_pid
+        self.process_name = process_name
+        self.log_file_path = log_file_path
+        self.lines_read = 0
+        self.lines_written = 0
+        self.lines_dropped = 0
+        self.lines_sampled_out = 0
+        self.bytes_read = 0
+        self.file_size = 0
+        self.caught_up_at = time.monotonic()  # 最近一次读到文件末尾的时间
+        self.pending = deque()  # 队列中尚未写入的日志的入队时间 (按入队顺序)
+        self.sample_seq = 0
+        self.active = True
+        self.stopped_at = None  # 尾随线程结束的时间
+
+    def to_dict(self, now):
+        oldest_pending = self.pending[0] if self.pending else None
+        lag_bytes = max(self.file_size - self.bytes_read, 0)
+        lag_since = None
+        if lag_bytes > 0:
+            lag_since = self.caught_up_at
+        if oldest_pending is not None and (lag_since is None or oldest_pending < lag_since):
+            lag_since = oldest_pending
+        return {
+            'process_pid': self.process_pid,
+            'process_name': self.process_name,
+            'log_file_path': self.log_file_path,
+            'active': self.active,
+            'lines_read': self.lines_read,
+            'lines_written': self.lines_written,
+            'lines_dropped': self.lines_dropped,
+            'lines_sampled_out': self.lines_sampled_out,
+            'lines_queued': len(self.pending),
+            'bytes_read': self.bytes_read,
+            'file_size': self.file_size,
+            'lag_bytes': lag_bytes,
+            'lag_seconds': round(now - lag_since, 3) if lag_since is not None else 0.0,
+        }
+
+
+class LogPipeline:
+    """有界、带背压的日志写入管道"""
+
+    def __init__(self, max_queue=LOG_QUEUE_SIZE, policy=LOG_OVERLOAD_POLICY, sample_rate=LOG_SAMPLE_RATE,
+                 high_watermark=LOG_HIGH_WATERMARK, batch_size=LOG_BATCH_SIZE, flush_interval=LOG_FLUSH_INTERVAL):
+        if policy not in OVERLOAD_POLICIES:
+            logger.warning(f"未知的日志过载策略 '{policy}'，改用 block")
+            policy = 'block'
+        self.policy = policy
+        self.max_queue = max_queue
+        self.sample_rate = max(sample_rate, 1)
+        self.high_watermark = int(max_queue * high_watermark)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._processes = {}
+        self._writer = None
+        self._stats = {
+            'batches_written': 0,
+            'lines_written': 0,
+            'write_errors': 0,
+            'last_batch_ms': None,
+            'last_error': None,
+            'blocked_puts': 0,
+        }
+
+    # ------------------------------------------------------------------
+    # 尾随端
+    # ------------------------------------------------------------------
+
+    def follow(self, log_file_path, process_pid, process_name, config_file, log_type):
+        """为进程启动一个尾随线程，把日志文件的新行送入管道"""
+        self._ensure_writer()
+        with self._lock:
+            self._prune_inactive(time.monotonic())
+            self._processes[process_pid] = _ProcessCounters(process_pid, process_name, log_file_path)
+        thread = threading.Thread(
+            target=self._tail,
+            args=(log_file_path, process_pid, process_name, config_file, log_type),
+            name=f"log-tail-{process_pid}"
+        )
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def _tail(self, log_file_path, process_pid, process_name, config_file, log_type):
+        self._put_control((_MSG_OPEN_RUN, (process_pid, process_name, config_file,
+                                           datetime.now(timezone.utc).replace(tzinfo=None))))
+        counters = self._processes[process_pid]
+        try:
+            while not os.path.exists(log_file_path):
+                time.sleep(0.1)
+
+            # 以二进制方式读取，tell() 即为已读取的字节偏移
+            with open(log_file_path, 'rb') as f:
+                running = True
+                while True:
+                    line = f.readline()
+                    if line:
+                        self._submit(counters, f.tell(), line, process_pid, process_name, config_file, log_type)
+                        continue
+
+                    self._update_file_position(counters, log_file_path, f.tell(), caught_up=True)
+                    if not running:
+                        break
+                    # 进程退出后再读一轮，把剩余内容读完
+                    running = psutil.pid_exists(process_pid)
+                    if running:
+                        time.sleep(LOG_POLL_INTERVAL)
+        except Exception as e:
+            logger.error(f"日志读取线程异常 (PID: {process_pid}): {e}")
+        finally:
+            self._put_control((_MSG_CLOSE_RUN, (process_pid, datetime.now(timezone.utc).replace(tzinfo=None))))
+            with self._lock:
+                counters.active = False
+                counters.stopped_at = time.monotonic()
+
+    def _update_file_position(self, counters, log_file_path, offset, caught_up=False):
+        try:
+            file_size = os.path.getsize(log_file_path)
+        except OSError:
+            file_size = offset
+        with self._lock:
+            counters.bytes_read = offset
+            counters.file_size = file_size
+            if caught_up and file_size <= offset:
+                counters.caught_up_at = time.monotonic()
+
+    def _submit(self, counters, offset, raw_line, process_pid, process_name, config_file, log_type):
+        message = raw_line.decode('utf-8', errors='ignore').strip()
+        with self._lock:
+            counters.lines_read += 1
+            counters.bytes_read = offset
+            if offset > counters.file_size:
+                counters.file_size = offset
+        if not message:
+            return
+
+        _, level, _ = parse_log_line(message)
+        if not self._admit(counters, level):
+            return
+
+        entry = (datetime.now(timezone.utc), process_pid, process_name, config_file, log_type, message)
+        # 先登记入队时间再入队，写入线程写完后按顺序出队
+        with self._lock:
+            counters.pending.append(time.monotonic())
+        try:
+            self._queue.put_nowait((_MSG_LOG, entry))
+        except queue.Full:
+            if self.policy == 'drop_debug_first' and level == 'I':
+                with self._lock:
+                    counters.pending.pop()
+                    counters.lines_dropped += 1
+                return
+            with self._lock:
+                self._stats['blocked_puts'] += 1
+            # 队列已满：阻塞尾随线程，等待写入线程腾出空间
+            self._queue.put((_MSG_LOG, entry))
+
+    def _admit(self, counters, level):
+        """根据过载策略决定是否接收该行日志；E!/W! 永远不会在此被丢弃"""
+        if self.policy == 'block' or level in ('E', 'W'):
+            return True
+        if self._queue.qsize() < self.high_watermark:
+            return True
+
+        with self._lock:
+            if self.policy == 'drop_debug_first':
+                if level == 'D':
+                    counters.lines_dropped += 1
+                    return False
+                return True
+            # sample
+            counters.sample_seq += 1
+            if counters.sample_seq % self.sample_rate == 0:
+                return True
+            counters.lines_sampled_out += 1
+            return False
+
+    def _put_control(self, message):
+        # 控制消息 (开始/结束运行记录) 不受过载策略影响，始终阻塞入队，保证与日志的先后顺序
+        self._ensure_writer()
+        self._queue.put(message)
+
+    # ------------------------------------------------------------------
+    # 写入端
+    # ------------------------------------------------------------------
+
+    def _ensure_writer(self):
+        with self._lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._write_loop, name="log-writer")
+                self._writer.daemon = True
+                self._writer.start()
+
+    def _write_loop(self):
+        conn = None
+        batch = []
+        last_flush = time.monotonic()
+        retry_delay = 1.0
+
+        while True:
+            timeout = max(self.flush_interval - (time.monotonic() - last_flush), 0.05)
+            message = None
+            try:
+                message = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                pass
+
+            if message is not None and message[0] == _MSG_LOG:
+                batch.append(message[1])
+                if len(batch) < self.batch_size:
+                    continue
+            elif message is None and not batch:
+                last_flush = time.monotonic()
+                continue
+
+            # 批次已满、到达刷新间隔或遇到控制消息：先写入已积累的日志，保证顺序
+            while True:
+                try:
+                    if conn is None:
+                        conn = get_duckdb_connection()
+                    if batch:
+                        self._write_batch(conn, batch)
+                        batch = []
+                    if message is not None and message[0] != _MSG_LOG:
+                        self._handle_control(conn, message)
+                    retry_delay = 1.0
+                    break
+                except Exception as e:
+                    with self._lock:
+                        self._stats['write_errors'] += 1
+                        self._stats['last_error'] = str(e)
+                    logger.error(f"日志写入失败，{retry_delay:.0f} 秒后重试 ({len(batch)} 行): {e}")
+                    if conn is not None:
+                        try:
+                            conn.close()
+                        except Exception:
+                            pass
+                        conn = None
+                    # 重试期间不再从队列取数据，队列填满后由过载策略接管
+                    time.sleep(retry_delay)
+                    retry_delay = min(retry_delay * 2, LOG_WRITE_RETRY_MAX_DELAY)
+            last_flush = time.monotonic()
+
+    def _write_batch(self, conn, batch):
+        started = time.perf_counter()
+        insert_log_batch(conn, batch)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        written = {}
+        for entry in batch:
+            written[entry[1]] = written.get(entry[1], 0) + 1
+        with self._lock:
+            self._stats['batches_written'] += 1
+            self._stats['lines_written'] += len(batch)
+            self._stats['last_batch_ms'] = round(elapsed_ms, 2)
+            for pid, count in written.items():
+                counters = self._processes.get(pid)
+                if counters is None:
+                    continue
+                counters.lines_written += count
+                for _ in range(min(count, len(counters.pending))):
+                    counters.pending.popleft()
+
+    def _handle_control(self, conn, message):
+        # 失败时抛出异常，由 _write_loop 原地重试同一条控制消息，不会丢失也不会与日志乱序
+        kind, args = message
+        if kind == _MSG_OPEN_RUN:
+            open_process_run(conn, *args)
+        elif kind == _MSG_CLOSE_RUN:
+            close_process_run(conn, *args)
+
+    # ------------------------------------------------------------------
+    # 统计
+    # ------------------------------------------------------------------
+
+    def _prune_inactive(self, now):
+        """移除已结束超过 LOG_INACTIVE_RETENTION 秒且没有待写入日志的进程计数器，调用方持有 self._lock"""
+        expired = [pid for pid, c in self._processes.items()
+                   if not c.active and not c.pending and now - c.stopped_at >= LOG_INACTIVE_RETENTION]
+        for pid in expired:
+            del self._processes[pid]
+
+    def get_stats(self, include_inactive=True):
+        """返回管道整体与每个进程的计数器，用于容量规划和延迟告警"""
+        with self._lock:
+            self._prune_inactive(time.monotonic())
+            tracked = [(c, c.log_file_path) for c in self._processes.values() if c.active]
+        # 尾随线程阻塞时不会更新文件大小，这里直接读取，保证字节延迟可见
+        sizes = {}
+        for counters, path in tracked:
+            try:
+                sizes[counters.process_pid] = os.path.getsize(path)
+            except OSError:
+                pass
+
+        now = time.monotonic()
+        with self._lock:
+            for pid, size in sizes.items():
+                counters = self._processes.get(pid)
+                if counters is not None and size > counters.file_size:
+                    counters.file_size = size
+            processes = [c.to_dict(now) for c in self._processes.values() if include_inactive or c.active]
+            stats = dict(self._stats)
+        stats.update({
+            'policy': self.policy,
+            'queue_size': self._queue.qsize(),
+            'queue_capacity': self.max_queue,
+            'high_watermark': self.high_watermark,
+            'writer_alive': self._writer is not None and self._writer.is_alive(),
+            'lines_dropped': sum(p['lines_dropped'] for p in processes),
+            'lines_sampled_out': sum(p['lines_sampled_out'] for p in processes),
+            'max_lag_bytes': max((p['lag_bytes'] for p in processes), default=0),
+            'max_lag_seconds': max((p['lag_seconds'] for p in processes), default=0.0),
+            'processes': processes,
+        })
+        return stats
+
+    def drain(self, timeout=5.0):
+        """等待队列中的日志写完 (进程退出时调用)，超时返回 False"""
+        if self._writer is None:
+            return True
+        deadline = time.monotonic() + timeout
+        while self._queue.qsize() > 0 and self._writer is not None and self._writer.is_alive():
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        # 写入线程最多在一个刷新间隔后写出手中的批次
+        time.sleep(min(self.flush_interval + 0.1, max(deadline - time.monotonic(), 0)))
+        return True
+
+
+log_pipeline = LogPipeline()
+atexit.register(log_pipeline.drain)
@@ -0,0 +1,67 @@
+"""Add FTS5 search index for point_info
+
+Revision ID: 506b1dd47844
+Revises: cdb8529d4973
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '506b1dd47844'
+down_revision = 'cdb8529d4973'
+branch_labels = None
+depends_on = None
+
+COLUMNS = "measurement, original_point_name, normalized_point_name, point_comment, import_batch, config_file_name"
+NEW_VALUES = ("new.measurement, new.original_point_name, new.normalized_point_name, new.point_comment, "
+              "new.import_batch, (SELECT file_name FROM config_files WHERE id = new.config_file_id)")
+
+TRIGGERS = {
+    'point_info_fts_ai': f"""
+        CREATE TRIGGER point_info_fts_ai AFTER INSERT ON point_info BEGIN
+            INSERT INTO point_info_fts(rowid, {COLUMNS}) VALUES (new.id, {NEW_VALUES});
+        END""",
+    'point_info_fts_ad': """
+        CREATE TRIGGER point_info_fts_ad AFTER DELETE ON point_info BEGIN
+            DELETE FROM point_info_fts WHERE rowid = old.id;
+        END""",
+    'point_info_fts_au': f"""
+        CREATE TRIGGER point_info_fts_au
+        AFTER UPDATE OF measurement, original_point_name, normalized_point_name, point_comment, import_batch, config_file_id
+        ON point_info BEGIN
+            DELETE FROM point_info_fts WHERE rowid = old.id;
+            INSERT INTO point_info_fts(rowid, {COLUMNS}) VALUES (new.id, {NEW_VALUES});
+        END""",
+    'config_files_fts_au': """
+        CREATE TRIGGER config_files_fts_au AFTER UPDATE OF file_name ON config_files BEGIN
+            UPDATE point_info_fts SET config_file_name = new.file_name
+            WHERE rowid IN (SELECT id FROM point_info WHERE config_file_id = new.id);
+        END""",
+    'config_files_fts_ad': """
+        CREATE TRIGGER config_files_fts_ad AFTER DELETE ON config_files BEGIN
+            UPDATE point_info_fts SET config_file_name = NULL
+            WHERE rowid IN (SELECT id FROM point_info WHERE config_file_id = old.id);
+        END""",
+}
+
+
+def upgrade():
+    # 与 point_search.create_point_search_schema 一致；trigram 分词支持子串匹配，不区分大小写
+    op.execute(sa.text(f"CREATE VIRTUAL TABLE point_info_fts USING fts5({COLUMNS}, tokenize='trigram')"))
+    for statement in TRIGGERS.values():
+        op.execute(sa.text(statement))
+    op.execute(sa.text(f"""
+        INSERT INTO point_info_fts(rowid, {COLUMNS})
+        SELECT p.id, p.measurement, p.original_point_name, p.normalized_point_name, p.point_comment,
+               p.import_batch, c.file_name
+        FROM point_info p LEFT JOIN config_files c ON c.id = p.config_file_id
+    """))
+
+
+def downgrade():
+    for name in TRIGGERS:
+        op.execute(sa.text(f"DROP TRIGGER IF EXISTS {name}"))
+    op.execute(sa.text("DROP TABLE IF EXISTS point_info_fts"))
@@ -0,0 +1,32 @@
+"""Add current_version to point_info
+
+Revision ID: c852c002d155
+Revises: 506b1dd47844
+Create Date: 2026-10-19 10:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c852c002d155'
+down_revision = '506b1dd47844'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 直接 ALTER TABLE ADD COLUMN，不用 batch_alter_table 复制表，point_info 上的全文检索触发器得以保留
+    op.add_column('point_info', sa.Column('current_version', sa.Integer(), server_default='0', nullable=False))
+    op.execute(sa.text("""
+        UPDATE point_info SET current_version = (
+            SELECT MAX(version) FROM point_info_history WHERE point_info_history.point_info_id = point_info.id
+        )
+        WHERE id IN (SELECT point_info_id FROM point_info_history)
+    """))
+
+
+def downgrade():
+    # SQLite 3.35+ 支持 DROP COLUMN，同样不需要复制表
+    op.drop_column('point_info', 'current_version')
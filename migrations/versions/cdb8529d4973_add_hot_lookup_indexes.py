@@ -0,0 +1,74 @@
+"""Add indexes for hot lookup columns
+
+Revision ID: cdb8529d4973
+Revises: 0694b245fbd3
+Create Date: 2026-10-19 05:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'cdb8529d4973'
+down_revision = '0694b245fbd3'
+branch_labels = None
+depends_on = None
+
+
+def _renumber_duplicate_versions(table, group_column, order_columns):
+    # 唯一索引创建前，把同一分组内重复的版本号按原有顺序重新编号（只处理存在重复的分组）
+    op.execute(sa.text(f"""
+        UPDATE {table} SET version = (
+            SELECT numbered.new_version FROM (
+                SELECT id, ROW_NUMBER() OVER (PARTITION BY {group_column} ORDER BY {order_columns}) AS new_version
+                FROM {table}
+            ) AS numbered
+            WHERE numbered.id = {table}.id
+        )
+        WHERE {group_column} IN (
+            SELECT {group_column} FROM {table} GROUP BY {group_column}, version HAVING COUNT(*) > 1
+        )
+    """))
+
+
+def upgrade():
+    with op.batch_alter_table('point_info', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_point_info_measurement'), ['measurement'], unique=False)
+        batch_op.create_index(batch_op.f('ix_point_info_normalized_point_name'), ['normalized_point_name'], unique=False)
+        batch_op.create_index(batch_op.f('ix_point_info_import_batch'), ['import_batch'], unique=False)
+        batch_op.create_index(batch_op.f('ix_point_info_config_file_id'), ['config_file_id'], unique=False)
+
+    _renumber_duplicate_versions('config_files', 'file_name', 'version, id')
+    with op.batch_alter_table('config_files', schema=None) as batch_op:
+        batch_op.create_index('ix_config_files_file_name_is_active', ['file_name', 'is_active'], unique=False)
+        batch_op.create_index('uq_config_files_file_name_version', ['file_name', 'version'], unique=True)
+
+    with op.batch_alter_table('telegraf_processes', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_telegraf_processes_pid'), ['pid'], unique=False)
+        batch_op.create_index(batch_op.f('ix_telegraf_processes_config_file_id'), ['config_file_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_telegraf_processes_status'), ['status'], unique=False)
+
+    _renumber_duplicate_versions('point_info_history', 'point_info_id', 'version, archived_at, id')
+    with op.batch_alter_table('point_info_history', schema=None) as batch_op:
+        batch_op.create_index('uq_point_info_history_point_version', ['point_info_id', 'version'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('point_info_history', schema=None) as batch_op:
+        batch_op.drop_index('uq_point_info_history_point_version')
+
+    with op.batch_alter_table('telegraf_processes', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_telegraf_processes_status'))
+        batch_op.drop_index(batch_op.f('ix_telegraf_processes_config_file_id'))
+        batch_op.drop_index(batch_op.f('ix_telegraf_processes_pid'))
+
+    with op.batch_alter_table('config_files', schema=None) as batch_op:
+        batch_op.drop_index('uq_config_files_file_name_version')
+        batch_op.drop_index('ix_config_files_file_name_is_active')
+
+    with op.batch_alter_table('point_info', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_point_info_config_file_id'))
+        batch_op.drop_index(batch_op.f('ix_point_info_import_batch'))
+        batch_op.drop_index(batch_op.f('ix_point_info_normalized_point_name'))
+        batch_op.drop_index(batch_op.f('ix_point_info_measurement'))
@@ -98,23 +98,26 @@ class OutputSource(db.Model):
         back_populates='referenced_output_sources'
     )
 
-    def to_dict(self):
+    def to_dict(self, referenced_by_count=None):
+        # 列表接口由 serializers 用 GROUP BY 批量计算引用数并传入，避免逐行加载关联集合
+        if referenced_by_count is None:
+            referenced_by_count = len(self.referenced_by_config_files)
         return {
             'id': self.id, 'name': self.name, 'source_type': self.source_type,
             'description': self.description, 'is_enabled': self.is_enabled,
             'is_locked': self.is_locked,
             'config': self.config, 'created_at': self.created_at.replace(tzinfo=timezone.utc).isoformat(),
             'updated_at': self.updated_at.replace(tzinfo=timezone.utc).isoformat(),
-            'referenced_by_count': len(self.referenced_by_config_files)
+            'referenced_by_count': referenced_by_count
         }
 
 class PointInfo(db.Model):
     """数据点信息模型"""
     __tablename__ = 'point_info'
     id = db.Column(db.Integer, primary_key=True)
-    measurement = db.Column(db.String(80), nullable=False)
+    measurement = db.Column(db.String(80), nullable=False, index=True)
     original_point_name = db.Column(db.String(200), nullable=True)
-    normalized_point_name = db.Column(db.String(200), nullable=True)
+    normalized_point_name = db.Column(db.String(200), nullable=True, index=True)
     point_comment = db.Column(db.Text, nullable=True)
     tags = db.Column(db.Text, nullable=False, server_default='{}')
     fields = db.Column(db.Text, nullable=False, server_default='{}')
@@ -122,13 +125,15 @@ class PointInfo(db.Model):
     data_type = db.Column(db.String(20), nullable=True, default='float')
     unit = db.Column(db.String(50), nullable=True)
     data_source = db.Column(db.String(50), nullable=False, default='manual')
-    config_file_id = db.Column(db.Integer, db.ForeignKey('config_files.id'), nullable=True)
+    config_file_id = db.Column(db.Integer, db.ForeignKey('config_files.id'), nullable=True, index=True)
     is_enabled = db.Column(db.Boolean, nullable=False, default=True)
     is_locked = db.Column(db.Boolean, default=False, nullable=False)
     created_at = db.Column(db.DateTime, nullable=False, default=utcnow_tz)
     updated_at = db.Column(db.DateTime, nullable=True, onupdate=utcnow_tz)
-    import_batch = db.Column(db.String(50), nullable=True)
+    import_batch = db.Column(db.String(50), nullable=True, index=True)
     import_status = db.Column(db.String(20), nullable=True) # e.g., created, updated
+    # 最新历史快照的版本号（0 表示没有历史记录），写入快照时与历史记录在同一事务中加一
+    current_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     config_file = db.relationship('ConfigFile', backref=db.backref('data_points', lazy=True))
     history = db.relationship('PointInfoHistory', backref='point_info', lazy='dynamic', order_by='desc(PointInfoHistory.version)')
@@ -148,12 +153,16 @@ class PointInfo(db.Model):
             'created_at': self.created_at.replace(tzinfo=timezone.utc).isoformat() if self.created_at else None,
             'updated_at': self.updated_at.replace(tzinfo=timezone.utc).isoformat() if self.updated_at else None,
             'import_batch': self.import_batch,
-            'import_status': self.import_status
+            'import_status': self.import_status,
+            'current_version': self.current_version
         }
 
 class PointInfoHistory(db.Model):
     """数据点信息历史版本模型"""
     __tablename__ = 'point_info_history'
+    __table_args__ = (
+        db.Index('uq_point_info_history_point_version', 'point_info_id', 'version', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     point_info_id = db.Column(db.Integer, db.ForeignKey('point_info.id'), nullable=False) # 对应 PointInfo 的 ID
     version = db.Column(db.Integer, nullable=False)
@@ -206,6 +215,10 @@ class PointInfoHistory(db.Model):
 class ConfigFile(db.Model):
     """配置文件模型"""
     __tablename__ = 'config_files'
+    __table_args__ = (
+        db.Index('ix_config_files_file_name_is_active', 'file_name', 'is_active'),
+        db.Index('uq_config_files_file_name_version', 'file_name', 'version', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     file_name = db.Column(db.String(255), nullable=False)
     content = db.Column(db.Text, nullable=False)
@@ -276,9 +289,9 @@ class TelegrafProcess(db.Model):
     __tablename__ = 'telegraf_processes'
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(80), nullable=False)
-    pid = db.Column(db.Integer, nullable=True)
-    status = db.Column(db.String(50), nullable=False, default='stopped')
-    config_file_id = db.Column(db.Integer, db.ForeignKey('config_files.id'), nullable=True)
+    pid = db.Column(db.Integer, nullable=True, index=True)
+    status = db.Column(db.String(50), nullable=False, default='stopped', index=True)
+    config_file_id = db.Column(db.Integer, db.ForeignKey('config_files.id'), nullable=True, index=True)
     log_file_path = db.Column(db.String(255), nullable=True)
     created_at = db.Column(db.DateTime, nullable=False, default=utcnow_tz)
     updated_at = db.Column(db.DateTime, nullable=True, onupdate=utcnow_tz)
@@ -287,13 +300,24 @@ class TelegrafProcess(db.Model):
     
     config_file = db.relationship('ConfigFile', backref=db.backref('processes', lazy=True))
 
-    def to_dict(self):
-        # Check if the process is still running and update the status if not
-        if self.pid and not psutil.pid_exists(self.pid) and self.status == 'running':
+    def refresh_status(self):
+        """
+        进程已退出但记录仍为 running 时把状态改为 stopped。只修改会话中的对象，
+        由调用方统一提交，返回是否有变化。
+        """
+        if self.pid and self.status == 'running' and not psutil.pid_exists(self.pid):
             logger.info(f"Process {self.pid} is no longer running. Updating status to 'stopped'.")
             self.status = 'stopped'
             self.stop_time = utcnow_tz()
-            db.session.commit()
+            return True
+        return False
+
+    def to_dict(self, stats=None):
+        """
+        stats 为预先采集的 (cpu_percent, memory_mb)，列表接口由 serializers 批量采集后传入；
+        未提供时现场采集。序列化过程中不提交会话。
+        """
+        self.refresh_status()
 
         data = {
             'id': self.id, 'name': self.name, 'pid': self.pid, 'status': self.status,
@@ -308,17 +332,20 @@ class TelegrafProcess(db.Model):
             'memory_mb': None
         }
         if self.pid and self.status == 'running':
-            try:
-                p = psutil.Process(self.pid)
-                data['cpu_percent'] = p.cpu_percent(interval=0.1)
-                data['memory_mb'] = p.memory_info().rss / (1024 * 1024)
-            except psutil.NoSuchProcess:
-                # Process might have just died, update status again
+            if stats is None:
+                try:
+                    p = psutil.Process(self.pid)
+                    stats = (p.cpu_percent(interval=0.1), p.memory_info().rss / (1024 * 1024))
+                except psutil.NoSuchProcess:
+                    stats = None
+            if stats is None:
+                # Process might have just died
                 logger.info(f"Process {self.pid} disappeared during stat collection. Updating status to 'stopped'.")
                 self.status = 'stopped'
                 self.stop_time = utcnow_tz()
-                db.session.commit()
                 data['status'] = 'stopped'
+            else:
+                data['cpu_percent'], data['memory_mb'] = stats
         return data
 
 class GlobalParameter(db.Model):
@@ -338,13 +365,15 @@ class GlobalParameter(db.Model):
         back_populates='referenced_global_parameters'
     )
 
-    def to_dict(self):
+    def to_dict(self, referenced_by_count=None):
+        if referenced_by_count is None:
+            referenced_by_count = len(self.referenced_by_config_files)
         return {
             'id': self.id, 'name': self.name, 'config': self.config,
             'description': self.description, 'is_locked': self.is_locked,
             'created_at': self.created_at.replace(tzinfo=timezone.utc).isoformat(),
             'updated_at': self.updated_at.replace(tzinfo=timezone.utc).isoformat(),
-            'referenced_by_count': len(self.referenced_by_config_files)
+            'referenced_by_count': referenced_by_count
         }
 
 class DirectorySetting(db.Model):
@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""
+列表接口分页
+功能：为 SQLAlchemy 查询提供页码分页和键集（游标）分页两种方式，并缓存总数统计
+作者：项目开发团队
+
+键集分页：请求带 cursor 参数（首页传空字符串）时，按 (排序列, id) 从上一页最后一行之后继续读取，
+不使用 OFFSET，翻到多深都只读取一页的数据。游标由 api_utils.encode_cursor 编码，对客户端不透明。
+
+总数统计按 (SQL, 参数) 缓存，缓存项记录查询涉及各表的"代数"：本进程内对这些表的任何写入（ORM flush
+或批量 insert/update/delete）都会让代数加一，使缓存失效；其他工作进程的写入由 PAGINATION_COUNT_TTL 兜底。
+"""
+
+import os
+import time
+import threading
+from decimal import Decimal
+from datetime import date, datetime
+
+from flask import request
+from sqlalchemy import event, inspect, and_, or_, tuple_
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.util import find_tables
+
+from api_utils import encode_cursor, decode_cursor, get_pagination_params
+
+# 总数缓存的最长有效期（秒），0 表示不缓存
+PAGINATION_COUNT_TTL = float(os.environ.get('PAGINATION_COUNT_TTL', 60))
+PAGINATION_COUNT_CACHE_SIZE = 256
+
+_generations = {}
+_count_cache = {}
+_lock = threading.Lock()
+
+
+def _bump(table_names):
+    with _lock:
+        for name in table_names:
+            _generations[name] = _generations.get(name, 0) + 1
+
+
+@event.listens_for(Session, 'after_flush')
+def _on_flush(session, flush_context):
+    # after_flush 时 new/dirty/deleted 仍是本次 flush 之前的内容
+    tables = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, '__table__', None)
+        if table is not None:
+            tables.add(table.name)
+    if tables:
+        _bump(tables)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _on_orm_execute(orm_execute_state):
+    # query.update()/delete() 和 session.execute(insert(...)) 等批量语句不经过 flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        if table is not None:
+            _bump([table.name])
+
+
+def invalidate_counts(table_names):
+    """绕过 ORM 直接执行写入语句（如 DBAPI executemany）后调用，使涉及这些表的总数缓存失效"""
+    _bump(table_names)
+
+
+def table_generation(table_names):
+    """返回若干表当前的代数，用作缓存键的一部分"""
+    with _lock:
+        return tuple(_generations.get(name, 0) for name in sorted(table_names))
+
+
+def cached_count(query):
+    """
+    返回 query 的总行数。相同 SQL 和参数在涉及的表未被写入、且未超过 PAGINATION_COUNT_TTL 时直接返回缓存值。
+    """
+    if PAGINATION_COUNT_TTL <= 0:
+        return query.count()
+    statement = query.statement
+    compiled = statement.compile()
+    tables = {table.name for table in find_tables(statement, check_columns=True, include_joins=True)
+              if getattr(table, 'name', None)}
+    key = (str(compiled), tuple(sorted((k, repr(v)) for k, v in compiled.params.items())))
+    generation = table_generation(tables)
+    now = time.monotonic()
+    with _lock:
+        cached = _count_cache.get(key)
+    if cached and cached[0] == generation and cached[1] > now:
+        return cached[2]
+
+    total = query.count()
+    with _lock:
+        if len(_count_cache) >= PAGINATION_COUNT_CACHE_SIZE:
+            _count_cache.clear()
+        _count_cache[key] = (generation, now + PAGINATION_COUNT_TTL, total)
+    return total
+
+
+def _parse_bool(value, default):
+    if value is None or value == '':
+        return default
+    return value.lower() in ('1', 'true', 'yes')
+
+
+def _cursor_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _restore_value(column, value):
+    """把游标中的 JSON 值还原为列对应的 Python 类型"""
+    if value is None or column is None:
+        return value
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    if python_type is Decimal:
+        return Decimal(value)
+    return value
+
+
+def _keyset_conditions(column, id_column, last_value, last_id, descending, nullable):
+    """
+    (排序列, id) 严格位于上一页最后一行之后的条件列表，按排序顺序依次读取。
+    SQLite 中 NULL 小于任何值：升序时排在最前，降序时排在最后。NULL 段和非空段拆成两个条件分别读取，
+    每段都能按索引定位到起点；合成一个 OR 条件时 SQLite 只能从索引一端开始逐行过滤。
+    """
+    if column is id_column:
+        return [id_column < last_id if descending else id_column > last_id]
+    if last_value is None:
+        if descending:
+            return [and_(column.is_(None), id_column < last_id)]
+        return [and_(column.is_(None), id_column > last_id), column.isnot(None)]
+    if descending:
+        condition = tuple_(column, id_column) < tuple_(last_value, last_id)
+        return [condition, column.is_(None)] if nullable else [condition]
+    return [tuple_(column, id_column) > tuple_(last_value, last_id)]
+
+
+def paginate_query(query, model, serialize=None, default_sort='id', extra_sorts=None):
+    """
+    按请求参数对 query 排序并分页，返回列表接口的响应字典 {'items': [...], 'pagination': {...}}。
+
+    请求参数:
+        sort_by / sort_dir: 排序列（必须是 model 的列）和方向 asc|desc，id 作为第二排序键保证顺序稳定
+        page / per_page: 页码分页（默认）
+        cursor: 键集分页，首页传空字符串，之后传上一页返回的 next_cursor；提供时忽略 page
+        with_count: 是否统计总数，页码分页默认 true，键集分页默认 false
+
+    参数:
+        serialize: 接收一页模型对象、返回字典列表的函数，默认逐个调用 to_dict()
+        default_sort: 未指定 sort_by 或 sort_by 无效时使用的排序
+        extra_sorts: 除模型列以外允许排序的表达式 {名称: 非空的 SQL 表达式}，如搜索相关度
+
+    无效的 cursor 抛出 ValueError。
+    """
+    page, per_page = get_pagination_params(request)
+    columns = inspect(model).column_attrs
+    extra_sorts = extra_sorts or {}
+    sort_by = request.args.get('sort_by') or default_sort
+    if sort_by not in columns and sort_by not in extra_sorts:
+        sort_by = default_sort
+    descending = request.args.get('sort_dir', 'asc') == 'desc'
+    id_column = model.id
+    if sort_by in extra_sorts:
+        column, nullable, column_type = extra_sorts[sort_by], False, None
+    else:
+        column = getattr(model, sort_by)
+        nullable = all(c.nullable for c in columns[sort_by].columns)
+        column_type = columns[sort_by].columns[0]
+
+    if column is id_column:
+        order = [id_column.desc() if descending else id_column.asc()]
+    else:
+        order = [column.desc(), id_column.desc()] if descending else [column.asc(), id_column.asc()]
+
+    cursor = request.args.get('cursor')
+    keyset = cursor is not None
+    with_count = _parse_bool(request.args.get('with_count'), default=not keyset)
+    total = cached_count(query) if with_count else None
+
+    segments = [query]
+    if keyset and cursor:
+        cursor_sort, last_value, last_id = decode_cursor(cursor, length=3)
+        if cursor_sort != sort_by:
+            raise ValueError("Cursor does not match sort_by; restart from the first page")
+        segments = [query.filter(condition) for condition in _keyset_conditions(
+            column, id_column, _restore_value(column_type, last_value), last_id, descending, nullable)]
+
+    # 多取一行判断是否还有下一页，不需要总数；前一段不足一页时从下一段继续读取
+    limit = None if per_page == -1 else per_page + 1
+    rows = []
+    for segment in segments:
+        segment = segment.order_by(*order)
+        if not keyset and per_page != -1:
+            segment = segment.offset((page - 1) * per_page)
+        rows += segment.limit(None if limit is None else limit - len(rows)).all()
+        if limit is not None and len(rows) >= limit:
+            break
+    has_more = limit is not None and len(rows) > per_page
+    rows = rows[:per_page] if limit is not None else rows
+
+    next_cursor = None
+    if has_more and rows:
+        last = rows[-1]
+        if sort_by in extra_sorts:
+            # 表达式的值不在模型对象上，单独查询最后一行的值
+            last_value = query.with_entities(column).filter(id_column == last.id).scalar()
+        else:
+            last_value = getattr(last, sort_by)
+        next_cursor = encode_cursor([sort_by, _cursor_value(last_value), last.id])
+
+    items = serialize(rows) if serialize else [row.to_dict() for row in rows]
+    pagination = {'per_page': per_page, 'has_more': has_more, 'next_cursor': next_cursor}
+    if keyset:
+        if with_count:
+            pagination['total'] = total
+    else:
+        pagination['page'] = page
+        pagination['total'] = total
+        if total is None:
+            pagination['pages'] = None
+        else:
+            pagination['pages'] = (total + per_page - 1) // per_page if per_page > 0 else 1
+    return {'items': items, 'pagination': pagination}
@@ -0,0 +1,628 @@
+# -*- coding: utf-8 -*-
+"""
+数据点批量导入
+功能：按唯一键批量写入数据点（存在则更新、不存在则创建），以及导入和批量修改共用的历史快照
+作者：项目开发团队
+
+导入流程：
+1. 用一条查询预加载所有导入键对应的现有数据点（键列表通过 json_each 作为单个参数传入）；
+2. 在内存中逐行计算目标值并与现有值比较，内容没有变化的数据点不写入、不产生历史版本；
+3. 按 POINT_IMPORT_CHUNK_SIZE 分块，每块在独立事务中执行：一条 INSERT ... SELECT 写历史快照，
+   executemany 批量更新和插入，然后提交。每块提交后释放 SQLite 写锁，其他请求可以穿插写入。
+
+文件导入（CSV / XLSX）按 POINT_IMPORT_CSV_CHUNK_ROWS 行分块读取，每块独立完成校验、比较和写入，内存占用与文件大小无关。
+XLSX 以 openpyxl 只读模式逐行流式读取，工作簿中的每个工作表（第一行为表头）依次导入。
+
+point_info 的唯一键列（measurement / normalized_point_name）没有唯一约束，无法使用 INSERT ... ON CONFLICT；
+库中已有重复键时以 id 最小的一条为准。
+"""
+
+import os
+import json
+import time
+import logging
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import openpyxl
+import pandas as pd
+from sqlalchemy import func
+
+from models import db, PointInfo, PointInfoHistory, utcnow_tz
+from pagination import invalidate_counts
+from point_search import deferred_point_search_inserts
+
+logger = logging.getLogger(__name__)
+
+# 每个事务写入的数据点数
+POINT_IMPORT_CHUNK_SIZE = int(os.environ.get('POINT_IMPORT_CHUNK_SIZE', 2000))
+# 文件导入（CSV / XLSX）每次读取的行数，每块在一个事务中写入
+POINT_IMPORT_CSV_CHUNK_ROWS = int(os.environ.get('POINT_IMPORT_CSV_CHUNK_ROWS', 10000))
+
+# 写入历史快照的 PointInfo 字段
+POINT_HISTORY_COLUMNS = ('measurement', 'original_point_name', 'normalized_point_name', 'point_comment', 'tags', 'fields',
+                         'timestamp', 'data_type', 'unit', 'data_source', 'config_file_id', 'is_enabled', 'is_locked',
+                         'import_batch', 'import_status')
+
+# 导入可以写入的字段及创建时的默认值
+POINT_IMPORT_FIELDS = {
+    'measurement': None,
+    'original_point_name': None,
+    'normalized_point_name': None,
+    'point_comment': None,
+    'data_type': 'float',
+    'unit': None,
+    'data_source': 'manual',
+    'is_enabled': True,
+    'tags': '{}',
+    'fields': '{}',
+}
+
+POINT_IMPORT_KEYS = ('measurement', 'normalized_point_name')
+
+POINT_IMPORT_FILE_FORMATS = ('csv', 'xlsx')
+
+
+def ids_condition(ids, column=PointInfo.id):
+    """column（默认 PointInfo.id）在给定列表中的条件；ids 通过 json_each 作为单个参数传入，不受 SQLite 参数个数限制"""
+    id_select = db.select(db.column('value')).select_from(func.json_each(json.dumps(list(ids))))
+    return column.in_(id_select)
+
+
+def snapshot_points(condition, change_reason):
+    """
+    把满足条件的数据点当前状态用一条 INSERT ... SELECT 写入历史表，版本号取 current_version + 1，
+    再用一条 UPDATE 把这些数据点的 current_version 加一。返回写入的历史行数。
+    须在修改这些数据点之前调用，否则自动 flush 会让快照记录修改后的状态。
+    """
+    snapshot = db.select(
+        PointInfo.id, PointInfo.current_version + 1, *[getattr(PointInfo, c) for c in POINT_HISTORY_COLUMNS],
+        db.literal(datetime.now(timezone.utc)), db.literal(change_reason)
+    ).where(condition)
+    result = db.session.execute(
+        db.insert(PointInfoHistory).from_select(
+            ['point_info_id', 'version', *POINT_HISTORY_COLUMNS, 'archived_at', 'change_reason'], snapshot))
+    db.session.execute(db.update(PointInfo).where(condition).values(current_version=PointInfo.current_version + 1),
+                       execution_options={'synchronize_session': 'fetch'})
+    return result.rowcount
+
+
+def rollback_batch_points(batch_id):
+    """
+    在当前事务中回滚一个导入批次，不提交，返回 {'restored', 'deleted', 'cleared'}。
+    - 批次创建的数据点（含同一批次中先创建、后又被更新的）连同历史记录删除；
+    - 批次更新的数据点用窗口函数取批次之前的最新快照（历史中 import_batch 不是本批次的最高版本），
+      一条 UPDATE ... FROM 恢复全部字段，current_version 回到快照版本减一，之后的历史记录一并删除；
+    - 没有可恢复快照的更新数据点只清除批次信息。
+    """
+    history = PointInfoHistory.__table__
+    in_batch = PointInfo.import_batch == batch_id
+    updated_ids = db.session.scalars(
+        db.select(PointInfo.id).where(in_batch, PointInfo.import_status == 'updated')).all()
+    recreated_ids = db.session.scalars(db.select(history.c.point_info_id).distinct().where(
+        ids_condition(updated_ids, history.c.point_info_id),
+        history.c.import_batch == batch_id, history.c.import_status == 'created')).all()
+    if recreated_ids:
+        recreated = set(recreated_ids)
+        updated_ids = [point_id for point_id in updated_ids if point_id not in recreated]
+
+    # 先删除批次创建的数据点：之后清除批次信息时会把批次内再次导入的（状态为 updated）一并清除
+    created = in_batch & db.or_(PointInfo.import_status == 'created', ids_condition(recreated_ids))
+    db.session.execute(db.delete(history).where(history.c.point_info_id.in_(db.select(PointInfo.id).where(created))))
+    deleted = db.session.execute(db.delete(PointInfo).where(created),
+                                 execution_options={'synchronize_session': False}).rowcount
+
+    ranked = db.select(
+        history,
+        func.row_number().over(partition_by=history.c.point_info_id, order_by=history.c.version.desc()).label('rank')
+    ).where(ids_condition(updated_ids, history.c.point_info_id),
+            history.c.import_batch.is_distinct_from(batch_id)).subquery('ranked_versions')
+    prior = db.select(ranked).where(ranked.c.rank == 1).subquery('prior_versions')
+    restored = db.session.execute(
+        db.update(PointInfo).where(PointInfo.id == prior.c.point_info_id)
+        .values(current_version=prior.c.version - 1, **{name: prior.c[name] for name in POINT_HISTORY_COLUMNS}),
+        execution_options={'synchronize_session': False}).rowcount
+    current_version = db.select(PointInfo.current_version).where(PointInfo.id == history.c.point_info_id)
+    db.session.execute(db.delete(history).where(ids_condition(updated_ids, history.c.point_info_id),
+                                                history.c.version > current_version.scalar_subquery()))
+    cleared = db.session.execute(
+        db.update(PointInfo).where(in_batch, PointInfo.import_status == 'updated')
+        .values(import_batch=None, import_status=None),
+        execution_options={'synchronize_session': False}).rowcount
+
+    return {'restored': restored, 'deleted': deleted, 'cleared': cleared}
+
+
+def _existing_query(key, keys):
+    key_column = getattr(PointInfo, key)
+    columns = [PointInfo.id, PointInfo.is_locked, *[getattr(PointInfo, name) for name in POINT_IMPORT_FIELDS]]
+    key_select = db.select(db.column('value')).select_from(func.json_each(json.dumps(list(keys))))
+    return db.select(*columns).where(key_column.in_(key_select)).order_by(PointInfo.id)
+
+
+def _load_existing(key, keys):
+    """一次查询加载键对应的现有数据点，返回 {键: {列: 值}}；重复键取 id 最小的一条"""
+    existing = {}
+    if keys:
+        for row in db.session.execute(_existing_query(key, keys)).mappings():
+            existing.setdefault(row[key], dict(row))
+    return existing
+
+
+def _existing_frame(key, keys):
+    """与 _load_existing 相同，返回以键为索引的 DataFrame"""
+    result = db.session.connection().execute(_existing_query(key, keys))
+    frame = pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+    return frame.drop_duplicates(key).set_index(key, drop=False)
+
+
+def bulk_upsert_points(records, key='measurement', conflict_rule='overwrite', batch_id=None,
+                       chunk_size=None, on_chunk=None):
+    """
+    按 key 列批量导入数据点，所有导入和更新的数据点都会锁定并记录 import_batch。
+
+    参数:
+        records: [(行号, {列: 值}), ...]，值已转换为列类型（tags/fields 为 JSON 字符串）；
+                 更新时未提供的列保持原值，创建时使用 POINT_IMPORT_FIELDS 中的默认值
+        conflict_rule: 键已存在时 'overwrite' 更新或 'skip' 跳过
+        on_chunk: 每块提交后调用 on_chunk(summary)，可用于上报进度；其中抛出的异常会中止导入，已提交的块保留
+
+    返回 summary 字典：created/updated/unchanged/skipped/errors 计数、error_details、
+    elapsed_seconds 和 rows_per_second。同一次导入中重复出现的键按出现顺序依次合并到同一个数据点。
+    """
+    if key not in POINT_IMPORT_KEYS:
+        raise ValueError(f"Unsupported import key: {key}")
+    if conflict_rule not in ('overwrite', 'skip'):
+        raise ValueError(f"Invalid conflict_rule: {conflict_rule}")
+    chunk_size = chunk_size or POINT_IMPORT_CHUNK_SIZE
+    start = time.monotonic()
+    summary = {'total': 0, 'created': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0, 'errors': 0,
+               'error_details': []}
+
+    valid = []
+    for row_number, values in records:
+        summary['total'] += 1
+        if values.get(key) in (None, ''):
+            summary['errors'] += 1
+            summary['error_details'].append({'index': row_number, 'error': f'Missing required field: {key}'})
+            continue
+        valid.append((row_number, values))
+
+    existing = _load_existing(key, {values[key] for _, values in valid})
+
+    # 按键合并出每个数据点的最终目标值，保持首次出现的顺序
+    targets = {}
+    for row_number, values in valid:
+        key_value = values[key]
+        target = targets.get(key_value)
+        if target is None:
+            current = existing.get(key_value)
+            if current is not None and conflict_rule == 'skip':
+                summary['skipped'] += 1
+                continue
+            if current is None:
+                target = {'id': None, 'values': dict(POINT_IMPORT_FIELDS), 'original': None, 'rows': []}
+            else:
+                original = {name: current[name] for name in POINT_IMPORT_FIELDS}
+                original['is_locked'] = current['is_locked']
+                target = {'id': current['id'], 'values': dict(original), 'original': original, 'rows': []}
+            targets[key_value] = target
+        elif conflict_rule == 'skip':
+            summary['skipped'] += 1
+            continue
+        target['values'].update((name, value) for name, value in values.items() if name in POINT_IMPORT_FIELDS)
+        target['rows'].append(row_number)
+
+    pending = []
+    for target in targets.values():
+        target['values']['is_locked'] = True
+        if target['id'] is not None and target['values'] == target['original']:
+            summary['unchanged'] += len(target['rows'])
+            continue
+        pending.append(target)
+
+    for offset in range(0, len(pending), chunk_size):
+        chunk = pending[offset:offset + chunk_size]
+        try:
+            _write_chunk([tuple(target['values'][name] for name in _WRITE_COLUMNS)
+                          for target in chunk if target['id'] is None],
+                         [(*(target['values'][name] for name in _WRITE_COLUMNS), target['id'])
+                          for target in chunk if target['id'] is not None],
+                         batch_id)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Point import chunk failed (batch {batch_id}): {e}")
+            for target in chunk:
+                summary['errors'] += len(target['rows'])
+                summary['error_details'].extend({'index': row, 'error': str(e)} for row in target['rows'])
+        else:
+            # 计数只包含已提交的块，导入中途取消时与库中的结果一致
+            for target in chunk:
+                if target['id'] is None:
+                    summary['created'] += 1
+                    summary['updated'] += len(target['rows']) - 1
+                else:
+                    summary['updated'] += len(target['rows'])
+        if on_chunk:
+            on_chunk(summary)
+
+    return _finish(summary, start)
+
+
+def _finish(summary, start):
+    elapsed = time.monotonic() - start
+    summary['elapsed_seconds'] = round(elapsed, 3)
+    summary['rows_per_second'] = round(summary['total'] / elapsed) if elapsed > 0 else None
+    return summary
+
+
+# 批量写入语句的参数顺序；更新时在末尾追加 id
+_WRITE_COLUMNS = tuple(POINT_IMPORT_FIELDS)
+
+
+def _write_chunk(creates, updates, batch_id):
+    """
+    在当前事务中写入一块：先为待更新的数据点写历史快照，再批量更新和插入。
+    creates 为按 _WRITE_COLUMNS 顺序排列的值元组，updates 在末尾追加 id。
+    直接用 DBAPI executemany 执行，省去 ORM 逐行处理参数的开销；插入期间暂停全文索引的逐行触发器，最后一次性写入索引。
+    """
+    connection = db.session.connection()
+    datetime_type = PointInfo.__table__.c.created_at.type.dialect_impl(connection.dialect)
+    now = datetime_type.bind_processor(connection.dialect)(utcnow_tz())
+    if updates:
+        snapshot_points(ids_condition(row[-1] for row in updates), f"updated by import batch {batch_id}")
+        assignments = ', '.join(f"{name} = ?" for name in _WRITE_COLUMNS)
+        connection.exec_driver_sql(
+            f"UPDATE point_info SET {assignments}, is_locked = 1, import_batch = ?, import_status = 'updated', "
+            f"updated_at = ? WHERE id = ?",
+            [(*row[:-1], batch_id, now, row[-1]) for row in updates])
+    if creates:
+        placeholders = ', '.join('?' for _ in _WRITE_COLUMNS)
+        with deferred_point_search_inserts(connection):
+            connection.exec_driver_sql(
+                f"INSERT INTO point_info ({', '.join(_WRITE_COLUMNS)}, is_locked, import_batch, import_status, "
+                f"timestamp, created_at, current_version) VALUES ({placeholders}, 1, ?, 'created', ?, ?, 0)",
+                [(*row, batch_id, now, now) for row in creates])
+    invalidate_counts(['point_info'])
+
+
+_BOOLEAN_VALUES = {'true': True, '1': True, 'yes': True, 'y': True, 'false': False, '0': False, 'no': False, 'n': False}
+
+
+def _cell_text(value):
+    """把 XLSX 单元格的值转为与 CSV 读取结果一致的字符串，空单元格为 None；整数值的浮点数不带小数部分"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        return value
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def _csv_chunks(source, chunk_rows, columns):
+    """分块读取 CSV 中 columns 内的列（均为字符串），产出 (None, 行号, DataFrame)，行号以表头为第 1 行"""
+    next_row = 2
+    for chunk in pd.read_csv(source, dtype=str, chunksize=chunk_rows, encoding='utf-8-sig',
+                             usecols=lambda c: c in columns):
+        first_row, next_row = next_row, next_row + len(chunk)
+        yield None, range(first_row, next_row), chunk
+
+
+@contextmanager
+def _open_workbook(path):
+    # 以文件对象打开：openpyxl 按扩展名判断路径的文件格式，而暂存文件没有扩展名
+    with open(path, 'rb') as f:
+        workbook = openpyxl.load_workbook(f, read_only=True, data_only=True)
+        try:
+            yield workbook
+        finally:
+            workbook.close()
+
+
+def _xlsx_chunks(source, chunk_rows, columns, required, sheets=None, skipped_sheets=None):
+    """
+    以 openpyxl 只读模式逐行读取工作簿，产出 (工作表名, Excel 行号列表, DataFrame)。
+    每个工作表的第一行为表头，只保留 columns 内的列，空行跳过，每块最多 chunk_rows 行。
+    只处理 sheets 中的工作表（默认全部）；表头中没有 required 中任何列的工作表被跳过，名称追加到 skipped_sheets。
+    """
+    with _open_workbook(source) as workbook:
+        for sheet in workbook.worksheets:
+            if sheets is not None and sheet.title not in sheets:
+                continue
+            # 部分程序生成的文件记录的表格范围不准确，忽略范围逐行读到末尾
+            sheet.reset_dimensions()
+            rows = sheet.iter_rows(values_only=True)
+            header = [_cell_text(value) for value in next(rows, ())]
+            if not any(name in required for name in header):
+                if skipped_sheets is not None:
+                    skipped_sheets.append(sheet.title)
+                continue
+            keep = [i for i, name in enumerate(header) if name in columns]
+            names = [header[i] for i in keep]
+            numbers, values = [], []
+            for number, row in enumerate(rows, start=2):
+                if all(value is None or value == '' for value in row):
+                    continue
+                numbers.append(number)
+                values.append([_cell_text(row[i]) if i < len(row) else None for i in keep])
+                if len(values) >= chunk_rows:
+                    yield sheet.title, numbers, pd.DataFrame(values, columns=names, dtype=object)
+                    numbers, values = [], []
+            if values:
+                yield sheet.title, numbers, pd.DataFrame(values, columns=names, dtype=object)
+
+
+def _read_chunks(source, file_format, mapping, key, chunk_rows, sheets=None, skipped_sheets=None):
+    """按文件格式分块读取已映射的列，产出 (工作表名或 None, 行号, DataFrame)"""
+    if file_format == 'xlsx':
+        required = {column for column, field in mapping.items() if field == key}
+        return _xlsx_chunks(source, chunk_rows, mapping, required, sheets, skipped_sheets)
+    if file_format == 'csv':
+        return _csv_chunks(source, chunk_rows, mapping)
+    raise ValueError(f"Unsupported file format: {file_format}")
+
+
+def describe_points_file(source, file_format):
+    """
+    读取文件的表头和估计的数据行数，用于上传后选择列映射和显示导入进度。
+    返回 {'headers': [...], 'estimated_rows': n}；XLSX 另含 'sheets': [{'name', 'headers', 'estimated_rows'}]，
+    headers 为各工作表表头的并集。CSV 按换行符计数（字段内含换行时偏大），XLSX 取工作表记录的表格范围，未记录时为 None。
+    """
+    if file_format == 'csv':
+        headers = pd.read_csv(source, nrows=0, encoding='utf-8-sig').columns.tolist()
+        lines, last = 0, b'\n'
+        with open(source, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                lines += block.count(b'\n')
+                last = block[-1:]
+        if last != b'\n':
+            lines += 1
+        return {'headers': headers, 'estimated_rows': max(lines - 1, 0)}
+    if file_format != 'xlsx':
+        raise ValueError(f"Unsupported file format: {file_format}")
+
+    with _open_workbook(source) as workbook:
+        sheets = []
+        for sheet in workbook.worksheets:
+            header = [_cell_text(value) for value in next(sheet.iter_rows(max_row=1, values_only=True), ())]
+            # 没有记录表格范围的工作表行数未知
+            rows = None if sheet.max_row is None else max(sheet.max_row - 1, 0)
+            sheets.append({'name': sheet.title, 'headers': [name for name in header if name is not None],
+                           'estimated_rows': rows})
+    headers = list(dict.fromkeys(name for sheet in sheets for name in sheet['headers']))
+    counts = [sheet['estimated_rows'] for sheet in sheets]
+    return {'headers': headers, 'estimated_rows': None if None in counts else sum(counts), 'sheets': sheets}
+
+
+def _prepare_csv_chunk(chunk, mapping, key, rows):
+    """
+    重命名列并做向量化校验，返回 (有效行, 错误 Series)。rows 为各行在文件中的行号（表头为第 1 行）。
+    """
+    df = chunk.rename(columns=mapping)
+    df = df.loc[:, ~df.columns.duplicated()]
+    df = df[[name for name in df.columns if name in POINT_IMPORT_FIELDS]]
+    df.index = rows
+    if key not in df:
+        raise ValueError(f"Unique key ({key}) is not mapped to any column.")
+
+    errors = pd.Series(None, index=df.index, dtype=object)
+    errors = errors.mask(df[key].isna(), f'Unique key ({key}) is missing.')
+    if 'is_enabled' in df:
+        raw = df['is_enabled'].str.strip().str.lower()
+        parsed = raw.map(_BOOLEAN_VALUES)
+        errors = errors.mask(errors.isna() & raw.notna() & parsed.isna(), 'Invalid is_enabled value.')
+        df['is_enabled'] = parsed.astype(object)
+    return df[errors.isna()], errors.dropna()
+
+
+def _plan_csv_chunk(df, key, conflict_rule, summary):
+    """
+    把一块有效行与现有数据点比较，返回 (creates, updates, 错误 Series) 并累计 summary 计数。
+    同一块中重复的键：overwrite 时按出现顺序用非空值依次覆盖（groupby().last()），skip 时只保留第一行。
+    """
+    rows_per_key = df.groupby(key, sort=False).size()
+    if conflict_rule == 'skip':
+        summary['skipped'] += int((rows_per_key - 1).sum())
+        merged = df.drop_duplicates(key).set_index(key)
+    else:
+        merged = df.groupby(key, sort=False).last()
+
+    existing = _existing_frame(key, merged.index.tolist())
+    is_existing = merged.index.isin(existing.index)
+    errors = pd.Series(dtype=object)
+
+    # 新建
+    creates = merged[~is_existing].reset_index()
+    for name, default in POINT_IMPORT_FIELDS.items():
+        if name not in creates:
+            creates[name] = default
+        elif default is not None:
+            creates[name] = creates[name].where(creates[name].notna(), default)
+    if key != 'measurement':
+        no_measurement = creates['measurement'].isna()
+        if no_measurement.any():
+            bad = df[key].isin(creates.loc[no_measurement, key])
+            if conflict_rule == 'skip':
+                # 重复行已计入 skipped
+                bad &= ~df.duplicated(key)
+            bad_rows = df.index[bad]
+            errors = pd.Series('Missing required field: measurement', index=bad_rows, dtype=object)
+            creates = creates[~no_measurement]
+    summary['created'] += len(creates)
+    if conflict_rule == 'overwrite':
+        summary['updated'] += int(rows_per_key[creates[key]].sum()) - len(creates)
+
+    # 更新：只用非空值覆盖现有值，内容没有变化的不写入
+    matched = merged[is_existing]
+    if conflict_rule == 'skip':
+        summary['skipped'] += len(matched)
+        return creates, pd.DataFrame(), errors
+    if matched.empty:
+        return creates, pd.DataFrame(), errors
+    columns = list(POINT_IMPORT_FIELDS)
+    current = existing.loc[matched.index, columns + ['id', 'is_locked']]
+    target = matched.reindex(columns=columns).combine_first(current[columns])
+    target[key] = matched.index
+    same = ((target[columns] == current[columns]) | (target[columns].isna() & current[columns].isna())).all(axis=1)
+    unchanged = same & current['is_locked'].astype(bool)
+    summary['unchanged'] += int(rows_per_key[matched.index[unchanged]].sum())
+    summary['updated'] += int(rows_per_key[matched.index[~unchanged]].sum())
+    updates = target[~unchanged].copy()
+    updates['id'] = current.loc[~unchanged, 'id'].astype(int)
+    return creates, updates.reset_index(drop=True), errors
+
+
+def _frame_rows(frame, columns):
+    """按 columns 顺序把 DataFrame 转为值元组列表，缺失值转为 None"""
+    if frame.empty:
+        return []
+    frame = frame[list(columns)].astype(object)
+    return list(frame.where(frame.notna(), None).itertuples(index=False, name=None))
+
+
+def import_points_file(source, mapping, conflict_rule='skip', batch_id=None, key='normalized_point_name',
+                       chunk_rows=None, on_chunk=None, file_format='csv', sheets=None):
+    """
+    分块读取 CSV 或 XLSX 文件并导入数据点。source 为文件路径（CSV 也可以是文本流），mapping 为 {列名: 数据点字段}。
+
+    每块（chunk_rows 行，默认 POINT_IMPORT_CSV_CHUNK_ROWS）：向量化校验、一次查询查出已存在的键、
+    按 conflict_rule 计算新建和更新，然后在独立事务中批量写入。未映射到 POINT_IMPORT_FIELDS 的列被忽略。
+    校验失败的行收集到 error_details 而不是逐行抛出异常。on_chunk 与 bulk_upsert_points 相同，返回值也相同。
+
+    XLSX 依次导入 sheets 中的工作表（默认全部），error_details 中另含 'sheet'；
+    没有映射唯一键列的工作表被跳过，名称记录在返回值的 'skipped_sheets' 中。
+    """
+    if key not in POINT_IMPORT_KEYS:
+        raise ValueError(f"Unsupported import key: {key}")
+    if conflict_rule not in ('overwrite', 'skip'):
+        raise ValueError(f"Invalid conflict_rule: {conflict_rule}")
+    if key not in mapping.values():
+        raise ValueError(f"Unique key ({key}) is not mapped to any column.")
+    chunk_rows = chunk_rows or POINT_IMPORT_CSV_CHUNK_ROWS
+    start = time.monotonic()
+    summary = {'total': 0, 'created': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0, 'errors': 0,
+               'error_details': []}
+
+    skipped_sheets = []
+    for sheet, rows, chunk in _read_chunks(source, file_format, mapping, key, chunk_rows, sheets, skipped_sheets):
+        summary['total'] += len(chunk)
+        df, errors = _prepare_csv_chunk(chunk, mapping, key, rows)
+
+        counts = dict(summary)
+        if df.empty:
+            creates, updates, plan_errors = pd.DataFrame(), pd.DataFrame(), pd.Series(dtype=object)
+        else:
+            creates, updates, plan_errors = _plan_csv_chunk(df, key, conflict_rule, summary)
+        errors = pd.concat([errors, plan_errors])
+        try:
+            _write_chunk(_frame_rows(creates, _WRITE_COLUMNS), _frame_rows(updates, (*_WRITE_COLUMNS, 'id')), batch_id)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Point CSV import chunk failed (batch {batch_id}): {e}")
+            for name in ('created', 'updated', 'unchanged', 'skipped'):
+                summary[name] = counts[name]
+            failed = df.index[~df.index.isin(errors.index)]
+            errors = pd.concat([errors, pd.Series(str(e), index=failed, dtype=object)])
+        summary['errors'] += len(errors)
+        location = {} if sheet is None else {'sheet': sheet}
+        summary['error_details'].extend({'index': int(index), **location, 'error': message}
+                                        for index, message in errors.sort_index().items())
+        if on_chunk:
+            on_chunk(summary)
+
+    if file_format == 'xlsx':
+        summary['skipped_sheets'] = skipped_sheets
+    return _finish(summary, start)
+
+
+def _existing_keys(key, keys):
+    """一次查询返回 keys 中已存在的键集合（只读键列的索引）"""
+    if not keys:
+        return set()
+    key_column = getattr(PointInfo, key)
+    key_select = db.select(db.column('value')).select_from(func.json_each(json.dumps(list(keys))))
+    return set(db.session.execute(db.select(key_column).where(key_column.in_(key_select))).scalars())
+
+
+def preview_points_file(source, mapping, conflict_rule='skip', key='normalized_point_name', chunk_rows=None,
+                        preview_rows=5, sample_size=20, file_format='csv', sheets=None):
+    """
+    对整个文件计算导入结果而不写入：只读取已映射的列，每块用一次键查询判断是否已存在，
+    校验和冲突规则与 import_points_file 相同（文件中较早出现的新键视为已存在）。
+
+    返回 {'summary': {new/overwrite/skip/error 行数}, 'total_rows', 'preview_data': 前 preview_rows 行,
+    'conflicts': 最先出现的 sample_size 个冲突行, 'errors': 最先出现的 sample_size 个错误行}，
+    每行含映射后的字段、_row（文件中的行号）、_status 和 _error，XLSX 另含 _sheet；XLSX 还返回 'skipped_sheets'。
+    """
+    if key not in POINT_IMPORT_KEYS:
+        raise ValueError(f"Unsupported import key: {key}")
+    if key not in mapping.values():
+        raise ValueError(f"Unique key ({key}) is not mapped to any column.")
+    conflict_status = 'overwrite' if conflict_rule == 'overwrite' else 'skip'
+    chunk_rows = chunk_rows or POINT_IMPORT_CSV_CHUNK_ROWS
+    summary = {'new': 0, 'overwrite': 0, 'skip': 0, 'error': 0}
+    result = {'summary': summary, 'total_rows': 0, 'preview_data': [], 'conflicts': [], 'errors': []}
+    seen = set()
+
+    skipped_sheets = []
+    for sheet, rows, chunk in _read_chunks(source, file_format, mapping, key, chunk_rows, sheets, skipped_sheets):
+        df, messages = _prepare_csv_chunk(chunk, mapping, key, rows)
+        status = pd.Series('error', index=rows, dtype=object)
+
+        if not df.empty:
+            keys = df[key]
+            # seen 随文件增长，逐个判断成员关系，避免 isin 每块都把整个集合转为数组
+            existing = _existing_keys(key, keys.unique().tolist())
+            known = pd.Series([k in seen or k in existing for k in keys], index=df.index)
+            first = ~keys.duplicated()
+            new_first = first & ~known
+            bad = pd.Series(False, index=df.index)
+            if key != 'measurement':
+                has_measurement = df['measurement'].notna() if 'measurement' in df else pd.Series(False, index=df.index)
+                if conflict_rule == 'overwrite':
+                    # 覆盖模式下同一块中重复的键合并后只要有一行提供 measurement 即可创建
+                    has_measurement = has_measurement.groupby(keys).transform('any')
+                bad = ~known & keys.isin(keys[new_first & ~has_measurement])
+                if conflict_rule != 'overwrite':
+                    bad &= first
+            row_status = pd.Series(conflict_status, index=df.index, dtype=object).mask(new_first, 'new')
+            status.loc[df.index] = row_status.mask(bad, 'error')
+            messages = pd.concat([messages, pd.Series('Missing required field: measurement',
+                                                      index=df.index[bad], dtype=object)])
+            seen.update(keys[new_first & ~bad].tolist())
+
+        result['total_rows'] += len(chunk)
+        for name, count in status.value_counts().items():
+            summary[name] += int(count)
+        _collect_samples(result['preview_data'], sheet, chunk, mapping, status, messages, status.index, preview_rows)
+        _collect_samples(result['conflicts'], sheet, chunk, mapping, status, messages,
+                         status.index[status.isin(('overwrite', 'skip'))], sample_size)
+        _collect_samples(result['errors'], sheet, chunk, mapping, status, messages, messages.index, sample_size)
+    if file_format == 'xlsx':
+        result['skipped_sheets'] = skipped_sheets
+    return result
+
+
+def _collect_samples(samples, sheet, chunk, mapping, status, messages, rows, limit):
+    """把 rows 中的前若干行（按映射后的字段）追加到 samples，直到 limit 行"""
+    remaining = limit - len(samples)
+    if remaining <= 0 or len(rows) == 0:
+        return
+    rows = sorted(rows)[:remaining]
+    frame = chunk.rename(columns=mapping)
+    frame = frame.loc[:, ~frame.columns.duplicated()]
+    frame.index = status.index
+    frame = frame.loc[rows].astype(object)
+    for row_number, values in frame.where(frame.notna(), None).iterrows():
+        sample = {**values.to_dict(), '_row': int(row_number), '_status': status[row_number],
+                  '_error': messages.get(row_number)}
+        if sheet is not None:
+            sample['_sheet'] = sheet
+        samples.append(sample)
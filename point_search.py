@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+数据点全文检索
+功能：基于 SQLite FTS5 (trigram 分词) 的数据点搜索索引，替代多列 ILIKE '%term%' 全表扫描
+作者：项目开发团队
+
+point_info_fts 的 rowid 等于 point_info.id，收录测点名、原始/标准化名称、注释、导入批次和所属配置文件名，
+由 point_info 和 config_files 上的触发器保持同步。trigram 分词支持任意位置的子串匹配（不区分大小写），
+与原 ILIKE 语义一致，但每个搜索词至少需要 3 个字符；更短的词仍按 ILIKE 过滤。
+
+表结构由 Alembic 迁移创建；不经过迁移、用 db.create_all() 建库时须再调用 create_point_search_schema。
+对 point_info 做需要重建表的迁移（batch_alter_table 复制表）会丢失触发器，
+之后执行 `flask rebuild-point-search` 重新创建索引和触发器。
+"""
+
+import time
+from contextlib import contextmanager
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import text, or_
+
+from models import db, PointInfo, ConfigFile
+
+POINT_SEARCH_TABLE = 'point_info_fts'
+POINT_SEARCH_MIN_TERM_LENGTH = 3  # trigram 分词可检索的最短词长
+
+# 索引列及其 bm25 权重，名称类字段命中时排名靠前
+POINT_SEARCH_COLUMNS = (
+    ('measurement', 5.0),
+    ('original_point_name', 8.0),
+    ('normalized_point_name', 10.0),
+    ('point_comment', 1.0),
+    ('import_batch', 1.0),
+    ('config_file_name', 2.0),
+)
+
+_COLUMN_NAMES = ', '.join(name for name, _ in POINT_SEARCH_COLUMNS)
+_NEW_VALUES = ("new.measurement, new.original_point_name, new.normalized_point_name, new.point_comment, "
+               "new.import_batch, (SELECT file_name FROM config_files WHERE id = new.config_file_id)")
+
+POINT_SEARCH_TABLE_DDL = (f"CREATE VIRTUAL TABLE IF NOT EXISTS {POINT_SEARCH_TABLE} "
+                          f"USING fts5({_COLUMN_NAMES}, tokenize='trigram')")
+
+# 逐行写入索引的 INSERT 触发器；批量插入时由 deferred_point_search_inserts 暂时删除
+POINT_SEARCH_INSERT_TRIGGER = 'point_info_fts_ai'
+POINT_SEARCH_INSERT_TRIGGER_DDL = f"""CREATE TRIGGER IF NOT EXISTS {POINT_SEARCH_INSERT_TRIGGER} AFTER INSERT ON point_info BEGIN
+        INSERT INTO {POINT_SEARCH_TABLE}(rowid, {_COLUMN_NAMES}) VALUES (new.id, {_NEW_VALUES});
+    END"""
+
+# 同步触发器：{名称: DDL}，与迁移 506b1dd47844 中的定义一致
+POINT_SEARCH_TRIGGERS = {
+    POINT_SEARCH_INSERT_TRIGGER: POINT_SEARCH_INSERT_TRIGGER_DDL,
+    'point_info_fts_ad': f"""CREATE TRIGGER IF NOT EXISTS point_info_fts_ad AFTER DELETE ON point_info BEGIN
+        DELETE FROM {POINT_SEARCH_TABLE} WHERE rowid = old.id;
+    END""",
+    'point_info_fts_au': f"""CREATE TRIGGER IF NOT EXISTS point_info_fts_au
+    AFTER UPDATE OF measurement, original_point_name, normalized_point_name, point_comment, import_batch, config_file_id
+    ON point_info BEGIN
+        DELETE FROM {POINT_SEARCH_TABLE} WHERE rowid = old.id;
+        INSERT INTO {POINT_SEARCH_TABLE}(rowid, {_COLUMN_NAMES}) VALUES (new.id, {_NEW_VALUES});
+    END""",
+    'config_files_fts_au': f"""CREATE TRIGGER IF NOT EXISTS config_files_fts_au AFTER UPDATE OF file_name ON config_files BEGIN
+        UPDATE {POINT_SEARCH_TABLE} SET config_file_name = new.file_name
+        WHERE rowid IN (SELECT id FROM point_info WHERE config_file_id = new.id);
+    END""",
+    'config_files_fts_ad': f"""CREATE TRIGGER IF NOT EXISTS config_files_fts_ad AFTER DELETE ON config_files BEGIN
+        UPDATE {POINT_SEARCH_TABLE} SET config_file_name = NULL
+        WHERE rowid IN (SELECT id FROM point_info WHERE config_file_id = old.id);
+    END""",
+}
+
+POINT_SEARCH_POPULATE = f"""
+    INSERT INTO {POINT_SEARCH_TABLE}(rowid, {_COLUMN_NAMES})
+    SELECT p.id, p.measurement, p.original_point_name, p.normalized_point_name, p.point_comment,
+           p.import_batch, c.file_name
+    FROM point_info p LEFT JOIN config_files c ON c.id = p.config_file_id
+"""
+
+_RANK_EXPRESSION = f"bm25({POINT_SEARCH_TABLE}, {', '.join(str(weight) for _, weight in POINT_SEARCH_COLUMNS)})"
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Alembic 自动生成迁移时忽略 FTS5 虚拟表及其影子表"""
+    if type_ == 'table' and name.startswith(POINT_SEARCH_TABLE):
+        return False
+    return True
+
+
+def _match_expression(terms, field=None):
+    # 每个词作为 FTS5 短语（双引号转义），多个词之间为 AND；指定列时使用列过滤语法 "列名 : 短语"
+    prefix = f"{field} : " if field else ""
+    return ' AND '.join(prefix + '"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def apply_point_search(query, search, field=None):
+    """
+    为 PointInfo 查询加上搜索条件，按空白拆分为多个词，所有词都需匹配。
+    field 为 POINT_SEARCH_COLUMNS 中的列名时只在该列中搜索。
+    返回 (query, rank)：rank 为 bm25 相关度列（越小越相关），没有可走索引的词时为 None。
+    """
+    if field not in dict(POINT_SEARCH_COLUMNS):
+        field = None
+    terms = search.split()
+    indexed = [t for t in terms if len(t) >= POINT_SEARCH_MIN_TERM_LENGTH]
+    short = [t for t in terms if len(t) < POINT_SEARCH_MIN_TERM_LENGTH]
+
+    rank = None
+    if indexed:
+        matches = text(
+            f"SELECT rowid AS point_id, {_RANK_EXPRESSION} AS rank "
+            f"FROM {POINT_SEARCH_TABLE} WHERE {POINT_SEARCH_TABLE} MATCH :match"
+        ).bindparams(match=_match_expression(indexed, field)).columns(point_id=db.Integer, rank=db.Float).subquery('point_search')
+        query = query.join(matches, matches.c.point_id == PointInfo.id)
+        rank = matches.c.rank
+
+    if short:
+        columns = {
+            'measurement': PointInfo.measurement,
+            'original_point_name': PointInfo.original_point_name,
+            'normalized_point_name': PointInfo.normalized_point_name,
+            'point_comment': PointInfo.point_comment,
+            'import_batch': PointInfo.import_batch,
+            'config_file_name': ConfigFile.file_name,
+        }
+        if field is None or field == 'config_file_name':
+            query = query.outerjoin(ConfigFile, PointInfo.config_file_id == ConfigFile.id)
+        for term in short:
+            search_term = f"%{term}%"
+            if field:
+                query = query.filter(columns[field].ilike(search_term))
+            else:
+                query = query.filter(or_(*(column.ilike(search_term) for column in columns.values())))
+    return query, rank
+
+
+@contextmanager
+def deferred_point_search_inserts(connection):
+    """
+    批量插入数据点时暂停逐行维护索引的 INSERT 触发器，结束时用一条 INSERT ... SELECT 把新插入的数据点
+    写入索引并恢复触发器。SQLite 的 DDL 是事务性的：整个过程在同一个写事务中完成，其他连接看不到
+    触发器缺失的状态；出错时由调用方回滚，触发器随之恢复。
+    """
+    if not connection.connection.dbapi_connection.in_transaction:
+        # pysqlite 不会在 DDL 前自动开启事务，先显式开启写事务
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+    max_id = connection.execute(text("SELECT coalesce(max(id), 0) FROM point_info")).scalar()
+    connection.execute(text(f"DROP TRIGGER IF EXISTS {POINT_SEARCH_INSERT_TRIGGER}"))
+    yield
+    connection.execute(text(POINT_SEARCH_POPULATE + " WHERE p.id > :max_id"), {'max_id': max_id})
+    connection.execute(text(POINT_SEARCH_INSERT_TRIGGER_DDL))
+
+
+def create_point_search_schema(connection):
+    """
+    创建索引表和同步触发器（已存在的跳过），结构与迁移 506b1dd47844 相同。在调用方的事务中执行。
+    用于不经过 Alembic 迁移建库的场景（如 DatabaseManager.reinitialize_database 中的 db.create_all()）。
+    """
+    connection.execute(text(POINT_SEARCH_TABLE_DDL))
+    for statement in POINT_SEARCH_TRIGGERS.values():
+        connection.execute(text(statement))
+
+
+def rebuild_point_search_index(connection):
+    """
+    删除并重建索引表和触发器，再从 point_info 全量导入。在调用方的事务中执行，返回导入行数。
+    """
+    for trigger in POINT_SEARCH_TRIGGERS:
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+    connection.execute(text(f"DROP TABLE IF EXISTS {POINT_SEARCH_TABLE}"))
+    create_point_search_schema(connection)
+    count = connection.execute(text(POINT_SEARCH_POPULATE)).rowcount
+    connection.execute(text(f"INSERT INTO {POINT_SEARCH_TABLE}({POINT_SEARCH_TABLE}) VALUES ('optimize')"))
+    return count
+
+
+@click.command('rebuild-point-search')
+@with_appcontext
+def rebuild_point_search_command():
+    """重建数据点全文检索索引和同步触发器"""
+    start = time.monotonic()
+    with db.engine.begin() as connection:
+        count = rebuild_point_search_index(connection)
+    click.echo(f"Rebuilt {POINT_SEARCH_TABLE}: {count} points indexed in {time.monotonic() - start:.1f}s")
@@ -15,7 +15,8 @@ import logging  # 日志记录
 import threading # 多线程
 from queue import Queue # 队列
 from config_manager import config_manager  # 配置文件管理器
-from db_manager import insert_log_entry, DUCKDB_PATH, get_duckdb_connection # DuckDB 日志管理器
+from db_manager import DUCKDB_PATH # DuckDB 日志管理器
+from log_pipeline import log_pipeline # 有界、带背压的日志写入管道
 from models import TelegrafProcess, db # 导入 TelegrafProcess 模型和 db 实例
 
 # 定义项目内部的日志目录
@@ -91,14 +92,8 @@ def start_process(config_file_path, config_file_name, process_name=None):
         
         actual_process_name = process_name or f'telegraf_{config_file_name}_{telegraf_pid}'
 
-        # 启动日志读取线程
-        log_conn = get_duckdb_connection()
-        log_thread = threading.Thread(
-            target=_log_reader,
-            args=(log_conn, log_file_path, telegraf_pid, actual_process_name, config_file_path, 'stdout')
-        )
-        log_thread.daemon = True
-        log_thread.start()
+        # 由日志管道尾随日志文件，写入 DuckDB 的工作交给管道的写入线程
+        log_pipeline.follow(log_file_path, telegraf_pid, actual_process_name, config_file_path, 'stdout')
 
         return {
             'success': True,
@@ -115,28 +110,6 @@ def start_process(config_file_path, config_file_name, process_name=None):
         return {'success': False, 'error': f'启动进程时发生异常: {str(e)}'}
 
 
-def _log_reader(conn, log_file_path, process_pid, process_name, config_file, log_type):
-    """
-    在单独的线程中读取进程的日志文件，并将日志写入 DuckDB。
-    """
-    try:
-        while not os.path.exists(log_file_path):
-            time.sleep(0.1)
-
-        with open(log_file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            while psutil.pid_exists(process_pid):
-                line = f.readline()
-                if line:
-                    message = line.strip()
-                    if message:
-                        insert_log_entry(conn, datetime.now(timezone.utc), process_pid, process_name, config_file, log_type, message)
-                else:
-                    time.sleep(0.5) # 文件末尾，稍作等待
-    except Exception as e:
-        logger.error(f"日志读取线程异常 (PID: {process_pid}): {e}")
-    finally:
-        conn.close()
-
 def stop_process(process_id):
     """
     停止指定的 Telegraf 进程
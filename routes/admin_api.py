@@ -4,12 +4,16 @@
 """
 
 import math
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
 from flask import Blueprint, request
 from flask_login import login_required
 
 from models import db, User
-from db_manager import get_duckdb_connection
-from api_utils import success_response, get_pagination_params, error_response, add_audit_log
+from db_manager import duckdb_cursor
+from api_utils import (success_response, get_pagination_params, error_response, add_audit_log,
+                       encode_cursor, decode_cursor)
 
 admin_api_bp = Blueprint('admin_api', __name__, url_prefix='/api')
 
@@ -88,88 +92,198 @@ def delete_user(user_id):
     return success_response('User deleted successfully.')
 
 
+# 审计日志总数缓存：{(where 子句, 参数): (计数, 过期时间)}，每个工作进程各自缓存
+AUDIT_COUNT_CACHE_SECONDS = 30
+_audit_count_cache = {}
+
+AUDIT_COLUMNS = ['timestamp', 'username', 'ip_address', 'action', 'status', 'details']
+
+def parse_time_param(value, name):
+    """解析 ISO 8601 时间参数（空值返回 None），带时区的统一转换为 UTC（审计时间和日志时间按 UTC 存储）"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid {name}: {value}")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def build_audit_filters(params_source):
+    """
+    根据请求参数生成审计日志过滤条件：since/until 时间范围 (ISO 8601)，
+    action/status/username 精确匹配 (多个值用逗号分隔)，search 为跨列模糊搜索。
+    返回 (where 子句, 参数, since, until)。
+    """
+    conditions = []
+    params = []
+    bounds = {}
+    for name, op in (('since', '>='), ('until', '<')):
+        value = params_source.get(name)
+        bounds[name] = parse_time_param(value, name)
+        if value:
+            conditions.append(f"timestamp {op} ?")
+            params.append(bounds[name])
+    for name in ('action', 'status', 'username'):
+        value = params_source.get(name)
+        if value:
+            values = [v.strip() for v in value.split(',') if v.strip()]
+            conditions.append(f"{name} IN ({','.join(['?'] * len(values))})")
+            params.extend(values)
+    search_value = params_source.get('search[value]') or params_source.get('search')
+    if search_value:
+        like_term = f'%{search_value}%'
+        conditions.append("(username ILIKE ? OR ip_address ILIKE ? OR action ILIKE ? OR status ILIKE ? OR details ILIKE ?)")
+        params.extend([like_term] * 5)
+    where_clause = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    return where_clause, params, bounds['since'], bounds['until']
+
+def _count_audit_log(cur, where_clause, params):
+    """
+    返回 (总数, 是否为估算值)。无过滤条件时读取表的估算行数；
+    有过滤条件时精确计数并在本进程内缓存 AUDIT_COUNT_CACHE_SECONDS 秒。
+    """
+    if not where_clause:
+        row = cur.execute(
+            "SELECT estimated_size FROM duckdb_tables() WHERE table_name = 'audit_log' AND schema_name = 'main'"
+        ).fetchone()
+        return (row[0] if row else 0), True
+
+    key = (where_clause, tuple(str(p) for p in params))
+    now = time.monotonic()
+    cached = _audit_count_cache.get(key)
+    if cached and cached[1] > now:
+        return cached[0], True
+    count = cur.execute(f"SELECT COUNT(*) FROM audit_log{where_clause}", params).fetchone()[0]
+    if len(_audit_count_cache) > 256:
+        _audit_count_cache.clear()
+    _audit_count_cache[key] = (count, now + AUDIT_COUNT_CACHE_SECONDS)
+    return count, False
+
+def _fetch_recent_audit_rows(cur, where_clause, params, limit, offset=0, upper=None, since=None):
+    """
+    按 (timestamp, id) 倒序取一页审计日志。DuckDB 没有有序索引，直接 ORDER BY ... LIMIT 需要扫描全表；
+    审计日志按时间顺序写入，因此从 upper 往前 1 小时的窗口开始查询（zonemap 可跳过窗口外的数据块），
+    行数不足一页时窗口扩大 24 倍，直到覆盖 since 或全表。
+    """
+    if upper is None:
+        upper = cur.execute("SELECT max(timestamp) FROM audit_log").fetchone()[0]
+    span = timedelta(hours=1)
+    while True:
+        lower = upper - span if upper is not None and span is not None else None
+        if lower is not None and since is not None and lower <= since:
+            lower = None
+        window_clause, window_params = where_clause, list(params)
+        if lower is not None:
+            window_clause += (" AND " if window_clause else " WHERE ") + "timestamp >= ?"
+            window_params.append(lower)
+        rows = cur.execute(f"""
+            SELECT id, timestamp, username, ip_address, action, status, details
+            FROM audit_log
+            {window_clause}
+            ORDER BY timestamp DESC, id DESC
+            LIMIT ? OFFSET ?
+        """, window_params + [limit, offset]).fetchall()
+        if len(rows) >= limit or lower is None:
+            return rows
+        span = span * 24 if span < timedelta(days=3650) else None
+
+def _format_audit_row(row):
+    return {
+        'id': str(row[0]),
+        'timestamp': row[1].isoformat(),
+        'username': row[2],
+        'ip_address': row[3],
+        'action': row[4],
+        'status': row[5],
+        'details': row[6]
+    }
+
 @admin_api_bp.route('/audit_log', methods=['GET', 'POST'])
 @login_required
 def get_audit_log():
     """
-    获取审计日志记录，为 DataTables 服务器端处理进行优化。
-    支持分页、搜索和排序，可通过 GET 或 POST 请求。
+    获取审计日志记录。
+    - 带 cursor 参数时使用键集分页：按 (timestamp, id) 倒序，cursor 为空表示第一页，
+      返回 next_cursor 用于获取下一页，翻页代价与页码无关。
+    - 否则为 DataTables 服务器端处理格式（draw/start/length/search/order），可通过 GET 或 POST 请求。
+    两种方式都支持 since/until/action/status/username 过滤；总数为估算或缓存值。
     """
-    conn = get_duckdb_connection()
+    # 根据请求方法确定参数来源
+    if request.method == 'POST':
+        params_source = request.form
+    else:
+        params_source = request.args
+
     try:
-        # 根据请求方法确定参数来源
-        if request.method == 'POST':
-            params_source = request.form
-        else:
-            params_source = request.args
+        where_clause, params, since, until = build_audit_filters(params_source)
+        cursor = params_source.get('cursor')
+        after = decode_cursor(cursor, 2) if cursor else None
+        if after:
+            # 游标由客户端传回，两个键值都需校验，否则会在 DuckDB 中转换失败
+            try:
+                after_time = datetime.fromisoformat(after[0])
+                uuid.UUID(after[1])
+            except (TypeError, ValueError, AttributeError):
+                raise ValueError(f"Invalid cursor: {cursor}")
+    except ValueError as e:
+        return error_response(str(e), 400)
+
+    with duckdb_cursor() as cur:
+        if 'cursor' in params_source:
+            limit = min(max(params_source.get('limit', 50, type=int) or 50, 1), 1000)
+            keyset_clause = where_clause
+            keyset_params = list(params)
+            upper = until
+            if after:
+                keyset_clause += " AND " if keyset_clause else " WHERE "
+                keyset_clause += "(timestamp < ?::TIMESTAMP OR (timestamp = ?::TIMESTAMP AND id < ?::UUID))"
+                keyset_params += [after[0], after[0], after[1]]
+                upper = after_time
+            rows = _fetch_recent_audit_rows(cur, keyset_clause, keyset_params, limit + 1, upper=upper, since=since)
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            total, total_is_estimate = _count_audit_log(cur, where_clause, params)
+            next_cursor = encode_cursor([rows[-1][1].isoformat(), str(rows[-1][0])]) if has_more else None
+            return success_response('Audit log retrieved', {
+                'items': [_format_audit_row(row) for row in rows],
+                'next_cursor': next_cursor,
+                'has_more': has_more,
+                'total': total,
+                'total_is_estimate': total_is_estimate
+            })
 
         # DataTables parameters
         draw = params_source.get('draw', 1, type=int)
         start = params_source.get('start', 0, type=int)
         length = params_source.get('length', 10, type=int)
-        search_value = params_source.get('search[value]', '', type=str)
         order_column_index = params_source.get('order[0][column]', 0, type=int)
-        order_dir = params_source.get('order[0][dir]', 'desc', type=str)
-
-        columns = ['timestamp', 'username', 'ip_address', 'action', 'status', 'details']
-        order_column_name = columns[order_column_index] if 0 <= order_column_index < len(columns) else 'timestamp'
-
-        # Base query
-        base_query = "FROM audit_log"
-        
-        # Total records
-        total_records_result = conn.execute(f"SELECT COUNT(*) {base_query}").fetchone()
-        total_records = total_records_result[0] if total_records_result else 0
-
-        # Filtering
-        where_clause = ""
-        params = []
-        if search_value:
-            like_term = f'%{search_value}%'
-            where_clause = " WHERE username ILIKE ? OR ip_address ILIKE ? OR action ILIKE ? OR status ILIKE ? OR details ILIKE ?"
-            params = [like_term] * 5
-        
-        # Filtered records count
-        count_query = f"SELECT COUNT(*) {base_query}{where_clause}"
-        filtered_records_result = conn.execute(count_query, params).fetchone()
-        records_filtered = filtered_records_result[0] if filtered_records_result else 0
-
-        # Data query
-        data_query = f"""
-            SELECT id, timestamp, username, ip_address, action, status, details 
-            {base_query}
-            {where_clause}
-            ORDER BY {order_column_name} {order_dir}
-            LIMIT ? OFFSET ?
-        """
-        
-        final_params = params + [length, start]
-        logs_data = conn.execute(data_query, final_params).fetchall()
-
-        # Format data for response
-        items = [
-            {
-                'id': row[0],
-                'timestamp': row[1].isoformat(),
-                'username': row[2],
-                'ip_address': row[3],
-                'action': row[4],
-                'status': row[5],
-                'details': row[6]
-            }
-            for row in logs_data
-        ]
-
-        # DataTables response format
-        response = {
-            'draw': draw,
-            'recordsTotal': total_records,
-            'recordsFiltered': records_filtered,
-            'data': items
-        }
-        
-        # Note: We are not using the standard success_response wrapper here
-        # because DataTables expects a specific top-level structure.
-        return response
-    finally:
-        conn.close()
+        order_dir = 'asc' if params_source.get('order[0][dir]', 'desc', type=str) == 'asc' else 'desc'
+        order_column_name = AUDIT_COLUMNS[order_column_index] if 0 <= order_column_index < len(AUDIT_COLUMNS) else 'timestamp'
+
+        total_records, _ = _count_audit_log(cur, "", [])
+        records_filtered = total_records
+        if where_clause:
+            records_filtered, _ = _count_audit_log(cur, where_clause, params)
+
+        # 深分页仍按 OFFSET 处理，逐步扩大窗口只对靠前的页有利
+        if order_column_name == 'timestamp' and order_dir == 'desc' and start <= 1000:
+            logs_data = _fetch_recent_audit_rows(cur, where_clause, params, length, offset=start, upper=until, since=since)
+        else:
+            logs_data = cur.execute(f"""
+                SELECT id, timestamp, username, ip_address, action, status, details
+                FROM audit_log
+                {where_clause}
+                ORDER BY {order_column_name} {order_dir}, id {order_dir}
+                LIMIT ? OFFSET ?
+            """, params + [length, start]).fetchall()
+
+    # Note: We are not using the standard success_response wrapper here
+    # because DataTables expects a specific top-level structure.
+    return {
+        'draw': draw,
+        'recordsTotal': total_records,
+        'recordsFiltered': records_filtered,
+        'data': [_format_audit_row(row) for row in logs_data]
+    }
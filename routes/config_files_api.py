@@ -16,6 +16,7 @@ from flask_login import login_required
 from models import db, ConfigFile, TelegrafProcess, DirectorySetting, ConfigSnippet, PointInfo
 from config_manager import config_version_service
 from api_utils import handle_api_error, success_response, error_response, add_audit_log
+from serializers import serialize_point_infos, get_config_file_runtime_info
 
 logger = logging.getLogger(__name__)
 
@@ -132,25 +133,25 @@ def get_config_files():
                     config_filename_to_proc[config_filename] = proc_info
                     break
 
+    # 受管进程状态和数据点数量按整页批量查询
+    managed_running, point_counts = get_config_file_runtime_info([c.id for c in paginated_configs])
+
     data = []
     for config in paginated_configs:
         config_dict = config.to_dict()
         
         running_proc_info = config_filename_to_proc.get(config.file_name)
         is_running = running_proc_info is not None
-        
-        managed_process_record = TelegrafProcess.query.filter_by(config_file_id=config.id).first()
 
         config_dict['running_status'] = {
             'is_running': is_running,
-            'managed_by': 'system' if managed_process_record and managed_process_record.status == 'running' else ('unmanaged' if is_running else 'none')
+            'managed_by': 'system' if managed_running.get(config.id) else ('unmanaged' if is_running else 'none')
         }
 
         if config.data_points_synced:
             config_dict['sync_status'] = '已同步'
         else:
-            point_count = PointInfo.query.filter_by(config_file_id=config.id).count()
-            config_dict['sync_status'] = '部分同步' if point_count > 0 else '未同步'
+            config_dict['sync_status'] = '部分同步' if point_counts.get(config.id, 0) > 0 else '未同步'
 
         data.append(config_dict)
 
@@ -212,7 +213,7 @@ def get_config_file_detail(id):
 
     # Get linked points for the new tab
     linked_points = PointInfo.query.filter_by(config_file_id=id).order_by(PointInfo.measurement).all()
-    config_dict['linked_points'] = [p.to_dict() for p in linked_points]
+    config_dict['linked_points'] = serialize_point_infos(linked_points)
 
     return success_response("Config file retrieved successfully", config_dict)
 
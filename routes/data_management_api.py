@@ -1,6 +1,7 @@
 import re
 import json
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app, url_for
+from flask_login import current_user, login_required
 from sqlalchemy import func
 from sqlalchemy.exc import IntegrityError
 from werkzeug.utils import secure_filename
@@ -8,8 +9,14 @@ import pandas as pd
 import uuid
 from datetime import datetime, timezone
 
-from models import db, PointInfo, PointTemplate, ProcessingTag, OutputSource, GlobalParameter, ConfigFile, PointInfoHistory
-from api_utils import handle_api_error, add_audit_log, get_pagination_params
+from models import (db, PointInfo, PointTemplate, ProcessingTag, OutputSource, GlobalParameter, ConfigFile, PointInfoHistory,
+                    output_source_config_file_association, global_parameter_config_file_association)
+from api_utils import handle_api_error, add_audit_log, get_pagination_params, error_response, success_response
+from pagination import paginate_query
+from point_search import apply_point_search
+from point_import import POINT_IMPORT_FIELDS, bulk_upsert_points, ids_condition, snapshot_points, rollback_batch_points
+from import_jobs import new_batch_id, start_import_job
+from serializers import serialize_point_infos, serialize_output_sources, serialize_global_parameters
 
 
 data_management_api_bp = Blueprint('data_management_api', __name__)
@@ -20,54 +27,60 @@ def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-@data_management_api_bp.route('/point_info', methods=['GET'])
-@handle_api_error
-def get_point_info():
-    page, per_page = get_pagination_params(request)
-    offset = (page - 1) * per_page
-    
+def _parse_bool_param(value):
+    if isinstance(value, bool):
+        return value
+    if value is None or str(value).strip() == '':
+        return None
+    return str(value).strip().lower() in ('1', 'true', 'yes')
+
+def build_point_query(params):
+    """
+    按列表接口的过滤参数构造 PointInfo 查询，params 可以是 request.args 或 JSON 对象。
+    返回 (query, extra_sorts)，有全文检索词时 extra_sorts 含 'relevance'。
+
+    支持: search / search_field（全文检索，可限定列）、unlinked_only、config_file_id（多个用逗号分隔）、
+    import_batch、data_source、is_locked、is_enabled。参数值无效时抛出 ValueError。
+    """
     query = PointInfo.query
+    extra_sorts = {}
 
-    # Search
-    search = request.args.get('search')
+    search = params.get('search')
     if search:
-        search_term = f"%{search}%"
-        # Join with ConfigFile to allow searching by config file name
-        query = query.outerjoin(ConfigFile, PointInfo.config_file_id == ConfigFile.id)
-        query = query.filter(
-            db.or_(
-                PointInfo.measurement.ilike(search_term),
-                PointInfo.original_point_name.ilike(search_term),
-                PointInfo.normalized_point_name.ilike(search_term),
-                PointInfo.point_comment.ilike(search_term),
-                PointInfo.import_batch.ilike(search_term),
-                ConfigFile.file_name.ilike(search_term)
-            )
-        )
-
-    # Sorting
-    sort_by = request.args.get('sort_by', 'id')
-    sort_dir = request.args.get('sort_dir', 'asc')
-    if hasattr(PointInfo, sort_by):
-        if sort_dir == 'desc':
-            query = query.order_by(db.desc(getattr(PointInfo, sort_by)))
-        else:
-            query = query.order_by(db.asc(getattr(PointInfo, sort_by)))
-
-    total_items = query.count()
-    paginated_items = query.offset(offset).limit(per_page).all()
-
-    results = [item.to_dict() for item in paginated_items]
+        query, rank = apply_point_search(query, search, params.get('search_field'))
+        if rank is not None:
+            extra_sorts['relevance'] = rank
+
+    if _parse_bool_param(params.get('unlinked_only')):
+        query = query.filter(PointInfo.config_file_id.is_(None))
+    config_file_id = params.get('config_file_id')
+    if config_file_id not in (None, ''):
+        try:
+            ids = [int(v) for v in str(config_file_id).split(',') if v.strip()]
+        except ValueError:
+            raise ValueError(f"Invalid config_file_id: {config_file_id}")
+        query = query.filter(PointInfo.config_file_id.in_(ids))
+    for name in ('import_batch', 'data_source'):
+        value = params.get(name)
+        if value:
+            query = query.filter(getattr(PointInfo, name) == value)
+    for name in ('is_locked', 'is_enabled'):
+        value = _parse_bool_param(params.get(name))
+        if value is not None:
+            query = query.filter(getattr(PointInfo, name).is_(value))
+    return query, extra_sorts
 
-    return jsonify({
-        'items': results,
-        'pagination': {
-            'total': total_items,
-            'page': page,
-            'per_page': per_page,
-            'pages': (total_items + per_page - 1) // per_page
-        }
-    })
+@data_management_api_bp.route('/point_info', methods=['GET'])
+@handle_api_error
+def get_point_info():
+    # Filters and search: FTS5 全文索引，有搜索词时默认按相关度排序 (sort_by=relevance)
+    # Sorting and pagination (page/per_page or keyset cursor)
+    try:
+        query, extra_sorts = build_point_query(request.args)
+        return jsonify(paginate_query(query, PointInfo, serialize_point_infos,
+                                      default_sort='relevance' if extra_sorts else 'id', extra_sorts=extra_sorts))
+    except ValueError as e:
+        return error_response(str(e), 400)
 
 @data_management_api_bp.route('/point_info/<int:item_id>', methods=['PUT'])
 @handle_api_error
@@ -151,111 +164,111 @@ def import_point_info():
     if not isinstance(points_to_process, list):
         return jsonify({"error": "Invalid data format: 'points' should be a list"}), 400
 
-    batch_id = f"batch_{int(datetime.now(timezone.utc).timestamp())}"
-    
-    summary = {'created': 0, 'updated': 0, 'skipped': 0, 'errors': 0}
-    error_details = []
-
+    records = []
     for index, item in enumerate(points_to_process):
+        if not isinstance(item, dict):
+            records.append((index, {}))
+            continue
+        values = {name: item[name] for name in POINT_IMPORT_FIELDS if name in item}
+        for name in ('tags', 'fields'):
+            if name in values:
+                values[name] = json.dumps(values[name])
+        records.append((index, values))
+
+    # 预加载现有数据点后在内存中比较，按块在独立事务中批量写入；skip 以外的规则都按覆盖处理
+    conflict_rule = 'skip' if conflict_rule == 'skip' else 'overwrite'
+
+    def run(batch_id, on_chunk):
+        return bulk_upsert_points(records, key='measurement', batch_id=batch_id, conflict_rule=conflict_rule,
+                                  on_chunk=on_chunk)
+
+    if data.get('background'):
+        # 后台任务：立即返回 batch_id，进度和失败行通过 /api/import/jobs/<batch_id> 查询
         try:
-            measurement = item.get('measurement')
-            if not measurement:
-                error_details.append({'index': index, 'error': 'Missing required field: measurement'})
-                summary['errors'] += 1
-                continue
-
-            # Use measurement as the unique key for checking existence
-            existing_point = PointInfo.query.filter_by(measurement=measurement).first()
-
-            if existing_point:
-                if conflict_rule == 'skip':
-                    summary['skipped'] += 1
-                    continue
-
-                # Save current state to history before updating
-                history_record = PointInfoHistory(
-                    point_info_id=existing_point.id,
-                    version=(PointInfoHistory.query.filter_by(point_info_id=existing_point.id).count() + 1),
-                    measurement=existing_point.measurement,
-                    original_point_name=existing_point.original_point_name,
-                    normalized_point_name=existing_point.normalized_point_name,
-                    point_comment=existing_point.point_comment,
-                    tags=existing_point.tags,
-                    fields=existing_point.fields,
-                    timestamp=existing_point.timestamp,
-                    data_type=existing_point.data_type,
-                    unit=existing_point.unit,
-                    data_source=existing_point.data_source,
-                    config_file_id=existing_point.config_file_id,
-                    is_enabled=existing_point.is_enabled,
-                    is_locked=existing_point.is_locked,
-                    import_batch=existing_point.import_batch,
-                    import_status=existing_point.import_status,
-                    change_reason=f"updated by import batch {batch_id}"
-                )
-                db.session.add(history_record)
-
-                # Update existing point
-                existing_point.original_point_name = item.get('original_point_name', existing_point.original_point_name)
-                existing_point.normalized_point_name = item.get('normalized_point_name', existing_point.normalized_point_name)
-                existing_point.point_comment = item.get('point_comment', existing_point.point_comment)
-                existing_point.data_type = item.get('data_type', existing_point.data_type)
-                existing_point.unit = item.get('unit', existing_point.unit)
-                existing_point.data_source = item.get('data_source', existing_point.data_source)
-                existing_point.is_enabled = item.get('is_enabled', existing_point.is_enabled)
-                existing_point.tags = json.dumps(item.get('tags', existing_point.tags))
-                existing_point.fields = json.dumps(item.get('fields', existing_point.fields))
-                existing_point.import_batch = batch_id
-                existing_point.is_locked = True # Lock point after import/update
-                existing_point.import_status = 'updated'
-                summary['updated'] += 1
-            else:
-                # Create new point
-                new_point = PointInfo(
-                    measurement=measurement,
-                    original_point_name=item.get('original_point_name'),
-                    normalized_point_name=item.get('normalized_point_name'),
-                    point_comment=item.get('point_comment'),
-                    data_type=item.get('data_type'),
-                    unit=item.get('unit'),
-                    data_source=item.get('data_source'),
-                    is_enabled=item.get('is_enabled', True),
-                    tags=json.dumps(item.get('tags', {})),
-                    fields=json.dumps(item.get('fields', {})),
-                    import_batch=batch_id,
-                    is_locked=True, # Lock point on creation
-                    import_status='created'
-                )
-                db.session.add(new_point)
-                summary['created'] += 1
-
+            batch_id = start_import_job(
+                current_app._get_current_object(), run, data.get('file_name') or 'points.json', len(records),
+                conflict_rule, current_user.get_id(),
+                current_user.username if current_user.is_authenticated else 'anonymous', request.remote_addr,
+                row_contents=dict(enumerate(points_to_process)))
         except Exception as e:
-            summary['errors'] += 1
-            error_details.append({'index': index, 'error': str(e)})
-
-    try:
-        db.session.commit()
-        add_audit_log(
-            action='批量导入数据点',
-            status='success' if summary['errors'] == 0 else 'partial_failure',
-            details=f"导入完成. 创建: {summary['created']}, 更新: {summary['updated']}, 错误: {summary['errors']}. 批次ID: {batch_id}"
-        )
-        return jsonify({
-            "message": "Import process completed.",
-            "data": {
-                "batch_id": batch_id,
-                "total_rows": len(points_to_process),
-                "imported_count": summary['created'],
-                "updated_count": summary['updated'],
-                "failed_count": summary['errors'],
-                "skipped_count": summary['skipped'],
-                "error_details": error_details
-            }
-        }), 200
-    except Exception as e:
-        db.session.rollback()
-        add_audit_log('批量导入数据点', 'failure', f"数据库提交失败: {str(e)}")
-        return jsonify({"error": f"Database commit failed: {str(e)}"}), 500
+            return error_response(f'Failed to start import job: {e}', 503)
+        return success_response('Import started.', {
+            'batch_id': batch_id,
+            'status': 'processing',
+            'total_rows': len(records),
+            'job_url': url_for('import_export_api.import_job_status', batch_id=batch_id),
+        }, 202)
+
+    batch_id = new_batch_id()
+    summary = run(batch_id, None)
+
+    written = summary['created'] + summary['updated']
+    if summary['errors'] and not written:
+        status = 'failure'
+    else:
+        status = 'success' if summary['errors'] == 0 else 'partial_failure'
+    add_audit_log(
+        action='批量导入数据点',
+        status=status,
+        details=f"导入完成. 创建: {summary['created']}, 更新: {summary['updated']}, 未变化: {summary['unchanged']}, "
+                f"错误: {summary['errors']}, 耗时 {summary['elapsed_seconds']}s. 批次ID: {batch_id}"
+    )
+    return jsonify({
+        "message": "Import process completed.",
+        "data": {
+            "batch_id": batch_id,
+            "total_rows": len(points_to_process),
+            "imported_count": summary['created'],
+            "updated_count": summary['updated'],
+            "unchanged_count": summary['unchanged'],
+            "failed_count": summary['errors'],
+            "skipped_count": summary['skipped'],
+            "error_details": summary['error_details'],
+            "elapsed_seconds": summary['elapsed_seconds'],
+            "rows_per_second": summary['rows_per_second']
+        }
+    }), 200
+
+# 批量修改时允许 patch 的字段
+POINT_PATCH_FIELDS = ('original_point_name', 'normalized_point_name', 'point_comment', 'data_type', 'unit',
+                      'data_source', 'tags', 'fields', 'is_enabled', 'is_locked')
+
+# 动作 -> 固定的更新值；link 和 patch 的值来自请求体
+POINT_BULK_ACTIONS = {
+    'link': None,
+    'unlink': {'config_file_id': None},
+    'lock': {'is_locked': True},
+    'unlock': {'is_locked': False},
+    'enable': {'is_enabled': True},
+    'disable': {'is_enabled': False},
+    'patch': None,
+    'delete': None,
+}
+
+def _point_selection(data):
+    """
+    根据请求体中的 ids 或 filter 返回选中数据点的 WHERE 条件和描述。
+    ids 通过 json_each 作为单个参数传入，不受 SQLite 参数个数限制；filter 与列表接口的过滤参数相同。
+    """
+    ids = data.get('ids')
+    filters = data.get('filter')
+    if ids is not None:
+        if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+            raise ValueError("ids must be a list of integers")
+        return ids_condition(ids), f"ids({len(ids)})"
+    if isinstance(filters, dict):
+        if all(value in (None, '') for value in filters.values()) and data.get('all') is not True:
+            raise ValueError("Empty filter selects every point; pass all=true to confirm")
+        query, _ = build_point_query(filters)
+        return PointInfo.id.in_(query.with_entities(PointInfo.id).statement), f"filter={json.dumps(filters, ensure_ascii=False)}"
+    raise ValueError("Either ids or filter is required")
+
+def _bulk_update_points(condition, values, change_reason):
+    """写入历史快照后用一条 UPDATE 修改所有选中的数据点，返回 (更新行数, 历史行数)"""
+    history_rows = snapshot_points(condition, change_reason)
+    result = db.session.execute(db.update(PointInfo).where(condition).values(**values),
+                                execution_options={'synchronize_session': False})
+    return result.rowcount, history_rows
 
 @data_management_api_bp.route('/point_info/link_and_lock', methods=['POST'])
 @handle_api_error
@@ -271,14 +284,9 @@ def link_and_lock_points():
         return jsonify({'error': 'point_ids must be a list'}), 400
 
     try:
-        updated_count = 0
-        for point_id in point_ids:
-            point = PointInfo.query.get(point_id)
-            if point:
-                point.config_file_id = config_file_id
-                point.is_locked = True
-                updated_count += 1
-        
+        condition, _ = _point_selection({'ids': point_ids})
+        updated_count, _ = _bulk_update_points(condition, {'config_file_id': config_file_id, 'is_locked': True},
+                                               f"linked to config file {config_file_id}")
         db.session.commit()
         add_audit_log(
             action='关联并锁定数据点',
@@ -286,11 +294,79 @@ def link_and_lock_points():
             details=f"将 {updated_count} 个数据点关联到配置文件ID {config_file_id} 并锁定。"
         )
         return jsonify({'message': f'Successfully linked and locked {updated_count} points.'}), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
 
+@data_management_api_bp.route('/point_info/bulk', methods=['POST'])
+@login_required
+@handle_api_error
+def bulk_point_operation():
+    """
+    对一组数据点执行同一操作，每种操作只执行一条 UPDATE / DELETE 语句。
+    请求体: {"action": "link|unlink|lock|unlock|enable|disable|patch|delete",
+             "ids": [...] 或 "filter": {列表接口的过滤参数}, "config_file_id": link 时必填,
+             "lock": link 时是否同时锁定, "fields": patch 时要修改的字段,
+             "confirm_count": delete 且 all=true 时必填，须等于选中的数据点数}
+    更新前的状态作为一批历史记录写入 point_info_history；删除时连同历史记录一起删除。
+    """
+    data = request.get_json(silent=True) or {}
+    action = data.get('action')
+    if action not in POINT_BULK_ACTIONS:
+        return error_response(f"action must be one of {', '.join(POINT_BULK_ACTIONS)}", 400)
 
+    try:
+        condition, selection = _point_selection(data)
+        values = POINT_BULK_ACTIONS[action]
+        if action == 'link':
+            config_file_id = data.get('config_file_id')
+            if not isinstance(config_file_id, int) or db.session.get(ConfigFile, config_file_id) is None:
+                raise ValueError("A valid config_file_id is required for link")
+            values = {'config_file_id': config_file_id}
+            if data.get('lock'):
+                values['is_locked'] = True
+        elif action == 'patch':
+            fields = data.get('fields')
+            if not isinstance(fields, dict) or not fields:
+                raise ValueError("fields is required for patch")
+            unknown = [name for name in fields if name not in POINT_PATCH_FIELDS]
+            if unknown:
+                raise ValueError(f"Fields cannot be patched: {', '.join(unknown)}")
+            values = {name: json.dumps(value) if name in ('tags', 'fields') and not isinstance(value, str) else value
+                      for name, value in fields.items()}
+        elif action == 'delete' and data.get('all') is True:
+            # 一次请求可能删除全部数据点，要求调用方确认将被删除的数量
+            selected = db.session.scalar(db.select(func.count()).select_from(PointInfo).where(condition))
+            if data.get('confirm_count') != selected:
+                raise ValueError(f"delete with all=true requires confirm_count equal to the number of "
+                                 f"selected points ({selected})")
+    except ValueError as e:
+        return error_response(str(e), 400)
+
+    history_rows = 0
+    try:
+        if action == 'delete':
+            target_ids = db.select(PointInfo.id).where(condition)
+            history_rows = db.session.execute(
+                db.delete(PointInfoHistory).where(PointInfoHistory.point_info_id.in_(target_ids)),
+                execution_options={'synchronize_session': False}).rowcount
+            affected = db.session.execute(db.delete(PointInfo).where(condition),
+                                          execution_options={'synchronize_session': False}).rowcount
+        else:
+            affected, history_rows = _bulk_update_points(condition, values, f"bulk {action}")
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        add_audit_log('批量操作数据点', 'failure', f"{action} 失败 ({selection}): {e}")
+        raise
+
+    add_audit_log('批量操作数据点', 'success',
+                  f"{action}: 影响 {affected} 个数据点, 历史记录 {history_rows} 条, 选择条件: {selection}"
+                  + (f", 修改: {json.dumps(values, ensure_ascii=False, default=str)}" if values else ""))
+    return success_response(f'批量{action}完成，影响 {affected} 个数据点',
+                            {'action': action, 'affected': affected, 'history_rows': history_rows})
 
 @data_management_api_bp.route('/point_info/check_status', methods=['POST'])
 @handle_api_error
@@ -371,38 +447,22 @@ def wizard_import_point_info():
         db.session.add(new_point)
         created_results.append(item)
 
-    # Process items to merge
+    # Process items to merge: 一次查询加载，一批历史快照，再逐个合并
     for item in items_to_merge:
         required_fields = ['id', 'measurement']
         missing_fields = [field for field in required_fields if not item.get(field)]
         if missing_fields:
             return jsonify({"error": f"Missing required fields for merge: {', '.join(missing_fields)}"}), 400
 
-        point_to_update = PointInfo.query.get(item['id'])
-        if point_to_update:
-            # Create a history record before updating
-            history_record = PointInfoHistory(
-                point_info_id=point_to_update.id,
-                version=(PointInfoHistory.query.filter_by(point_info_id=point_to_update.id).count() + 1),
-                measurement=point_to_update.measurement,
-                original_point_name=point_to_update.original_point_name,
-                normalized_point_name=point_to_update.normalized_point_name,
-                point_comment=point_to_update.point_comment,
-                tags=point_to_update.tags,
-                fields=point_to_update.fields,
-                timestamp=point_to_update.timestamp,
-                data_type=point_to_update.data_type,
-                unit=point_to_update.unit,
-                data_source=point_to_update.data_source,
-                config_file_id=point_to_update.config_file_id,
-                is_enabled=point_to_update.is_enabled,
-                is_locked=point_to_update.is_locked,
-                import_batch=point_to_update.import_batch,
-                import_status=point_to_update.import_status,
-                change_reason=f"updated by wizard import batch {batch_id}"
-            )
-            db.session.add(history_record)
+    merge_ids = list({item['id'] for item in items_to_merge})
+    points_by_id = {point.id: point for point in PointInfo.query.filter(PointInfo.id.in_(merge_ids))} if merge_ids else {}
+    if points_by_id:
+        condition, _ = _point_selection({'ids': list(points_by_id)})
+        snapshot_points(condition, f"updated by wizard import batch {batch_id}")
 
+    for item in items_to_merge:
+        point_to_update = points_by_id.get(item['id'])
+        if point_to_update:
             # Update fields from the item, keeping existing values if new ones are not provided
             point_to_update.original_point_name = item.get('original_point_name', point_to_update.original_point_name)
             point_to_update.normalized_point_name = item.get('normalized_point_name', point_to_update.normalized_point_name)
@@ -493,7 +553,7 @@ def get_import_batch_details(batch_id):
     
     return jsonify({
         "batch_id": batch_id,
-        "points": [p.to_dict() for p in paginated_points],
+        "points": serialize_point_infos(paginated_points),
         "pagination": {
             "total": total_items,
             "page": page,
@@ -505,75 +565,31 @@ def get_import_batch_details(batch_id):
 @data_management_api_bp.route('/point_info/import_history/<batch_id>', methods=['DELETE'])
 @handle_api_error
 def rollback_import_batch(batch_id):
-    """回滚（删除或恢复）一个完整的导入批次"""
+    """回滚（删除或恢复）一个完整的导入批次，全部数据点用几条集合语句处理"""
+    if db.session.query(PointInfo.id).filter_by(import_batch=batch_id).first() is None:
+        return jsonify({"error": "Batch not found or already empty"}), 404
     try:
-        points_in_batch = PointInfo.query.filter_by(import_batch=batch_id).all()
-        if not points_in_batch:
-            return jsonify({"error": "Batch not found or already empty"}), 404
-
-        restored_count = 0
-        deleted_count = 0
-
-        for point in points_in_batch:
-            if point.import_status == 'created':
-                # This point was created by this batch, so it's safe to delete.
-                db.session.delete(point)
-                deleted_count += 1
-            elif point.import_status == 'updated':
-                # This point was updated. We need to restore it from its history.
-                last_version = PointInfoHistory.query.filter(
-                    PointInfoHistory.point_info_id == point.id
-                ).order_by(PointInfoHistory.version.desc()).first()
-
-                if last_version:
-                    # Restore from the most recent history entry
-                    point.original_point_name = last_version.original_point_name
-                    point.normalized_point_name = last_version.normalized_point_name
-                    point.point_comment = last_version.point_comment
-                    point.tags = last_version.tags
-                    point.fields = last_version.fields
-                    point.timestamp = last_version.timestamp
-                    point.data_type = last_version.data_type
-                    point.unit = last_version.unit
-                    point.data_source = last_version.data_source
-                    point.config_file_id = last_version.config_file_id
-                    point.is_enabled = last_version.is_enabled
-                    point.is_locked = last_version.is_locked
-                    point.import_batch = last_version.import_batch
-                    point.import_status = last_version.import_status
-                    
-                    # After restoring, we can delete the history record that was created by this batch
-                    db.session.delete(last_version)
-                    restored_count += 1
-                else:
-                    # Edge case: an "updated" point with no history. 
-                    # This shouldn't happen with the new logic, but for safety,
-                    # we'll just nullify the batch info rather than deleting.
-                    point.import_batch = None
-                    point.import_status = None
-
+        counts = rollback_batch_points(batch_id)
         db.session.commit()
-        
-        add_audit_log(
-            action='回滚导入批次',
-            status='success',
-            details=f"成功回滚批次 {batch_id}，恢复 {restored_count} 个, 删除 {deleted_count} 个数据点。"
-        )
-        return jsonify({"message": f"Successfully rolled back batch {batch_id}, restoring {restored_count} and deleting {deleted_count} points."}), 200
-
     except Exception as e:
         db.session.rollback()
         add_audit_log('回滚导入批次', 'failure', f"回滚批次 {batch_id} 失败: {str(e)}")
         return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
 
+    add_audit_log(
+        action='回滚导入批次',
+        status='success',
+        details=f"成功回滚批次 {batch_id}，恢复 {counts['restored']} 个, 删除 {counts['deleted']} 个, "
+                f"清除批次信息 {counts['cleared']} 个数据点。"
+    )
+    return jsonify({"message": f"Successfully rolled back batch {batch_id}, restoring {counts['restored']} "
+                               f"and deleting {counts['deleted']} points.", **counts}), 200
+
 # --- OutputSource (Data Sources) API --- #
 
 @data_management_api_bp.route('/data_sources', methods=['GET'])
 @handle_api_error
 def get_data_sources():
-    page, per_page = get_pagination_params(request)
-    offset = (page - 1) * per_page
-    
     query = OutputSource.query
 
     # Filter by source_type if provided
@@ -592,29 +608,11 @@ def get_data_sources():
             )
         )
 
-    # Sorting
-    sort_by = request.args.get('sort_by', 'id')
-    sort_dir = request.args.get('sort_dir', 'asc')
-    if hasattr(OutputSource, sort_by):
-        if sort_dir == 'desc':
-            query = query.order_by(db.desc(getattr(OutputSource, sort_by)))
-        else:
-            query = query.order_by(db.asc(getattr(OutputSource, sort_by)))
-
-    total_items = query.count()
-    paginated_items = query.offset(offset).limit(per_page).all()
-
-    results = [item.to_dict() for item in paginated_items]
-
-    return jsonify({
-        'items': results,
-        'pagination': {
-            'total': total_items,
-            'page': page,
-            'per_page': per_page,
-            'pages': (total_items + per_page - 1) // per_page
-        }
-    })
+    # Sorting and pagination (page/per_page or keyset cursor)
+    try:
+        return jsonify(paginate_query(query, OutputSource, serialize_output_sources))
+    except ValueError as e:
+        return error_response(str(e), 400)
 
 @data_management_api_bp.route('/data_sources', methods=['POST'])
 @handle_api_error
@@ -675,9 +673,6 @@ def delete_data_source(item_id):
 @data_management_api_bp.route('/global_parameters', methods=['GET'])
 @handle_api_error
 def get_global_parameters():
-    page, per_page = get_pagination_params(request)
-    offset = (page - 1) * per_page
-    
     query = GlobalParameter.query
 
     # Search
@@ -691,29 +686,11 @@ def get_global_parameters():
             )
         )
 
-    # Sorting
-    sort_by = request.args.get('sort_by', 'id')
-    sort_dir = request.args.get('sort_dir', 'asc')
-    if hasattr(GlobalParameter, sort_by):
-        if sort_dir == 'desc':
-            query = query.order_by(db.desc(getattr(GlobalParameter, sort_by)))
-        else:
-            query = query.order_by(db.asc(getattr(GlobalParameter, sort_by)))
-
-    total_items = query.count()
-    paginated_items = query.offset(offset).limit(per_page).all()
-
-    results = [item.to_dict() for item in paginated_items]
-
-    return jsonify({
-        'items': results,
-        'pagination': {
-            'total': total_items,
-            'page': page,
-            'per_page': per_page,
-            'pages': (total_items + per_page - 1) // per_page
-        }
-    })
+    # Sorting and pagination (page/per_page or keyset cursor)
+    try:
+        return jsonify(paginate_query(query, GlobalParameter, serialize_global_parameters))
+    except ValueError as e:
+        return error_response(str(e), 400)
 
 @data_management_api_bp.route('/global_parameters', methods=['POST'])
 @handle_api_error
@@ -770,9 +747,6 @@ def delete_global_parameter(item_id):
 @data_management_api_bp.route('/point_templates', methods=['GET'])
 @handle_api_error
 def get_point_templates():
-    page, per_page = get_pagination_params(request)
-    offset = (page - 1) * per_page
-    
     query = PointTemplate.query
 
     # Search
@@ -786,29 +760,11 @@ def get_point_templates():
             )
         )
 
-    # Sorting
-    sort_by = request.args.get('sort_by', 'id')
-    sort_dir = request.args.get('sort_dir', 'asc')
-    if hasattr(PointTemplate, sort_by):
-        if sort_dir == 'desc':
-            query = query.order_by(db.desc(getattr(PointTemplate, sort_by)))
-        else:
-            query = query.order_by(db.asc(getattr(PointTemplate, sort_by)))
-
-    total_items = query.count()
-    paginated_items = query.offset(offset).limit(per_page).all()
-
-    results = [item.to_dict() for item in paginated_items]
-
-    return jsonify({
-        'items': results,
-        'pagination': {
-            'total': total_items,
-            'page': page,
-            'per_page': per_page,
-            'pages': (total_items + per_page - 1) // per_page
-        }
-    })
+    # Sorting and pagination (page/per_page or keyset cursor)
+    try:
+        return jsonify(paginate_query(query, PointTemplate))
+    except ValueError as e:
+        return error_response(str(e), 400)
 
 @data_management_api_bp.route('/point_templates', methods=['POST'])
 @handle_api_error
@@ -865,9 +821,6 @@ def delete_point_template(item_id):
 @data_management_api_bp.route('/processing_tags', methods=['GET'])
 @handle_api_error
 def get_processing_tags():
-    page, per_page = get_pagination_params(request)
-    offset = (page - 1) * per_page
-    
     query = ProcessingTag.query
 
     # Search
@@ -881,29 +834,11 @@ def get_processing_tags():
             )
         )
 
-    # Sorting
-    sort_by = request.args.get('sort_by', 'id')
-    sort_dir = request.args.get('sort_dir', 'asc')
-    if hasattr(ProcessingTag, sort_by):
-        if sort_dir == 'desc':
-            query = query.order_by(db.desc(getattr(ProcessingTag, sort_by)))
-        else:
-            query = query.order_by(db.asc(getattr(ProcessingTag, sort_by)))
-
-    total_items = query.count()
-    paginated_items = query.offset(offset).limit(per_page).all()
-
-    results = [item.to_dict() for item in paginated_items]
-
-    return jsonify({
-        'items': results,
-        'pagination': {
-            'total': total_items,
-            'page': page,
-            'per_page': per_page,
-            'pages': (total_items + per_page - 1) // per_page
-        }
-    })
+    # Sorting and pagination (page/per_page or keyset cursor)
+    try:
+        return jsonify(paginate_query(query, ProcessingTag))
+    except ValueError as e:
+        return error_response(str(e), 400)
 
 @data_management_api_bp.route('/processing_tags', methods=['POST'])
 @handle_api_error
@@ -956,3 +891,193 @@ def delete_processing_tag(item_id):
     db.session.commit()
     add_audit_log('delete_processing_tag', 'success', f"Deleted processing tag: {item.name}")
     return jsonify({'message': 'Processing tag deleted successfully'}), 200
+
+# --- Component Batch API --- #
+
+# 批量接口单次请求允许的最大操作数
+BATCH_MAX_OPERATIONS = 1000
+
+# 组件类型 -> (模型, 显示名称, 创建时必填字段, 可写字段, 创建默认值, 引用它的关联表外键列)
+BATCH_COMPONENTS = {
+    'data_sources': (OutputSource, '数据源', ('name', 'config'),
+                     ('name', 'source_type', 'description', 'is_enabled', 'config'),
+                     {'source_type': 'output', 'is_enabled': True},
+                     output_source_config_file_association.c.output_source_id),
+    'global_parameters': (GlobalParameter, '全局参数', ('name', 'config'),
+                          ('name', 'description', 'config'), {},
+                          global_parameter_config_file_association.c.global_parameter_id),
+    'point_templates': (PointTemplate, '数据点模板', ('name', 'content'),
+                        ('name', 'description', 'content'), {}, None),
+    'processing_tags': (ProcessingTag, '处理标签', ('name', 'plugin_type', 'config'),
+                        ('name', 'plugin_type', 'description', 'config'), {}, None),
+}
+
+def _validate_component_batch(model, required, operations):
+    """
+    校验一批操作，返回 (results, existing, conflict)：results 为逐项结果（校验失败的项带 error），
+    existing 为 update/delete 涉及的已有记录 {id: 对象}。名称唯一性用一次 IN 查询校验。
+    """
+    results = []
+    target_ids = []
+    for index, operation in enumerate(operations):
+        result = {'index': index, 'op': operation.get('op') if isinstance(operation, dict) else None}
+        results.append(result)
+        if not isinstance(operation, dict) or result['op'] not in ('create', 'update', 'delete'):
+            result['error'] = "op must be one of create, update, delete"
+            continue
+        data = operation.get('data', {})
+        if result['op'] != 'delete' and not isinstance(data, dict):
+            result['error'] = "data must be an object"
+            continue
+        if result['op'] == 'create':
+            missing = [field for field in required if not data.get(field)]
+            if missing:
+                result['error'] = f"Missing {', '.join(missing)}"
+            continue
+        if not isinstance(operation.get('id'), int):
+            result['error'] = "id is required"
+            continue
+        result['id'] = operation['id']
+        emptied = [field for field in required if result['op'] == 'update' and field in data and not data[field]]
+        if emptied:
+            result['error'] = f"{', '.join(emptied)} cannot be empty"
+            continue
+        target_ids.append(operation['id'])
+
+    existing = {item.id: item for item in model.query.filter(model.id.in_(target_ids))} if target_ids else {}
+    seen_ids = set()
+    claims = []  # (result, 最终名称, 所属记录 id)
+    freed_ids = set()
+    for operation, result in zip(operations, results):
+        if 'error' in result:
+            continue
+        if result['op'] == 'create':
+            claims.append((result, operation['data']['name'], None))
+            continue
+        item_id = result['id']
+        if item_id not in existing:
+            result['error'] = f"{model.__name__} {item_id} not found"
+            continue
+        if item_id in seen_ids:
+            result['error'] = f"Duplicate operation on id {item_id}"
+            continue
+        seen_ids.add(item_id)
+        if result['op'] == 'delete':
+            freed_ids.add(item_id)
+            continue
+        name = operation.get('data', {}).get('name') or existing[item_id].name
+        if name != existing[item_id].name:
+            freed_ids.add(item_id)
+        claims.append((result, name, item_id))
+
+    conflict = False
+    name_counts = {}
+    for _, name, _ in claims:
+        name_counts[name] = name_counts.get(name, 0) + 1
+    holders = dict(db.session.query(model.name, model.id).filter(model.name.in_(list(name_counts)))) if name_counts else {}
+    for result, name, own_id in claims:
+        holder = holders.get(name)
+        if name_counts[name] > 1:
+            result['error'] = f"Name '{name}' appears more than once in this batch"
+        elif holder is not None and holder != own_id and holder not in freed_ids:
+            result['error'] = f"Name '{name}' already exists"
+        else:
+            continue
+        conflict = True
+    return results, existing, conflict
+
+def _apply_component_batch(component):
+    """
+    在一个事务中执行一批 create/update/delete 操作。任一项校验失败则整批不执行，
+    返回逐项结果；全部成功时一次提交，并只写一条汇总审计日志。
+    """
+    model, label, required, fields, defaults, association_column = BATCH_COMPONENTS[component]
+    data = request.get_json(silent=True) or {}
+    operations = data.get('operations')
+    if not isinstance(operations, list) or not operations:
+        return error_response('operations must be a non-empty list', 400)
+    if len(operations) > BATCH_MAX_OPERATIONS:
+        return error_response(f'At most {BATCH_MAX_OPERATIONS} operations per batch', 400)
+
+    results, existing, conflict = _validate_component_batch(model, required, operations)
+    if any('error' in result for result in results):
+        for result in results:
+            result['status'] = 'error' if 'error' in result else 'skipped'
+        return error_response(f'批量{label}操作校验失败，未做任何修改', 409 if conflict else 400,
+                              details={'results': results})
+
+    names = {'create': [], 'update': [], 'delete': []}
+    new_rows, deleted_ids = [], []
+    for operation, result in zip(operations, results):
+        payload = operation.get('data', {})
+        if result['op'] == 'create':
+            values = dict(defaults)
+            values.update({field: payload[field] for field in fields if field in payload})
+            new_rows.append(values)
+            names['create'].append(values['name'])
+        elif result['op'] == 'update':
+            item = existing[result['id']]
+            for field in fields:
+                if field in payload:
+                    setattr(item, field, payload[field])
+            result['status'] = 'updated'
+            names['update'].append(item.name)
+        else:
+            deleted_ids.append(result['id'])
+            result['status'] = 'deleted'
+            names['delete'].append(existing[result['id']].name)
+
+    # 按 删除 -> 更新 -> 创建 的顺序执行，被删除或改名释放的名称可以在同一批中重新使用
+    try:
+        if deleted_ids:
+            # 集合删除：先删关联表中的引用，再一条语句删除组件本身
+            for item_id in deleted_ids:
+                db.session.expunge(existing[item_id])
+            if association_column is not None:
+                db.session.execute(association_column.table.delete().where(association_column.in_(deleted_ids)))
+            db.session.execute(db.delete(model).where(model.id.in_(deleted_ids)),
+                               execution_options={'synchronize_session': False})
+        db.session.flush()
+        if new_rows:
+            # 多行 INSERT 不带 RETURNING，新记录的 id 按名称（唯一）一次查回
+            db.session.execute(db.insert(model), new_rows)
+            new_ids = dict(db.session.query(model.name, model.id).filter(model.name.in_(names['create'])))
+            for result, name in zip([r for r in results if r['op'] == 'create'], names['create']):
+                result['id'] = new_ids[name]
+                result['status'] = 'created'
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        add_audit_log(f'batch_{component}', 'failure', f"批量{label}操作失败: {e.orig}")
+        return error_response(f'批量{label}操作违反唯一性约束，未做任何修改', 409)
+
+    summary = {op: len(items) for op, items in names.items()}
+    add_audit_log(f'batch_{component}', 'success',
+                  f"批量{label}操作: 创建 {summary['create']}, 更新 {summary['update']}, 删除 {summary['delete']}; "
+                  + "; ".join(f"{op}: {', '.join(items[:50])}{' ...' if len(items) > 50 else ''}"
+                              for op, items in names.items() if items))
+    return success_response(f'批量{label}操作成功', {'results': results, 'summary': summary})
+
+@data_management_api_bp.route('/data_sources/batch', methods=['POST'])
+@login_required
+@handle_api_error
+def batch_data_sources():
+    return _apply_component_batch('data_sources')
+
+@data_management_api_bp.route('/global_parameters/batch', methods=['POST'])
+@login_required
+@handle_api_error
+def batch_global_parameters():
+    return _apply_component_batch('global_parameters')
+
+@data_management_api_bp.route('/point_templates/batch', methods=['POST'])
+@login_required
+@handle_api_error
+def batch_point_templates():
+    return _apply_component_batch('point_templates')
+
+@data_management_api_bp.route('/processing_tags/batch', methods=['POST'])
+@login_required
+@handle_api_error
+def batch_processing_tags():
+    return _apply_component_batch('processing_tags')
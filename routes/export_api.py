@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+"""
+审计日志、Telegraf 日志和数据点导出 API 蓝图
+
+日志导出按时间范围切分为若干段，每段单独打开 DuckDB 连接执行 COPY ... TO 写入临时文件后立即关闭，
+两段之间释放文件锁，其他工作进程和日志写入线程可以继续写入。
+CSV 各段依次流式返回；Parquet 各段写完后用不关联数据库文件的内存 DuckDB 合并为一个文件再流式返回。
+全程不把结果集读入 Python 内存。
+
+数据点导出用 yield_per 按批从 SQLite 读取：CSV 每批写完立即返回；Parquet 和 XLSX 需要完整文件，
+每批追加到临时目录中的 DuckDB 文件或 openpyxl 只写模式的工作簿，写完后流式返回。内存占用只与批大小有关。
+"""
+
+import io
+import os
+import csv
+import shutil
+import logging
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+import duckdb
+import openpyxl
+import pandas as pd
+from flask import Blueprint, Response, request, stream_with_context
+from flask_login import login_required
+from sqlalchemy.orm import aliased
+
+from models import db, PointInfo, ConfigFile
+from db_manager import get_duckdb_connection
+from api_utils import error_response, add_audit_log
+from routes.admin_api import build_audit_filters, parse_time_param
+from routes.data_management_api import build_point_query
+
+logger = logging.getLogger(__name__)
+
+export_api_bp = Blueprint('export_api', __name__, url_prefix='/api/export')
+
+# 每段覆盖的时间长度（小时），段越小持有 DuckDB 锁的时间越短
+EXPORT_CHUNK_HOURS = float(os.environ.get('EXPORT_CHUNK_HOURS', 24))
+EXPORT_READ_SIZE = 1024 * 1024  # 流式返回时每次读取的字节数
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', "(FORMAT csv, HEADER {header})"),
+    'parquet': ('application/vnd.apache.parquet', "(FORMAT parquet, COMPRESSION zstd)"),
+}
+
+# 数据点导出每批从 SQLite 读取的行数
+EXPORT_POINTS_BATCH_SIZE = int(os.environ.get('EXPORT_POINTS_BATCH_SIZE', 5000))
+POINT_EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+# Parquet 导出暂存用 DuckDB 连接的内存上限，超出部分由 DuckDB 写入临时目录
+EXPORT_SPOOL_MEMORY_LIMIT = os.environ.get('EXPORT_SPOOL_MEMORY_LIMIT', '64MB')
+XLSX_MAX_ROWS = 1048576  # 每个工作表的行数上限（含表头），超出后写入下一个工作表
+
+_export_config_file = aliased(ConfigFile, name='export_config_file')
+
+# 导出列（与列表接口的字段一致）及 Parquet 中的类型
+POINT_EXPORT_COLUMNS = (
+    ('id', PointInfo.id, 'BIGINT'),
+    ('measurement', PointInfo.measurement, 'VARCHAR'),
+    ('original_point_name', PointInfo.original_point_name, 'VARCHAR'),
+    ('normalized_point_name', PointInfo.normalized_point_name, 'VARCHAR'),
+    ('point_comment', PointInfo.point_comment, 'VARCHAR'),
+    ('tags', PointInfo.tags, 'VARCHAR'),
+    ('fields', PointInfo.fields, 'VARCHAR'),
+    ('timestamp', PointInfo.timestamp, 'TIMESTAMP'),
+    ('data_type', PointInfo.data_type, 'VARCHAR'),
+    ('unit', PointInfo.unit, 'VARCHAR'),
+    ('data_source', PointInfo.data_source, 'VARCHAR'),
+    ('config_file_id', PointInfo.config_file_id, 'BIGINT'),
+    ('config_file_name', _export_config_file.file_name, 'VARCHAR'),
+    ('is_enabled', PointInfo.is_enabled, 'BOOLEAN'),
+    ('is_locked', PointInfo.is_locked, 'BOOLEAN'),
+    ('created_at', PointInfo.created_at, 'TIMESTAMP'),
+    ('updated_at', PointInfo.updated_at, 'TIMESTAMP'),
+    ('import_batch', PointInfo.import_batch, 'VARCHAR'),
+    ('import_status', PointInfo.import_status, 'VARCHAR'),
+    ('current_version', PointInfo.current_version, 'BIGINT'),
+)
+POINT_EXPORT_NAMES = [name for name, _, _ in POINT_EXPORT_COLUMNS]
+
+def _time_chunks(source, where_clause, params, since, until):
+    """
+    按 EXPORT_CHUNK_HOURS 切分 [since, until) 与数据实际时间范围的交集，未指定的边界取数据中的最早/最晚时间。
+    只切分有数据的范围，避免时间范围很宽时执行大量空的 COPY。
+    """
+    conn = get_duckdb_connection()
+    try:
+        first, last = conn.execute(f"SELECT min(timestamp), max(timestamp) FROM {source}{where_clause}", params).fetchone()
+    finally:
+        conn.close()
+    if first is None:
+        return []
+    last += timedelta(microseconds=1)
+    start = max(since, first) if since else first
+    end = min(until, last) if until else last
+    step = timedelta(hours=EXPORT_CHUNK_HOURS)
+    chunks = []
+    while start < end:
+        chunks.append((start, min(start + step, end)))
+        start += step
+    return chunks
+
+def _copy_chunk(source, columns, where_clause, params, chunk, path, copy_options):
+    """导出一个时间段：单独的连接，COPY 完成后立即关闭"""
+    chunk_clause = where_clause + (" AND " if where_clause else " WHERE ") + "timestamp >= ? AND timestamp < ?"
+    conn = get_duckdb_connection()
+    try:
+        conn.execute(
+            f"COPY (SELECT {columns} FROM {source}{chunk_clause} ORDER BY timestamp) TO '{path}' {copy_options}",
+            params + [chunk[0], chunk[1]]
+        )
+    finally:
+        conn.close()
+
+def _stream_file(path):
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(EXPORT_READ_SIZE)
+            if not data:
+                break
+            yield data
+
+def _export_response(source, columns, where_clause, params, since, until, export_format, filename_prefix):
+    mimetype, copy_options = EXPORT_FORMATS[export_format]
+    chunks = _time_chunks(source, where_clause, params, since, until)
+    filename = f"{filename_prefix}_{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')}.{export_format}"
+
+    def generate():
+        staging_dir = tempfile.mkdtemp(prefix='telegraf_export_')
+        try:
+            if export_format == 'csv':
+                for index, chunk in enumerate(chunks or [(None, None)]):
+                    path = os.path.join(staging_dir, f'part_{index}.csv')
+                    if chunk[0] is None:
+                        # 没有数据时只返回表头
+                        _copy_chunk(source, columns, " WHERE false", [], (datetime.min, datetime.min), path,
+                                    copy_options.format(header='true'))
+                    else:
+                        _copy_chunk(source, columns, where_clause, params, chunk, path,
+                                    copy_options.format(header='true' if index == 0 else 'false'))
+                    yield from _stream_file(path)
+                    os.remove(path)
+                return
+
+            parts = []
+            for index, chunk in enumerate(chunks):
+                path = os.path.join(staging_dir, f'part_{index}.parquet')
+                _copy_chunk(source, columns, where_clause, params, chunk, path, copy_options)
+                parts.append(path)
+            output = os.path.join(staging_dir, 'export.parquet')
+            if parts:
+                # 合并在内存 DuckDB 中进行，不占用日志数据库的文件锁
+                merger = duckdb.connect()
+                try:
+                    merger.execute(f"COPY (SELECT * FROM read_parquet(?)) TO '{output}' {copy_options}", [parts])
+                finally:
+                    merger.close()
+            else:
+                _copy_chunk(source, columns, " WHERE false", [], (datetime.min, datetime.min), output, copy_options)
+            yield from _stream_file(output)
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+def _get_export_format(formats=EXPORT_FORMATS):
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in formats:
+        raise ValueError(f"Unsupported format: {export_format}. Use {' or '.join(formats)}.")
+    return export_format
+
+@export_api_bp.route('/audit_log', methods=['GET'])
+@login_required
+def export_audit_log():
+    """
+    导出审计日志，format=csv|parquet，过滤参数与 /api/audit_log 相同
+    (since/until/action/status/username/search)。
+    """
+    try:
+        export_format = _get_export_format()
+        where_clause, params, since, until = build_audit_filters(request.args)
+    except ValueError as e:
+        return error_response(str(e), 400)
+
+    add_audit_log('audit_log_export', 'success',
+                  f"Exported audit log as {export_format}: since={since}, until={until}, filters={dict(request.args)}")
+    return _export_response('audit_log', "timestamp, username, ip_address, action, status, details, id::VARCHAR AS id",
+                            where_clause, params, since, until, export_format, 'audit_log')
+
+@export_api_bp.route('/logs', methods=['GET'])
+@login_required
+def export_telegraf_logs():
+    """
+    导出 Telegraf 进程日志，format=csv|parquet。
+    支持 since/until 时间范围，pid、run_id、level、log_type、plugin 精确匹配（多个值用逗号分隔）和 search 消息模糊搜索。
+    """
+    try:
+        export_format = _get_export_format()
+        since = parse_time_param(request.args.get('since'), 'since')
+        until = parse_time_param(request.args.get('until'), 'until')
+        conditions, params = [], []
+        if since:
+            conditions.append("timestamp >= ?")
+            params.append(since)
+        if until:
+            conditions.append("timestamp < ?")
+            params.append(until)
+        for name, cast in (('pid', int), ('run_id', int), ('level', str), ('log_type', str), ('plugin', str)):
+            value = request.args.get(name)
+            if value:
+                values = [cast(v.strip()) for v in value.split(',') if v.strip()]
+                column = 'process_pid' if name == 'pid' else name
+                conditions.append(f"{column} IN ({','.join(['?'] * len(values))})")
+                params.extend(values)
+        search = request.args.get('search')
+        if search:
+            conditions.append("message ILIKE ?")
+            params.append(f'%{search}%')
+    except ValueError as e:
+        return error_response(str(e), 400)
+
+    where_clause = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    add_audit_log('telegraf_log_export', 'success',
+                  f"Exported telegraf logs as {export_format}: filters={dict(request.args)}")
+    return _export_response('telegraf_logs_expanded',
+                            "timestamp, process_pid, run_id, process_name, config_file, log_type, level, plugin, message",
+                            where_clause, params, since, until, export_format, 'telegraf_logs')
+
+def _point_batches(query):
+    """按 id 顺序逐批读取导出列，每批 EXPORT_POINTS_BATCH_SIZE 行；yield_per 使用服务器端游标，不一次取出全部结果"""
+    statement = (query.outerjoin(_export_config_file, PointInfo.config_file_id == _export_config_file.id)
+                 .with_entities(*(column for _, column, _ in POINT_EXPORT_COLUMNS))
+                 .order_by(PointInfo.id).statement)
+    result = db.session.execute(statement, execution_options={'yield_per': EXPORT_POINTS_BATCH_SIZE})
+    try:
+        yield from result.partitions()
+    finally:
+        result.close()
+
+_DATETIME_INDEXES = [i for i, (_, _, kind) in enumerate(POINT_EXPORT_COLUMNS) if kind == 'TIMESTAMP']
+_BOOLEAN_INDEXES = [i for i, (_, _, kind) in enumerate(POINT_EXPORT_COLUMNS) if kind == 'BOOLEAN']
+
+def _csv_row(row):
+    # 时间与列表接口一致输出 UTC 的 ISO 格式，布尔值输出导入可识别的 true/false；只处理这几列，不逐个判断类型
+    row = list(row)
+    for i in _DATETIME_INDEXES:
+        if row[i] is not None:
+            row[i] = row[i].isoformat() + '+00:00'
+    for i in _BOOLEAN_INDEXES:
+        if row[i] is not None:
+            row[i] = 'true' if row[i] else 'false'
+    return row
+
+def _points_csv(query):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(POINT_EXPORT_NAMES)
+    # 表头在查询执行之前返回
+    yield buffer.getvalue().encode('utf-8')
+    for rows in _point_batches(query):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(map(_csv_row, rows))
+        yield buffer.getvalue().encode('utf-8')
+
+def _points_parquet(query, staging_dir):
+    """逐批追加到临时 DuckDB 文件（不关联日志数据库），最后一次 COPY 为 Parquet"""
+    output = os.path.join(staging_dir, 'export.parquet')
+    spool = duckdb.connect(os.path.join(staging_dir, 'spool.duckdb'),
+                           config={'memory_limit': EXPORT_SPOOL_MEMORY_LIMIT, 'threads': 1})
+    try:
+        spool.execute(f"CREATE TABLE points ({', '.join(f'{name} {kind}' for name, _, kind in POINT_EXPORT_COLUMNS)})")
+        for rows in _point_batches(query):
+            batch = pd.DataFrame.from_records(rows, columns=POINT_EXPORT_NAMES)
+            spool.register('batch', batch)
+            spool.execute("INSERT INTO points SELECT * FROM batch")
+            spool.unregister('batch')
+        spool.execute(f"COPY points TO '{output}' (FORMAT parquet, COMPRESSION zstd)")
+    finally:
+        spool.close()
+    return output
+
+def _points_xlsx(query, staging_dir):
+    """openpyxl 只写模式逐行写入临时文件，超过单表行数上限时换到下一个工作表"""
+    output = os.path.join(staging_dir, 'export.xlsx')
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet, sheet_rows, sheet_count = None, XLSX_MAX_ROWS, 0
+    for rows in _point_batches(query):
+        for row in rows:
+            if sheet_rows >= XLSX_MAX_ROWS:
+                sheet_count += 1
+                sheet = workbook.create_sheet('points' if sheet_count == 1 else f'points_{sheet_count}')
+                sheet.append(POINT_EXPORT_NAMES)
+                sheet_rows = 1
+            sheet.append(tuple(row))
+            sheet_rows += 1
+    if sheet is None:
+        workbook.create_sheet('points').append(POINT_EXPORT_NAMES)
+    workbook.save(output)
+    return output
+
+@export_api_bp.route('/points', methods=['GET'])
+@login_required
+def export_points():
+    """
+    导出数据点，format=csv|parquet|xlsx，过滤参数与 /api/point_info 相同
+    (search/search_field/unlinked_only/config_file_id/import_batch/data_source/is_locked/is_enabled)，按 id 排序。
+    """
+    try:
+        export_format = _get_export_format(POINT_EXPORT_FORMATS)
+        query, _ = build_point_query(request.args)
+    except ValueError as e:
+        return error_response(str(e), 400)
+
+    filename = f"points_{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')}.{export_format}"
+
+    def generate():
+        if export_format == 'csv':
+            yield from _points_csv(query)
+            return
+        # 先发送响应头，浏览器立即开始下载，文件在服务器端写完后再传输
+        yield b''
+        staging_dir = tempfile.mkdtemp(prefix='telegraf_export_')
+        try:
+            writer = _points_parquet if export_format == 'parquet' else _points_xlsx
+            yield from _stream_file(writer(query, staging_dir))
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+    add_audit_log('point_export', 'success', f"Exported points as {export_format}: filters={dict(request.args)}")
+    return Response(
+        stream_with_context(generate()),
+        mimetype=POINT_EXPORT_FORMATS[export_format],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
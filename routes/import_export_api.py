@@ -3,146 +3,240 @@
 批量导入/导出 API 蓝图
 """
 
+import time
 import logging
-import io
-import pandas as pd
-from flask import Blueprint, request
-from flask_login import login_required
 
-from models import db, PointInfo
-from api_utils import error_response, success_response, add_audit_log
+from flask import Blueprint, request, current_app, url_for
+from flask_login import login_required, current_user
+
+from models import db
+from api_utils import error_response, success_response, add_audit_log, get_pagination_params
+from point_import import POINT_IMPORT_FILE_FORMATS, describe_points_file, import_points_file, preview_points_file
+from import_staging import IMPORT_STAGING_TTL, create_stage, get_stage, delete_stage
+from import_jobs import (new_batch_id, start_import_job, get_import_job, get_import_job_errors, list_import_jobs,
+                         cancel_import_job)
 
 logger = logging.getLogger(__name__)
 
 import_export_api_bp = Blueprint('import_export_api', __name__, url_prefix='/api/import')
 
+PREVIEW_ROWS = 5
+# 预览中返回的冲突行和错误行样本数
+PREVIEW_SAMPLE_SIZE = 20
+
+def _file_format(filename):
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    return extension if extension in POINT_IMPORT_FILE_FORMATS else None
+
+def _request_stage(data):
+    """按请求体中的 upload_id 取当前用户的暂存文件，返回 (元数据, 错误响应)"""
+    upload_id = data.get('upload_id')
+    if not upload_id:
+        return None, error_response('Missing upload_id', 400)
+    try:
+        return get_stage(upload_id, current_user.id), None
+    except LookupError as e:
+        return None, error_response(str(e), 404)
+
+def _request_sheets(data):
+    """请求体中要导入的 XLSX 工作表名列表，未指定时为 None（全部工作表）"""
+    sheets = data.get('sheets')
+    if sheets is not None and (not isinstance(sheets, list) or not all(isinstance(name, str) for name in sheets)):
+        raise ValueError("sheets must be a list of worksheet names")
+    return sheets
+
+def _estimated_rows(stage, sheets):
+    if sheets is None or 'sheets' not in stage:
+        return stage.get('estimated_rows')
+    counts = [sheet['estimated_rows'] for sheet in stage['sheets'] if sheet['name'] in sheets]
+    return None if None in counts else sum(counts)
+
 @import_export_api_bp.route('/upload', methods=['POST'])
 @login_required
 def import_upload():
+    """把上传的 CSV / XLSX 保存到服务器端暂存目录，返回 upload_id 和表头，预览和导入时只需传 upload_id"""
     if 'file' not in request.files:
         return error_response('No file part', 400)
     file = request.files['file']
     if file.filename == '':
         return error_response('No selected file', 400)
 
-    if file and file.filename.endswith('.csv'):
+    file_format = _file_format(file.filename)
+    if file and file_format:
         try:
-            file_stream = io.StringIO(file.stream.read().decode('utf-8'))
-            df = pd.read_csv(file_stream)
-            headers = df.columns.tolist()
-            file.stream.seek(0)
-            file_content = file.stream.read().decode('utf-8')
-            return success_response({
-                'filename': file.filename,
-                'headers': headers,
-                'file_content': file_content
-            })
+            meta = create_stage(file.stream, file.filename, current_user.id,
+                                lambda path: {'format': file_format, **describe_points_file(path, file_format)},
+                                text=file_format == 'csv')
+        except UnicodeDecodeError:
+            return error_response('Failed to parse CSV file: file is not UTF-8 encoded', 400)
         except Exception as e:
-            logger.error(f"Error parsing CSV file: {e}")
-            return error_response(f'Failed to parse CSV file: {e}', 500)
+            logger.error(f"Error parsing {file_format.upper()} file: {e}")
+            return error_response(f'Failed to parse {file_format.upper()} file: {e}', 500)
+        result = {
+            'upload_id': meta['upload_id'],
+            'filename': meta['filename'],
+            'format': file_format,
+            'headers': meta['headers'],
+            'estimated_rows': meta['estimated_rows'],
+            'size_bytes': meta['size_bytes'],
+            'expires_in': IMPORT_STAGING_TTL,
+        }
+        if 'sheets' in meta:
+            result['sheets'] = meta['sheets']
+        return success_response('File uploaded.', result)
     else:
-        return error_response('Invalid file type, please upload a CSV file.', 400)
+        return error_response('Invalid file type, please upload a CSV or XLSX file.', 400)
+
+@import_export_api_bp.route('/upload/<upload_id>', methods=['DELETE'])
+@login_required
+def import_discard(upload_id):
+    """放弃导入，删除暂存文件"""
+    try:
+        get_stage(upload_id, current_user.id)
+    except LookupError as e:
+        return error_response(str(e), 404)
+    delete_stage(upload_id)
+    return success_response('Upload discarded.')
 
 @import_export_api_bp.route('/preview', methods=['POST'])
 @login_required
 def import_preview():
-    data = request.json
-    file_content = data.get('file_content')
+    data = request.json or {}
     mapping = data.get('mapping')
     rules = data.get('rules')
 
-    if not all([file_content, mapping, rules]):
+    if not all([mapping, rules]):
         return error_response('Missing data for preview', 400)
+    stage, error = _request_stage(data)
+    if error:
+        return error
 
+    start = time.monotonic()
     try:
-        file_stream = io.StringIO(file_content)
-        df = pd.read_csv(file_stream)
-        df.rename(columns=mapping, inplace=True)
-        
-        preview_results = []
-        summary = {'new': 0, 'overwrite': 0, 'skip': 0, 'error': 0}
-        
-        for index, row in df.head().iterrows():
-            unique_key = row.get('normalized_point_name')
-            status = 'new'
-            error_message = None
-            
-            if pd.isna(unique_key):
-                status = 'error'
-                error_message = 'Unique key (normalized_point_name) is missing.'
-            else:
-                existing_point = PointInfo.query.filter_by(normalized_point_name=unique_key).first()
-                if existing_point:
-                    status = rules.get('conflict', 'skip')
-            
-            summary[status] += 1
-            preview_row = row.to_dict()
-            preview_row['_status'] = status
-            preview_row['_error'] = error_message
-            preview_results.append(preview_row)
-
-        return success_response({
-            'preview_data': preview_results,
-            'summary': summary
-        })
-
+        # 对整个文件计算各状态的准确行数，只返回前几行和抽样的冲突/错误行
+        result = preview_points_file(stage['path'], mapping, conflict_rule=rules.get('conflict', 'skip'),
+                                     preview_rows=PREVIEW_ROWS, sample_size=PREVIEW_SAMPLE_SIZE,
+                                     file_format=stage.get('format', 'csv'), sheets=_request_sheets(data))
+    except ValueError as e:
+        return error_response(str(e), 400)
     except Exception as e:
         logger.error(f"Error generating import preview: {e}")
         return error_response(f'Failed to generate preview: {e}', 500)
 
+    result['elapsed_seconds'] = round(time.monotonic() - start, 3)
+    return success_response('Preview generated.', result)
+
 @import_export_api_bp.route('/process', methods=['POST'])
 @login_required
 def import_process():
-    data = request.json
-    file_content = data.get('file_content')
+    data = request.json or {}
     mapping = data.get('mapping')
     rules = data.get('rules')
 
-    if not all([file_content, mapping, rules]):
+    if not all([mapping, rules]):
         return error_response('Missing data for processing', 400)
+    stage, error = _request_stage(data)
+    if error:
+        return error
 
+    conflict_rule = 'overwrite' if rules.get('conflict') == 'overwrite' else 'skip'
+    path, file_format = stage['path'], stage.get('format', 'csv')
     try:
-        file_stream = io.StringIO(file_content)
-        df = pd.read_csv(file_stream)
-        df.rename(columns=mapping, inplace=True)
-
-        summary = {'created': 0, 'updated': 0, 'skipped': 0, 'errors': 0}
-        error_details = []
-
-        for index, row in df.iterrows():
-            try:
-                with db.session.begin_nested():
-                    unique_key = row.get('normalized_point_name')
-                    if pd.isna(unique_key):
-                        raise ValueError('Unique key (normalized_point_name) is missing.')
-
-                    existing_point = PointInfo.query.filter_by(normalized_point_name=unique_key).first()
-
-                    if existing_point:
-                        if rules.get('conflict') == 'skip':
-                            summary['skipped'] += 1
-                            continue
-                        elif rules.get('conflict') == 'overwrite':
-                            for key, value in row.items():
-                                if pd.notna(value) and hasattr(existing_point, key):
-                                    setattr(existing_point, key, value)
-                            summary['updated'] += 1
-                    else:
-                        row_data = {k: v for k, v in row.items() if pd.notna(v)}
-                        new_point = PointInfo(**row_data)
-                        db.session.add(new_point)
-                        summary['created'] += 1
-            except Exception as e:
-                db.session.rollback()
-                summary['errors'] += 1
-                error_details.append({'index': index + 2, 'error': str(e)})
-
-        db.session.commit()
-        add_audit_log('import_data', 'success', f"Import completed. Summary: {summary}")
-        return success_response({'summary': summary, 'error_details': error_details})
-
+        sheets = _request_sheets(data)
+    except ValueError as e:
+        return error_response(str(e), 400)
+
+    def run(batch_id, on_chunk):
+        # 分块读取，每块一次键查询、向量化比较后批量写入并提交
+        return import_points_file(path, mapping, conflict_rule=conflict_rule, batch_id=batch_id, on_chunk=on_chunk,
+                                  file_format=file_format, sheets=sheets)
+
+    def on_finish(status):
+        # 导入完成后暂存文件不再需要；取消或失败时保留，可以重新导入
+        if status == 'completed':
+            delete_stage(stage['upload_id'])
+
+    # 默认作为后台任务执行并立即返回 batch_id，通过 /jobs/<batch_id> 查询进度；background=false 时在请求中同步执行
+    if data.get('background', True):
+        if 'normalized_point_name' not in mapping.values():
+            return error_response('Unique key (normalized_point_name) is not mapped to any column.', 400)
+        try:
+            batch_id = start_import_job(
+                current_app._get_current_object(), run, stage['filename'], _estimated_rows(stage, sheets), conflict_rule,
+                current_user.id, current_user.username, request.remote_addr, on_finish=on_finish)
+        except Exception as e:
+            logger.error(f"Failed to start import job: {e}")
+            return error_response(f'Failed to start import job: {e}', 503)
+        return success_response('Import started.', {
+            'batch_id': batch_id,
+            'status': 'processing',
+            'job_url': url_for('import_export_api.import_job_status', batch_id=batch_id),
+        }, 202)
+
+    batch_id = new_batch_id()
+    try:
+        result = run(batch_id, None)
+    except ValueError as e:
+        return error_response(str(e), 400)
     except Exception as e:
         db.session.rollback()
         logger.error(f"Fatal error during import process: {e}")
         add_audit_log('import_data', 'failure', f"Fatal error: {e}")
         return error_response(f'An error occurred during the import process: {e}', 500)
+
+    # 导入完成后暂存文件不再需要
+    delete_stage(stage['upload_id'])
+    summary = {name: result[name] for name in ('created', 'updated', 'unchanged', 'skipped', 'errors')}
+    add_audit_log('import_data', 'success' if result['errors'] == 0 else 'partial_failure',
+                  f"Import completed. Batch: {batch_id}, file: {stage['filename']}, rows: {result['total']}, summary: {summary}, "
+                  f"elapsed: {result['elapsed_seconds']}s")
+    response = {
+        'batch_id': batch_id,
+        'summary': summary,
+        'error_details': result['error_details'],
+        'total_rows': result['total'],
+        'elapsed_seconds': result['elapsed_seconds'],
+        'rows_per_second': result['rows_per_second'],
+    }
+    if 'skipped_sheets' in result:
+        response['skipped_sheets'] = result['skipped_sheets']
+    return success_response('Import completed.', response)
+
+@import_export_api_bp.route('/jobs', methods=['GET'])
+@login_required
+def import_jobs_list():
+    """最近的导入任务"""
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    return success_response('Import jobs retrieved.', {'items': list_import_jobs(limit)})
+
+@import_export_api_bp.route('/jobs/<batch_id>', methods=['GET'])
+@login_required
+def import_job_status(batch_id):
+    """任务状态和进度，以及按行号分页的失败行（page / per_page）"""
+    try:
+        job = get_import_job(batch_id)
+    except LookupError as e:
+        return error_response(str(e), 404)
+    page, per_page = get_pagination_params(request)
+    if per_page == -1:
+        per_page = 1000
+    errors, total = get_import_job_errors(job, page, per_page)
+    job['errors'] = {
+        'items': errors,
+        'pagination': {'total': total, 'page': page, 'per_page': per_page,
+                       'pages': (total + per_page - 1) // per_page},
+    }
+    return success_response('Import job retrieved.', job)
+
+@import_export_api_bp.route('/jobs/<batch_id>/cancel', methods=['POST'])
+@login_required
+def import_job_cancel(batch_id):
+    """取消任务：在当前块提交后停止，已导入的块保留"""
+    try:
+        job = cancel_import_job(batch_id)
+    except LookupError as e:
+        return error_response(str(e), 404)
+    if job['finished']:
+        return error_response(f"Import job {batch_id} has already finished ({job['status']})", 409)
+    add_audit_log('cancel_import', 'success', f"Cancel requested. Batch: {batch_id}")
+    return success_response('Cancellation requested.', job)
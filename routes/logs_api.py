@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+Telegraf 日志统计 API 蓝图
+"""
+
+from datetime import datetime, timedelta, timezone
+from flask import Blueprint, request
+from flask_login import login_required
+
+from api_utils import handle_api_error, success_response, error_response, add_audit_log, get_pagination_params
+from db_manager import (get_log_rates, get_log_fingerprints, get_historical_processes_from_logs,
+                        delete_process_runs, delete_historical_processes)
+from log_pipeline import log_pipeline
+
+logs_api_bp = Blueprint('logs_api', __name__, url_prefix='/api/logs')
+
+@logs_api_bp.route('/rates', methods=['GET'])
+@login_required
+@handle_api_error
+def get_log_rates_api():
+    """
+    获取最近 N 分钟内各 Telegraf 进程的错误/警告/信息/调试日志计数。
+    数据来自分钟级汇总表，不扫描原始日志。
+    """
+    minutes = request.args.get('minutes', 60, type=int)
+    pid = request.args.get('pid', type=int)
+    include_series = request.args.get('series', 'false').lower() == 'true'
+
+    if minutes is None or minutes <= 0:
+        return error_response('minutes must be a positive integer', 400)
+    minutes = min(minutes, 60 * 24 * 31)
+
+    since = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(minutes=minutes)
+    result = get_log_rates(since, process_pid=pid, include_series=include_series)
+    if not result['success']:
+        return error_response(result['error'], 500)
+
+    return success_response("Log rates retrieved", {
+        'since': since.isoformat(),
+        'minutes': minutes,
+        'processes': result['processes'],
+        'series': result['series']
+    })
+
+@logs_api_bp.route('/fingerprints', methods=['GET'])
+@login_required
+@handle_api_error
+def get_log_fingerprints_api():
+    """
+    获取日志指纹列表：相同模式的消息合并为一条，附带出现次数、首次/最近出现时间和样本。
+    """
+    pid = request.args.get('pid', type=int)
+    level = request.args.get('level')
+    minutes = request.args.get('minutes', type=int)
+    order_by = request.args.get('order_by', 'occurrences')
+    limit = min(max(request.args.get('limit', 100, type=int) or 100, 1), 1000)
+
+    since = None
+    if minutes and minutes > 0:
+        since = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(minutes=minutes)
+
+    result = get_log_fingerprints(process_pid=pid, level=level, since=since, order_by=order_by, limit=limit)
+    if not result['success']:
+        return error_response(result['error'], 500)
+
+    return success_response("Log fingerprints retrieved", {'fingerprints': result['fingerprints']})
+
+@logs_api_bp.route('/history', methods=['GET'])
+@login_required
+@handle_api_error
+def get_process_runs_api():
+    """分页获取历史进程运行记录（每次运行一行，来自 process_runs 表）"""
+    page, per_page = get_pagination_params(request)
+    if per_page == -1:
+        per_page = 1000
+
+    result = get_historical_processes_from_logs(page, per_page)
+    if not result['success']:
+        return error_response(result['error'], 500)
+
+    return success_response("Process history retrieved", {
+        'items': result['items'],
+        'pagination': result['pagination']
+    })
+
+@logs_api_bp.route('/history/delete', methods=['POST'])
+@login_required
+@handle_api_error
+def delete_process_runs_api():
+    """按运行记录 ID 删除历史运行及其日志，或按 PID 删除该 PID 的全部日志记录"""
+    data = request.get_json() or {}
+    run_ids = data.get('run_ids') or []
+    pids = data.get('pids') or []
+    if not run_ids and not pids:
+        return error_response("No run_ids or pids provided", 400)
+
+    deleted = 0
+    if run_ids:
+        result = delete_process_runs(run_ids)
+        if not result['success']:
+            return error_response(result['error'], 500)
+        deleted = result['deleted']
+    if pids:
+        result = delete_historical_processes(pids)
+        if not result['success']:
+            return error_response(result['error'], 500)
+
+    add_audit_log('log_history_delete', 'success', f"Deleted log history: run_ids={run_ids}, pids={pids}")
+    return success_response(f"Successfully deleted {deleted} runs.", {'deleted_runs': deleted})
+
+@logs_api_bp.route('/pipeline', methods=['GET'])
+@login_required
+@handle_api_error
+def get_log_pipeline_stats_api():
+    """
+    获取日志写入管道的状态：队列深度、过载策略、写入耗时，
+    以及每个进程的读取/写入/丢弃行数和字节、秒级延迟，用于容量规划和延迟告警。
+    """
+    include_inactive = request.args.get('include_inactive', 'true').lower() == 'true'
+    return success_response("Log pipeline stats retrieved", log_pipeline.get_stats(include_inactive=include_inactive))
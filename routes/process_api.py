@@ -13,6 +13,7 @@ import json
 import glob
 
 from api_utils import handle_api_error, success_response, error_response, add_audit_log, get_pagination_params
+from serializers import serialize_processes
 from process_manager import restart_process, stop_process, start_process, CONFIG_DIR, LOG_DIR
 from models import db, TelegrafProcess, ConfigFile
 
@@ -207,10 +208,7 @@ def get_managed_processes():
     
     processes = paginated_query.all()
 
-    process_list = []
-    for p in processes:
-        p_dict = p.to_dict()
-        process_list.append(p_dict)
+    process_list = serialize_processes(processes)
 
     return jsonify({
         "draw": draw,
@@ -266,7 +264,7 @@ def get_non_managed_processes():
 def get_process_history():
     """获取已停止的进程历史记录"""
     history_records = TelegrafProcess.query.filter(TelegrafProcess.status == 'stopped').order_by(TelegrafProcess.stop_time.desc()).all()
-    history_list = [r.to_dict() for r in history_records]
+    history_list = serialize_processes(history_records)
     return success_response("History retrieved", {'history': history_list})
 
 @process_api_bp.route('/<int:pid>/logs', methods=['GET'])
@@ -377,8 +375,7 @@ def get_processes_summary():
     managed_processes = TelegrafProcess.query.filter(TelegrafProcess.status == 'running').all()
     managed_pids = {p.pid for p in managed_processes}
 
-    for p in managed_processes:
-        process_info = p.to_dict()
+    for process_info in serialize_processes(managed_processes):
         process_info['management_type'] = 'managed'
         all_processes.append(process_info)
 
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+批量序列化
+功能：列表接口一次性预取关联数据后再调用 to_dict，避免逐行触发延迟加载 (N+1 查询)
+作者：项目开发团队
+"""
+
+import time
+import logging
+
+import psutil
+from sqlalchemy import func
+from sqlalchemy.orm import load_only
+from sqlalchemy.orm.attributes import set_committed_value
+
+from models import (db, PointInfo, ConfigFile, TelegrafProcess, utcnow_tz,
+                    output_source_config_file_association, global_parameter_config_file_association)
+
+logger = logging.getLogger(__name__)
+
+# 批量采集 CPU 占用时的采样间隔（秒），所有进程共用一次等待
+CPU_SAMPLE_INTERVAL = 0.1
+
+
+def _attach_config_files(items):
+    """用一条 IN 查询加载 items 引用的配置文件（只取 id 和文件名），写入 config_file 关系而不触发延迟加载"""
+    ids = {item.config_file_id for item in items if item.config_file_id is not None}
+    config_files = {}
+    if ids:
+        config_files = {
+            cf.id: cf for cf in
+            ConfigFile.query.options(load_only(ConfigFile.id, ConfigFile.file_name)).filter(ConfigFile.id.in_(ids))
+        }
+    for item in items:
+        set_committed_value(item, 'config_file', config_files.get(item.config_file_id))
+
+
+def _reference_counts(association_table, key_column, ids):
+    """对关联表按 key_column GROUP BY 计数，返回 {id: 引用数}"""
+    if not ids:
+        return {}
+    column = association_table.c[key_column]
+    rows = db.session.query(column, func.count()).filter(column.in_(ids)).group_by(column).all()
+    return dict(rows)
+
+
+def serialize_point_infos(points):
+    """序列化一页数据点：配置文件名通过一次查询批量获取"""
+    _attach_config_files(points)
+    return [point.to_dict() for point in points]
+
+
+def serialize_output_sources(items):
+    """序列化一页数据源：被引用次数通过一次 GROUP BY 查询获取"""
+    counts = _reference_counts(output_source_config_file_association, 'output_source_id', [item.id for item in items])
+    return [item.to_dict(referenced_by_count=counts.get(item.id, 0)) for item in items]
+
+
+def serialize_global_parameters(items):
+    """序列化一页全局参数：被引用次数通过一次 GROUP BY 查询获取"""
+    counts = _reference_counts(global_parameter_config_file_association, 'global_parameter_id', [item.id for item in items])
+    return [item.to_dict(referenced_by_count=counts.get(item.id, 0)) for item in items]
+
+
+def collect_process_stats(pids):
+    """
+    批量采集进程的 (cpu_percent, memory_mb)：先对所有进程启动 CPU 采样，只等待一次采样间隔再统一读取。
+    已不存在的进程不在返回结果中。
+    """
+    procs = {}
+    for pid in pids:
+        try:
+            proc = psutil.Process(pid)
+            proc.cpu_percent(interval=None)
+            procs[pid] = proc
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+    if procs:
+        time.sleep(CPU_SAMPLE_INTERVAL)
+    stats = {}
+    for pid, proc in procs.items():
+        try:
+            stats[pid] = (proc.cpu_percent(interval=None), proc.memory_info().rss / (1024 * 1024))
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+    return stats
+
+
+def serialize_processes(processes):
+    """
+    序列化一组受管进程：先统一刷新已退出进程的状态，配置文件名和资源占用批量获取，
+    序列化结束后只提交一次。
+    """
+    changed = False
+    for process in processes:
+        changed = process.refresh_status() or changed
+    _attach_config_files(processes)
+    stats = collect_process_stats([p.pid for p in processes if p.pid and p.status == 'running'])
+
+    results = []
+    for process in processes:
+        process_stats = None
+        if process.pid and process.status == 'running':
+            process_stats = stats.get(process.pid)
+            if process_stats is None:
+                logger.info(f"Process {process.pid} disappeared during stat collection. Updating status to 'stopped'.")
+                process.status = 'stopped'
+                process.stop_time = utcnow_tz()
+                changed = True
+        results.append(process.to_dict(stats=process_stats))
+
+    if changed:
+        db.session.commit()
+    return results
+
+
+def get_config_file_runtime_info(config_ids):
+    """
+    批量获取配置文件的关联信息，返回 ({config_id: 是否有运行中的受管进程}, {config_id: 关联数据点数})。
+    """
+    if not config_ids:
+        return {}, {}
+    managed = {}
+    for config_file_id, status in db.session.query(TelegrafProcess.config_file_id, TelegrafProcess.status) \
+            .filter(TelegrafProcess.config_file_id.in_(config_ids)).order_by(TelegrafProcess.id):
+        # 与原逻辑一致：以该配置文件的第一条进程记录为准
+        managed.setdefault(config_file_id, status == 'running')
+    point_counts = dict(
+        db.session.query(PointInfo.config_file_id, func.count(PointInfo.id))
+        .filter(PointInfo.config_file_id.in_(config_ids))
+        .group_by(PointInfo.config_file_id)
+        .all()
+    )
+    return managed, point_counts
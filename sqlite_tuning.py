@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+SQLite 连接调优
+功能：在每个新建的 SQLite 连接上应用 PRAGMA 配置，并定期执行 WAL 检查点和 optimize
+作者：项目开发团队
+
+默认配置 (SQLITE_PRAGMA_PROFILE=tuned) 使用 WAL 日志模式，读写互不阻塞，多个 gunicorn 工作进程
+同时写入时由 busy_timeout 等待而不是立即报 "database is locked"。
+设置 SQLITE_PRAGMA_PROFILE=default 可恢复 SQLite 默认行为。
+
+定期维护线程在 create_app 中启动。gunicorn 使用 preload_app=True 时应用只在主进程加载一次，
+维护线程只运行在主进程中，fork 出的工作进程不会启动自己的维护线程；检查点和 optimize 作用于整个数据库文件，
+一个进程执行即可，工作进程按 max_requests 重启也不影响维护。
+"""
+
+import os
+import sqlite3
+import logging
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+SQLITE_PRAGMA_PROFILE = os.environ.get('SQLITE_PRAGMA_PROFILE', 'tuned')
+
+# 按顺序执行；journal_mode 需在其他设置之前
+SQLITE_PRAGMAS = {
+    'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)),  # 毫秒
+    'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -20000)),  # 负数表示 KiB，即约 20MB
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    'temp_store': os.environ.get('SQLITE_TEMP_STORE', 'MEMORY'),
+}
+
+# 定期维护间隔（秒），0 表示不启动维护线程
+SQLITE_MAINTENANCE_INTERVAL = int(os.environ.get('SQLITE_MAINTENANCE_INTERVAL', 600))
+
+
+def get_pragma_profile():
+    """返回当前生效的 PRAGMA 配置，default 配置下为空"""
+    if SQLITE_PRAGMA_PROFILE == 'default':
+        return {}
+    return dict(SQLITE_PRAGMAS)
+
+
+def apply_sqlite_pragmas(dbapi_connection, profile=None):
+    """在一个 sqlite3 连接上执行 PRAGMA 配置"""
+    profile = get_pragma_profile() if profile is None else profile
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in profile.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+@event.listens_for(Engine, 'connect')
+def _on_connect(dbapi_connection, connection_record):
+    # 所有 SQLAlchemy 引擎（包括 Alembic 迁移使用的引擎）新建的 SQLite 连接都会经过这里
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        try:
+            apply_sqlite_pragmas(dbapi_connection)
+        except sqlite3.Error as e:
+            logger.error(f"应用 SQLite PRAGMA 配置失败: {e}")
+
+
+def run_sqlite_maintenance(db_path):
+    """
+    执行一次维护：wal_checkpoint(TRUNCATE) 把 WAL 内容写回主库并截断 WAL 文件，
+    optimize 按需更新查询规划器的统计信息。使用独立连接，不占用连接池。
+    """
+    conn = sqlite3.connect(db_path, timeout=SQLITE_PRAGMAS['busy_timeout'] / 1000)
+    try:
+        busy, log_frames, checkpointed = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+        conn.execute("PRAGMA optimize")
+        return {'busy': bool(busy), 'log_frames': log_frames, 'checkpointed_frames': checkpointed}
+    finally:
+        conn.close()
+
+
+class SqliteMaintenance:
+    """
+    后台定期执行 run_sqlite_maintenance 的守护线程。
+    每个调用 start() 的进程各有一个线程；gunicorn preload_app 模式下只有主进程调用。
+    """
+
+    def __init__(self, db_path, interval=SQLITE_MAINTENANCE_INTERVAL):
+        self.db_path = db_path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.interval <= 0 or SQLITE_PRAGMA_PROFILE == 'default':
+            return
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="sqlite-maintenance")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            if not os.path.exists(self.db_path):
+                continue
+            try:
+                result = run_sqlite_maintenance(self.db_path)
+                if result['busy']:
+                    logger.info(f"SQLite 检查点未完全完成（有读事务进行中）: {result}")
+            except sqlite3.Error as e:
+                logger.warning(f"SQLite 定期维护失败: {e}")
@@ -509,10 +509,11 @@ class ImportExportManager {
         const pointsToImport = this.state.fullData.map(row => { const cleanRow = { ...row }; delete cleanRow._meta; return cleanRow; });
 
         try {
-            this.importProgress.style.width = '50%';
-            this.importProgress.textContent = '50%';
+            this.importProgress.style.width = '0%';
+            this.importProgress.textContent = '0%';
             this.importProgress.classList.add('progress-bar-animated');
 
+            // 导入在后台任务中执行，轮询任务状态显示进度
             const response = await fetch('/api/point_info/import', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
@@ -520,7 +521,8 @@ class ImportExportManager {
                     points: pointsToImport, 
                     conflict_rule: conflictRule, 
                     rename_rule: renameRule,
-                    file_name: this.state.file.name
+                    file_name: this.state.file.name,
+                    background: true
                 })
             });
 
@@ -530,14 +532,21 @@ class ImportExportManager {
                  throw new Error((result.error || '未知错误') + errorDetails);
             }
 
+            const job = await this.waitForImportJob(result.job_url);
+            if (job.status === 'failed') {
+                throw new Error(`${job.error || '未知错误'}<p>批次ID: <code>${job.batch_id}</code></p>`);
+            }
+
             this.importProgress.style.width = '100%';
             this.importProgress.textContent = '100%';
             this.importProgress.classList.remove('progress-bar-animated', 'bg-danger');
 
-            let summaryHtml = `<div class="alert alert-success"><h4>导入完成！</h4>
-                <p>批次ID: <code>${result.data.batch_id}</code></p>
-                <p>总行数: <strong>${result.data.total_rows}</strong></p>
-                <p>新增: <strong>${result.data.imported_count}</strong>, 更新: <strong>${result.data.updated_count}</strong>, 跳过: <strong>${result.data.skipped_count}</strong>, 失败: <strong>${result.data.failed_count}</strong></p>
+            const summary = job.summary || {};
+            const title = job.status === 'cancelled' ? '导入已取消（已导入的部分保留）' : '导入完成！';
+            let summaryHtml = `<div class="alert ${job.status === 'cancelled' ? 'alert-warning' : 'alert-success'}"><h4>${title}</h4>
+                <p>批次ID: <code>${job.batch_id}</code></p>
+                <p>总行数: <strong>${job.processed_rows}</strong></p>
+                <p>新增: <strong>${summary.created ?? 0}</strong>, 更新: <strong>${summary.updated ?? 0}</strong>, 未变化: <strong>${summary.unchanged ?? 0}</strong>, 跳过: <strong>${summary.skipped ?? 0}</strong>, 失败: <strong>${summary.errors ?? 0}</strong></p>
             </div>`;
             
             this.importSummary.innerHTML = summaryHtml;
@@ -555,6 +564,21 @@ class ImportExportManager {
         }
     }
 
+    async waitForImportJob(jobUrl) {
+        while (true) {
+            const response = await fetch(`${jobUrl}?per_page=1`);
+            const result = await response.json();
+            if (!response.ok) throw new Error(result.error || '无法获取导入任务状态');
+            const job = result;
+            if (job.finished) return job;
+            if (job.progress !== null) {
+                this.importProgress.style.width = `${job.progress}%`;
+                this.importProgress.textContent = `${Math.floor(job.progress)}%`;
+            }
+            await new Promise(resolve => setTimeout(resolve, 1000));
+        }
+    }
+
     goToStep(stepNumber) {
         if (stepNumber === 2) {
             const headerRow = parseInt(this.headerRowInput.value, 10);
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+测试公共夹具
+功能：在临时目录中创建经 Alembic 迁移的 SQLite 数据库和 DuckDB 数据库，注册 API 蓝图并写入示例数据。
+不导入 app 模块（导入时会按默认路径创建应用并初始化 database/ 下的数据库）。
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from flask import Flask
+from flask_login import LoginManager
+from flask_migrate import Migrate, upgrade
+from sqlalchemy import event, insert, text
+
+import db_manager
+import sqlite_tuning  # noqa: F401  导入即注册 PRAGMA 配置，与应用一致
+from models import db, User, ConfigFile, PointInfo, PointInfoHistory, TelegrafProcess
+from point_search import include_object
+
+# 示例数据规模：查询计划测试需要足够的行数使规划器在有统计信息时仍选择索引；
+# 查询计数测试需要配置文件和运行中的进程各至少 100 条
+CONFIG_FILES = 100
+POINTS_PER_CONFIG = 100
+HISTORY_VERSIONS = 3
+PROCESSES = 200
+IMPORT_BATCH = 'batch_0007'
+
+
+def _seed(session):
+    now = datetime.now(timezone.utc)
+    session.execute(insert(ConfigFile), [
+        {'id': i, 'file_name': f'telegraf_{i}.conf', 'content': '[agent]', 'content_hash': f'{i:064d}',
+         'version': 1, 'change_type': 'system', 'is_active': True, 'data_points_synced': i % 2 == 0,
+         'created_at': now - timedelta(minutes=i)}
+        for i in range(1, CONFIG_FILES + 1)
+    ])
+    points = []
+    for i in range(1, CONFIG_FILES * POINTS_PER_CONFIG + 1):
+        points.append({
+            'id': i, 'measurement': f'area{i % 97}_temperature_{i}', 'original_point_name': f'ns=2;s=Area{i % 97}.Tag{i}',
+            'normalized_point_name': f'area{i % 97}_tag{i}', 'point_comment': f'sensor {i}', 'tags': '{}', 'fields': '{}',
+            'timestamp': now, 'data_source': 'opcua', 'config_file_id': (i % CONFIG_FILES) + 1 if i % 10 else None,
+            'is_enabled': True, 'is_locked': i % 3 == 0, 'created_at': now,
+            'import_batch': f'batch_{i % 20:04d}', 'current_version': HISTORY_VERSIONS,
+        })
+    session.execute(insert(PointInfo), points)
+    session.execute(insert(PointInfoHistory), [
+        {'point_info_id': point['id'], 'version': version, 'measurement': point['measurement'],
+         'archived_at': now, 'import_batch': point['import_batch'], 'change_reason': f'update {version}'}
+        for point in points for version in range(1, HISTORY_VERSIONS + 1)
+    ])
+    session.execute(insert(TelegrafProcess), [
+        # 运行中的进程使用测试进程自身的 PID，序列化时不会被判定为已退出
+        {'id': i, 'name': f'telegraf_{i}', 'pid': os.getpid() if i % 2 else 100000 + i,
+         'status': 'running' if i % 2 else 'stopped', 'config_file_id': (i % CONFIG_FILES) + 1,
+         'log_file_path': f'/tmp/telegraf_{i}.log'}
+        for i in range(1, PROCESSES + 1)
+    ])
+    session.commit()
+    # 与 SqliteMaintenance 定期执行的 PRAGMA optimize 一致，规划器基于统计信息选择计划
+    session.execute(text("ANALYZE"))
+    session.commit()
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    tmp = tmp_path_factory.mktemp('db')
+    db_manager.DUCKDB_PATH = str(tmp / 'telegraf_logs.duckdb')
+    db_manager.init_duckdb()
+
+    app = Flask(__name__)
+    app.config.update(
+        TESTING=True,
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp / 'telegraf_manager.db'}",
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        SECRET_KEY='test',
+    )
+    db.init_app(app)
+    Migrate(app, db, directory=os.path.join(ROOT, 'migrations'), include_object=include_object)
+
+    login_manager = LoginManager()
+    login_manager.init_app(app)
+
+    @login_manager.user_loader
+    def load_user(user_id):
+        return db.session.get(User, int(user_id))
+
+    from routes.admin_api import admin_api_bp
+    from routes.config_files_api import config_files_api_bp
+    from routes.data_management_api import data_management_api_bp
+    from routes.export_api import export_api_bp
+    from routes.process_api import process_api_bp
+    app.register_blueprint(admin_api_bp)
+    app.register_blueprint(config_files_api_bp)
+    app.register_blueprint(data_management_api_bp, url_prefix='/api')
+    app.register_blueprint(export_api_bp)
+    app.register_blueprint(process_api_bp)
+
+    with app.app_context():
+        upgrade(directory=os.path.join(ROOT, 'migrations'))
+        user = User(username='admin')
+        user.set_password('admin123')
+        db.session.add(user)
+        db.session.commit()
+        _seed(db.session)
+    yield app
+
+
+@pytest.fixture
+def client(app):
+    """已登录的测试客户端"""
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = '1'
+        session['_fresh'] = True
+    return client
+
+
+@pytest.fixture
+def statements(app):
+    """记录测试期间 SQLite 执行的 (SQL, 参数) 列表"""
+    executed = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        executed.append((statement, parameters))
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    yield executed
+    event.remove(engine, 'before_cursor_execute', before_cursor_execute)
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+审计日志接口测试
+功能：确认键集分页的游标可以逐页翻完，格式正确但键值无效的游标返回 400 而不是 500。
+"""
+
+import pytest
+
+from api_utils import encode_cursor
+from db_manager import get_duckdb_connection
+
+ACTION = 'audit_cursor_test'
+ROWS = 5
+
+
+@pytest.fixture(scope='module')
+def audit_rows(app):
+    conn = get_duckdb_connection()
+    try:
+        conn.executemany("INSERT INTO audit_log (username, action, status) VALUES ('test', ?, 'success')",
+                         [(ACTION,)] * ROWS)
+    finally:
+        conn.close()
+
+
+def test_cursor_pages_through_all_rows(client, audit_rows):
+    seen, cursor = [], ''
+    while True:
+        body = client.get('/api/audit_log', query_string={'cursor': cursor, 'limit': 2, 'action': ACTION}).get_json()
+        seen += [item['id'] for item in body['items']]
+        if not body['has_more']:
+            break
+        cursor = body['next_cursor']
+    assert len(seen) == len(set(seen)) == ROWS
+
+
+@pytest.mark.parametrize('values', [
+    ['not-a-time', '00000000-0000-0000-0000-000000000000'],
+    ['2026-01-01T00:00:00', 'not-a-uuid'],
+    [None, 1],
+])
+def test_invalid_cursor_values_return_400(client, values):
+    response = client.get('/api/audit_log', query_string={'cursor': encode_cursor(values)})
+    assert response.status_code == 400
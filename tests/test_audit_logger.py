@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+审计日志缓冲测试
+功能：确认记录在调用时以 UTC 时间进入缓冲区、由 flush 批量写入 audit_log；写入失败时记录留在缓冲区，
+之后按原顺序写入；旧库中按本地时间写入的审计表只迁移一次，列默认值改为 UTC。
+"""
+
+from datetime import datetime, timezone
+
+import duckdb
+import pytest
+
+import audit_logger as audit_logger_module
+import db_manager
+from audit_logger import AuditLogger
+
+
+def _rows(action):
+    conn = db_manager.get_duckdb_connection()
+    try:
+        return conn.execute("SELECT timestamp, username, details FROM audit_log WHERE action = ? ORDER BY details",
+                            [action]).fetchall()
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def buffered(app):
+    # 刷新间隔足够长，测试期间由 flush() 显式写入
+    sink = AuditLogger(batch_size=1000, flush_interval=3600)
+    yield sink
+    sink.shutdown(timeout=5)
+
+
+def test_records_are_buffered_until_flush(buffered):
+    before = datetime.now(timezone.utc).replace(tzinfo=None)
+    for i in range(3):
+        buffered.log('admin', '127.0.0.1', 'audit_buffer_test', 'success', f'item {i}')
+    assert buffered.get_stats()['buffered'] == 3
+    assert _rows('audit_buffer_test') == []
+
+    assert buffered.flush() == 3
+    rows = _rows('audit_buffer_test')
+    assert [details for _, _, details in rows] == ['item 0', 'item 1', 'item 2']
+    after = datetime.now(timezone.utc).replace(tzinfo=None)
+    assert all(before <= timestamp <= after for timestamp, _, _ in rows)
+
+
+def test_failed_flush_keeps_records_in_order(buffered, monkeypatch):
+    def unavailable():
+        raise duckdb.IOException('Could not set lock on file')
+
+    buffered.log('admin', '127.0.0.1', 'audit_retry_test', 'success', 'item 0')
+    monkeypatch.setattr(audit_logger_module, 'get_duckdb_connection', unavailable)
+    with pytest.raises(duckdb.IOException):
+        buffered.flush()
+    buffered.log('admin', '127.0.0.1', 'audit_retry_test', 'success', 'item 1')
+    assert buffered.get_stats()['buffered'] == 2
+
+    monkeypatch.undo()
+    assert buffered.flush() == 2
+    assert [details for _, _, details in _rows('audit_retry_test')] == ['item 0', 'item 1']
+
+
+LEGACY_AUDIT_SCHEMA = """
+    CREATE TABLE audit_log (id UUID DEFAULT uuid(), timestamp TIMESTAMP DEFAULT now(), username VARCHAR,
+                            ip_address VARCHAR, action VARCHAR, status VARCHAR, details VARCHAR)
+"""
+
+
+def _audit_default(conn):
+    return conn.execute("SELECT column_default FROM duckdb_columns() "
+                        "WHERE table_name = 'audit_log' AND column_name = 'timestamp'").fetchone()[0]
+
+
+def test_local_time_audit_rows_are_converted_to_utc():
+    conn = duckdb.connect()
+    try:
+        conn.execute(LEGACY_AUDIT_SCHEMA)
+        conn.execute("INSERT INTO audit_log (timestamp, action) VALUES ('2026-01-01 08:00:00', 'legacy')")
+        # 迁移按会话时区（服务器本地时区）解释旧记录
+        conn.execute("SET TimeZone = 'Asia/Shanghai'")
+        db_manager._migrate_audit_log_to_utc(conn)
+
+        assert conn.execute("SELECT timestamp FROM audit_log").fetchone()[0] == datetime(2026, 1, 1, 0, 0)
+        assert _audit_default(conn) != 'now()'
+    finally:
+        conn.close()
+
+
+def test_audit_migration_runs_once(tmp_path, monkeypatch):
+    path = str(tmp_path / 'legacy_audit.duckdb')
+    conn = duckdb.connect(path)
+    conn.execute(LEGACY_AUDIT_SCHEMA)
+    conn.close()
+    monkeypatch.setattr(db_manager, 'DUCKDB_PATH', path)
+    calls = []
+    migrate = db_manager._migrate_audit_log_to_utc
+    monkeypatch.setattr(db_manager, '_migrate_audit_log_to_utc', lambda conn: (calls.append(1), migrate(conn)))
+
+    db_manager.init_duckdb()
+    db_manager.init_duckdb()
+    assert calls == [1]
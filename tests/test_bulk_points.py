@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+数据点批量操作接口测试
+功能：确认 /api/point_info/bulk 需要登录，且 all=true 的删除须带上与选中数量一致的 confirm_count。
+"""
+
+from sqlalchemy import insert
+
+from models import db, PointInfo
+
+BULK_URL = '/api/point_info/bulk'
+BATCH = 'bulk_delete_test'
+
+
+def _seed_batch(app, count=3):
+    # 独立的导入批次，删除时不影响其他测试使用的共享数据
+    with app.app_context():
+        db.session.execute(insert(PointInfo), [
+            {'measurement': f'bulk_delete_{i}', 'normalized_point_name': f'bulk_delete_{i}', 'import_batch': BATCH}
+            for i in range(count)
+        ])
+        db.session.commit()
+
+
+def _batch_count(app):
+    with app.app_context():
+        return PointInfo.query.filter_by(import_batch=BATCH).count()
+
+
+def _delete_all(client, **extra):
+    return client.post(BULK_URL, json={'action': 'delete', 'filter': {'import_batch': BATCH}, 'all': True, **extra})
+
+
+def test_bulk_requires_login(app):
+    response = app.test_client().post(BULK_URL, json={'action': 'delete', 'filter': {}, 'all': True})
+    assert response.status_code == 401
+
+
+def test_delete_all_requires_matching_confirm_count(app, client):
+    _seed_batch(app)
+
+    for extra in ({}, {'confirm_count': 2}, {'confirm_count': '3'}):
+        response = _delete_all(client, **extra)
+        assert response.status_code == 400
+        assert '(3)' in response.get_json()['error']
+        assert _batch_count(app) == 3
+
+    response = _delete_all(client, confirm_count=3)
+    assert response.status_code == 200
+    assert response.get_json()['affected'] == 3
+    assert _batch_count(app) == 0
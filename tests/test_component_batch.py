@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+组件批量操作接口测试
+功能：确认 /api/<组件>/batch 需要登录，任一项校验失败时整批不执行，全部通过时在一个事务中按 删除 → 更新 → 创建 执行。
+"""
+
+import pytest
+
+from models import ProcessingTag
+
+BATCH_URLS = ['/api/data_sources/batch', '/api/global_parameters/batch', '/api/point_templates/batch',
+              '/api/processing_tags/batch']
+
+
+def _tag(name, **data):
+    return {'op': 'create', 'data': {'name': name, 'plugin_type': 'processor', 'config': '[processors.noop]', **data}}
+
+
+def _batch(client, *operations):
+    return client.post('/api/processing_tags/batch', json={'operations': list(operations)})
+
+
+def _tags(app, prefix):
+    with app.app_context():
+        return {tag.name: tag.description for tag in ProcessingTag.query.filter(ProcessingTag.name.like(f'{prefix}%'))}
+
+
+@pytest.mark.parametrize('url', BATCH_URLS)
+def test_batch_requires_login(app, url):
+    assert app.test_client().post(url, json={'operations': [{'op': 'delete', 'id': 1}]}).status_code == 401
+
+
+def test_failed_item_leaves_batch_unapplied(app, client):
+    response = _batch(client, _tag('atomic_a', description='before'))
+    assert response.status_code == 200
+    tag_id = response.get_json()['results'][0]['id']
+
+    response = _batch(client,
+                      {'op': 'update', 'id': tag_id, 'data': {'description': 'after'}},
+                      _tag('atomic_b'),
+                      {'op': 'delete', 'id': 999999})
+    assert response.status_code == 400
+    statuses = [result['status'] for result in response.get_json()['details']['results']]
+    assert statuses == ['skipped', 'skipped', 'error']
+    assert _tags(app, 'atomic_') == {'atomic_a': 'before'}
+
+    # 名称冲突返回 409，同样不做任何修改
+    response = _batch(client, {'op': 'update', 'id': tag_id, 'data': {'description': 'after'}}, _tag('atomic_a'))
+    assert response.status_code == 409
+    assert _tags(app, 'atomic_') == {'atomic_a': 'before'}
+
+
+def test_deleted_name_can_be_reused_in_same_batch(app, client):
+    tag_id = _batch(client, _tag('reuse_a', description='old')).get_json()['results'][0]['id']
+
+    response = _batch(client, {'op': 'delete', 'id': tag_id}, _tag('reuse_a', description='new'))
+    assert response.status_code == 200
+    assert response.get_json()['summary'] == {'create': 1, 'update': 0, 'delete': 1}
+    assert _tags(app, 'reuse_') == {'reuse_a': 'new'}
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+日志导出测试
+功能：确认导出只切分 since/until 与数据实际时间范围的交集，宽时间范围不会产生大量空的时间段；
+数据点分批导出为 CSV、Parquet 和 XLSX 的结果与过滤条件匹配的数据点一致，XLSX 超过单表行数上限时换表。
+"""
+
+import csv
+import io
+from datetime import datetime, timedelta
+
+import duckdb
+import openpyxl
+import pytest
+from sqlalchemy import insert
+
+import db_manager
+from models import db, PointInfo
+from routes import export_api
+from routes.export_api import _time_chunks, EXPORT_CHUNK_HOURS
+
+ACTION = 'export_chunk_test'
+FIRST = datetime(2026, 1, 1, 6, 0)
+LAST = datetime(2026, 1, 2, 12, 0)
+
+
+@pytest.fixture(scope='module')
+def audit_rows(app):
+    conn = db_manager.get_duckdb_connection()
+    try:
+        conn.executemany("INSERT INTO audit_log (timestamp, username, action, status) VALUES (?, 'test', ?, 'success')",
+                         [(FIRST, ACTION), (LAST, ACTION)])
+    finally:
+        conn.close()
+    return " WHERE action = ?", [ACTION]
+
+
+def test_chunks_start_at_first_row_after_since(audit_rows):
+    where_clause, params = audit_rows
+    chunks = _time_chunks('audit_log', where_clause, params, datetime(2020, 1, 1), datetime(2030, 1, 1))
+
+    step = timedelta(hours=EXPORT_CHUNK_HOURS)
+    assert chunks[0][0] == FIRST
+    assert chunks[-1][1] == LAST + timedelta(microseconds=1)
+    assert len(chunks) == -(-(LAST - FIRST + timedelta(microseconds=1)) // step)
+
+
+def test_chunks_keep_narrower_since_and_until(audit_rows):
+    where_clause, params = audit_rows
+    since, until = FIRST + timedelta(hours=1), LAST - timedelta(hours=1)
+    chunks = _time_chunks('audit_log', where_clause, params, since, until)
+
+    assert chunks[0][0] == since
+    assert chunks[-1][1] == until
+
+
+EXPORT_BATCH = 'export_test'
+# (measurement, unit, is_enabled)
+EXPORT_ROWS = [('export_a', 'kPa', True), ('export_b', None, False), ('export_c', 'bar', True),
+               ('export_d', None, True), ('export_e', 'kPa', False)]
+
+
+@pytest.fixture(scope='module')
+def export_points(app):
+    with app.app_context():
+        db.session.execute(insert(PointInfo), [
+            {'measurement': measurement, 'unit': unit, 'is_enabled': enabled, 'import_batch': EXPORT_BATCH}
+            for measurement, unit, enabled in EXPORT_ROWS
+        ])
+        db.session.commit()
+        return [(p.id, p.measurement, p.unit, p.is_enabled)
+                for p in PointInfo.query.filter_by(import_batch=EXPORT_BATCH).order_by(PointInfo.id)]
+
+
+@pytest.fixture
+def small_batches(monkeypatch):
+    # 每批 2 行，5 个数据点分 3 批读取
+    monkeypatch.setattr(export_api, 'EXPORT_POINTS_BATCH_SIZE', 2)
+
+
+def _export(client, export_format, **filters):
+    response = client.get('/api/export/points', query_string={'format': export_format, 'import_batch': EXPORT_BATCH,
+                                                               **filters})
+    assert response.status_code == 200
+    return response.data
+
+
+def test_export_points_csv(client, export_points, small_batches):
+    rows = list(csv.DictReader(io.StringIO(_export(client, 'csv').decode('utf-8'))))
+    assert [(int(row['id']), row['measurement'], row['unit'] or None, row['is_enabled'] == 'true')
+            for row in rows] == export_points
+    assert all(row['import_batch'] == EXPORT_BATCH for row in rows)
+
+    rows = list(csv.DictReader(io.StringIO(_export(client, 'csv', is_enabled='false').decode('utf-8'))))
+    assert [row['measurement'] for row in rows] == ['export_b', 'export_e']
+
+
+def test_export_points_parquet(client, export_points, small_batches, tmp_path):
+    path = tmp_path / 'points.parquet'
+    path.write_bytes(_export(client, 'parquet'))
+    conn = duckdb.connect()
+    try:
+        rows = conn.execute("SELECT id, measurement, unit, is_enabled FROM read_parquet(?) ORDER BY id",
+                            [str(path)]).fetchall()
+    finally:
+        conn.close()
+    assert rows == export_points
+
+
+def test_export_points_xlsx_rolls_over_sheets(client, export_points, small_batches, monkeypatch, tmp_path):
+    # 每个工作表 3 行（含表头）
+    monkeypatch.setattr(export_api, 'XLSX_MAX_ROWS', 3)
+    path = tmp_path / 'points.xlsx'
+    path.write_bytes(_export(client, 'xlsx'))
+    workbook = openpyxl.load_workbook(path, read_only=True)
+    try:
+        assert workbook.sheetnames == ['points', 'points_2', 'points_3']
+        rows = []
+        for sheet in workbook.worksheets:
+            header, *values = sheet.iter_rows(values_only=True)
+            assert list(header) == export_api.POINT_EXPORT_NAMES
+            rows += [dict(zip(header, row)) for row in values]
+    finally:
+        workbook.close()
+    assert [(row['id'], row['measurement'], row['unit'], row['is_enabled']) for row in rows] == export_points
+
+
+def test_export_points_rejects_unknown_format(client):
+    assert client.get('/api/export/points', query_string={'format': 'json'}).status_code == 400
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+后台导入任务取消测试
+功能：确认取消请求在下一块开始前停止任务，已提交的块保留，任务状态经 cancelling 变为 cancelled；
+取消请求来自其他工作进程时，任务在写入进度时读到 cancelling 后停止；已结束的任务不受取消请求影响。
+"""
+
+import threading
+
+import pytest
+
+import import_jobs
+from import_jobs import cancel_import_job, get_import_job, start_import_job
+from models import PointInfo
+from point_import import bulk_upsert_points
+
+
+def _start(app, prefix, rows=4):
+    """启动一个逐行提交的导入任务，第一块提交后暂停，直到返回的 proceed 被设置"""
+    first_chunk, proceed = threading.Event(), threading.Event()
+    records = [(i, {'measurement': f'{prefix}_{i}'}) for i in range(rows)]
+
+    def run(batch_id, on_chunk):
+        def paused(summary):
+            first_chunk.set()
+            proceed.wait(5)
+            on_chunk(summary)
+        return bulk_upsert_points(records, batch_id=batch_id, chunk_size=1, on_chunk=paused)
+
+    batch_id = start_import_job(app, run, f'{prefix}.json', rows, 'overwrite', None, 'admin', '127.0.0.1')
+    thread = import_jobs._jobs[batch_id].thread
+    assert first_chunk.wait(5)
+    return batch_id, thread, proceed
+
+
+def _imported(app, prefix):
+    with app.app_context():
+        return PointInfo.query.filter(PointInfo.measurement.like(f'{prefix}\\_%', escape='\\')).count()
+
+
+def test_cancel_stops_job_before_next_chunk(app):
+    batch_id, thread, proceed = _start(app, 'cancel_local')
+    assert cancel_import_job(batch_id)['status'] == 'cancelling'
+    proceed.set()
+    thread.join(5)
+
+    job = get_import_job(batch_id)
+    assert (job['status'], job['finished']) == ('cancelled', True)
+    assert job['summary']['created'] == 1
+    assert _imported(app, 'cancel_local') == 1
+
+
+def test_cancel_from_other_process(app, monkeypatch):
+    monkeypatch.setattr(import_jobs, 'IMPORT_JOB_FLUSH_INTERVAL', 0)
+    batch_id, thread, proceed = _start(app, 'cancel_remote')
+    # 其他工作进程中没有本任务的线程，只能修改 import_batches 中的状态
+    monkeypatch.setattr(import_jobs, '_jobs_pid', -1)
+    assert cancel_import_job(batch_id)['status'] == 'cancelling'
+    assert not import_jobs._jobs[batch_id].stop.is_set()
+    proceed.set()
+    thread.join(5)
+
+    assert get_import_job(batch_id)['status'] == 'cancelled'
+    assert _imported(app, 'cancel_remote') == 1
+
+
+def test_cancel_finished_job_keeps_status(app):
+    batch_id, thread, proceed = _start(app, 'cancel_done', rows=1)
+    proceed.set()
+    thread.join(5)
+
+    assert cancel_import_job(batch_id)['status'] == 'completed'
+    assert _imported(app, 'cancel_done') == 1
+    with pytest.raises(LookupError):
+        cancel_import_job('batch_missing')
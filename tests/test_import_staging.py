@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+导入文件暂存测试
+功能：确认超过 IMPORT_STAGING_TTL 未被访问的暂存项在下次上传时被清理，读取暂存项会刷新访问时间；
+过期、不存在或属于其他用户的暂存项都按 LookupError 处理。
+"""
+
+import io
+import os
+import time
+
+import pytest
+
+import import_staging
+from import_staging import collect_expired_stages, create_stage, get_stage
+
+TTL = import_staging.IMPORT_STAGING_TTL
+
+
+@pytest.fixture(autouse=True)
+def staging_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(import_staging, 'IMPORT_STAGING_DIR', str(tmp_path))
+    return tmp_path
+
+
+def _stage(user_id=1):
+    return create_stage(io.BytesIO(b'name\na\n'), 'points.csv', user_id, lambda path: {'headers': ['name']})
+
+
+def _age(upload_id, seconds):
+    stage_dir = os.path.join(import_staging.IMPORT_STAGING_DIR, upload_id)
+    past = time.time() - seconds
+    os.utime(stage_dir, (past, past))
+
+
+def test_expired_stage_removed_on_next_upload():
+    expired, fresh = _stage()['upload_id'], _stage()['upload_id']
+    _age(expired, TTL + 60)
+    _age(fresh, TTL - 60)
+
+    created = _stage()['upload_id']
+    with pytest.raises(LookupError):
+        get_stage(expired, 1)
+    assert get_stage(fresh, 1)['filename'] == 'points.csv'
+    assert get_stage(created, 1)['headers'] == ['name']
+
+
+def test_access_refreshes_ttl():
+    upload_id = _stage()['upload_id']
+    _age(upload_id, TTL + 60)
+    with open(get_stage(upload_id, 1)['path'], 'rb') as f:
+        assert f.read() == b'name\na\n'
+
+    assert collect_expired_stages() == 0
+    _age(upload_id, TTL + 60)
+    assert collect_expired_stages() == 1
+    with pytest.raises(LookupError):
+        get_stage(upload_id, 1)
+
+
+def test_stage_visible_only_to_owner():
+    upload_id = _stage(user_id=1)['upload_id']
+    with pytest.raises(LookupError):
+        get_stage(upload_id, 2)
+    with pytest.raises(LookupError):
+        get_stage('../' + upload_id, 1)
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+日志写入测试
+功能：确认日志文件整体载入时使用日志自身的时间戳，运行记录和分钟汇总不会落在文件修改时间上；
+删除运行记录时汇总和指纹只去掉该运行的计数，不影响复用同一 PID 的其他运行；分钟汇总跨批次累加；
+去重窗口的计数跨批次延续。
+各用例使用不同的 PID，互不影响共享的 DuckDB 库。
+"""
+
+import os
+from datetime import datetime
+
+import pytest
+
+import db_manager
+
+
+@pytest.fixture
+def duckdb_conn(app):
+    conn = db_manager.get_duckdb_connection()
+    yield conn
+    conn.close()
+
+
+def _write_log(tmp_path, lines, mtime=None):
+    path = tmp_path / 'telegraf.log'
+    path.write_text('\n'.join(lines) + '\n')
+    if mtime is not None:
+        os.utime(path, (mtime.timestamp(), mtime.timestamp()))
+    return str(path)
+
+
+def _timestamps(conn, pid):
+    return [row[0] for row in conn.execute(
+        "SELECT timestamp FROM telegraf_logs WHERE process_pid = ? ORDER BY timestamp", [pid]).fetchall()]
+
+
+def test_leading_untimestamped_lines_use_first_log_timestamp(duckdb_conn, tmp_path):
+    pid = 71001
+    path = _write_log(tmp_path, [
+        'starting telegraf',
+        '2026-01-01T00:00:05Z I! [agent] Loaded inputs: cpu',
+        '  continuation of the previous line',
+        '2026-01-01T00:01:30Z E! [inputs.cpu] collection failed',
+    ], mtime=datetime(2026, 10, 19, 12, 0))
+
+    assert db_manager.bulk_load_log_file(duckdb_conn, path, pid, 'telegraf_test', 'test.conf', 'archived') == 4
+
+    assert _timestamps(duckdb_conn, pid) == [datetime(2026, 1, 1, 0, 0, 5)] * 3 + [datetime(2026, 1, 1, 0, 1, 30)]
+    run = duckdb_conn.execute(
+        "SELECT start_time, last_seen, stop_time FROM process_runs WHERE process_pid = ?", [pid]).fetchall()
+    assert run == [(datetime(2026, 1, 1, 0, 0, 5), datetime(2026, 1, 1, 0, 1, 30), datetime(2026, 1, 1, 0, 1, 30))]
+    minutes = duckdb_conn.execute(
+        "SELECT minute, line_count FROM telegraf_log_rollups WHERE process_pid = ? ORDER BY minute", [pid]).fetchall()
+    assert minutes == [(datetime(2026, 1, 1, 0, 0), 3), (datetime(2026, 1, 1, 0, 1), 1)]
+
+
+def test_file_without_timestamps_uses_mtime(duckdb_conn, tmp_path):
+    pid = 71002
+    mtime = datetime(2026, 10, 19, 12, 0)
+    path = _write_log(tmp_path, ['no timestamp here', 'nor here'], mtime=mtime)
+
+    db_manager.bulk_load_log_file(duckdb_conn, path, pid, 'telegraf_test', 'test.conf', 'archived',
+                                  fallback_timestamp=mtime)
+
+    assert _timestamps(duckdb_conn, pid) == [mtime, mtime]
+
+
+def _load(conn, tmp_path, pid, name, lines):
+    path = tmp_path / name
+    path.write_text('\n'.join(lines) + '\n')
+    db_manager.bulk_load_log_file(conn, str(path), pid, 'telegraf_test', 'test.conf', 'archived')
+
+
+def _run_ids(conn, pid):
+    return [row[0] for row in conn.execute(
+        "SELECT id FROM process_runs WHERE process_pid = ? ORDER BY start_time", [pid]).fetchall()]
+
+
+def test_delete_run_keeps_counts_of_run_reusing_pid(duckdb_conn, tmp_path):
+    pid = 71101
+    # 两次运行使用同一 PID，且共享 00:05 这一分钟
+    _load(duckdb_conn, tmp_path, pid, 'run_a.log', [
+        '2026-02-01T00:00:10Z E! [inputs.cpu] only in run a',
+        '2026-02-01T00:05:30Z I! [agent] shared message 1',
+    ])
+    _load(duckdb_conn, tmp_path, pid, 'run_b.log', [
+        '2026-02-01T00:05:50Z I! [agent] shared message 2',
+        '2026-02-01T00:07:00Z W! [agent] only in run b',
+    ])
+    run_a, run_b = _run_ids(duckdb_conn, pid)
+
+    assert db_manager.delete_process_runs([run_a]) == {'success': True, 'deleted': 1}
+
+    assert _run_ids(duckdb_conn, pid) == [run_b]
+    assert duckdb_conn.execute(
+        "SELECT minute, line_count, info_count FROM telegraf_log_rollups WHERE process_pid = ? ORDER BY minute", [pid]
+    ).fetchall() == [(datetime(2026, 2, 1, 0, 5), 1, 1), (datetime(2026, 2, 1, 0, 7), 1, 0)]
+    assert duckdb_conn.execute(
+        "SELECT level, occurrences, first_seen, last_seen FROM telegraf_log_fingerprints WHERE process_pid = ? "
+        "ORDER BY level", [pid]
+    ).fetchall() == [('I', 1, datetime(2026, 2, 1, 0, 5, 50), datetime(2026, 2, 1, 0, 5, 50)),
+                     ('W', 1, datetime(2026, 2, 1, 0, 7), datetime(2026, 2, 1, 0, 7))]
+
+    assert db_manager.delete_process_runs([run_b])['success']
+    for table in ('telegraf_logs', 'telegraf_log_rollups', 'telegraf_log_fingerprints'):
+        assert duckdb_conn.execute(f"SELECT count(*) FROM {table} WHERE process_pid = ?", [pid]).fetchone()[0] == 0
+
+
+def _batch(pid, lines):
+    return [(None, pid, 'telegraf_test', 'test.conf', 'stdout', line) for line in lines]
+
+
+def test_rollups_accumulate_across_batches(duckdb_conn):
+    pid = 71201
+    db_manager.insert_log_batch(duckdb_conn, _batch(pid, [
+        '2026-03-01T10:00:01Z E! [inputs.opcua] read failed',
+        '2026-03-01T10:00:20Z I! [agent] tick',
+    ]))
+    db_manager.insert_log_batch(duckdb_conn, _batch(pid, [
+        '2026-03-01T10:00:40Z W! [inputs.opcua] slow read',
+        '2026-03-01T10:01:05Z E! [inputs.opcua] read failed',
+        '2026-03-01T10:01:06Z D! [agent] debug',
+    ]))
+
+    rates = db_manager.get_log_rates(datetime(2026, 3, 1, 10, 0), process_pid=pid, include_series=True)
+    assert rates['success']
+    [totals] = rates['processes']
+    assert (totals['errors'], totals['warnings'], totals['infos'], totals['debugs'], totals['lines']) == (2, 1, 1, 1, 5)
+    assert [(row['minute'], row['errors'], row['warnings'], row['lines']) for row in rates['series']] == [
+        ('2026-03-01T10:00:00', 1, 1, 3), ('2026-03-01T10:01:00', 1, 0, 2)]
+    # 从汇总表查询，与逐行统计结果一致
+    assert duckdb_conn.execute(
+        "SELECT count(*) FILTER (WHERE level = 'E'), count(*) FROM telegraf_logs WHERE process_pid = ?", [pid]
+    ).fetchone() == (2, 5)
+
+
+def test_fingerprint_window_carries_across_batches(duckdb_conn, monkeypatch):
+    monkeypatch.setattr(db_manager, 'LOG_DEDUP_MAX_PER_WINDOW', 2)
+    pid = 71202
+    message = '2026-03-01T10:0{}:0{}Z E! [inputs.opcua] connect to 10.0.0.{}:4840 failed after {} retries'
+    # 同一窗口（默认 300 秒）内先写 3 行、再写 2 行，只保存前 2 行；下一个窗口重新计数
+    db_manager.insert_log_batch(duckdb_conn, _batch(pid, [message.format(0, i, i, i) for i in range(1, 4)]))
+    db_manager.insert_log_batch(duckdb_conn, _batch(pid, [message.format(1, i, i, i) for i in range(1, 3)]))
+    db_manager.insert_log_batch(duckdb_conn, _batch(pid, [message.format(6, 1, 9, 9)]))
+
+    [fingerprint] = duckdb_conn.execute(
+        "SELECT occurrences, suppressed_count, first_seen, last_seen, window_count, sample "
+        "FROM telegraf_log_fingerprints WHERE process_pid = ?", [pid]).fetchall()
+    assert fingerprint == (6, 3, datetime(2026, 3, 1, 10, 0, 1), datetime(2026, 3, 1, 10, 6, 1), 1,
+                           message.format(0, 1, 1, 1))
+    assert duckdb_conn.execute("SELECT count(*) FROM telegraf_logs WHERE process_pid = ?", [pid]).fetchone()[0] == 3
+    # 汇总表按全部行计数，不受去重影响
+    assert duckdb_conn.execute(
+        "SELECT sum(error_count) FROM telegraf_log_rollups WHERE process_pid = ?", [pid]).fetchone()[0] == 6
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+旧版日志表迁移测试
+功能：在单独的 DuckDB 文件中按旧版结构（每行保存名称字符串）写入日志，执行 init_duckdb 后确认：
+PID 复用时按启动消息、进程名变化和长时间间隔拆分运行记录，日志关联到正确的运行，名称只在 log_sources 中保存一次，
+级别从消息中解析并回填到分钟汇总。
+"""
+
+from datetime import datetime, timedelta
+
+import duckdb
+import pytest
+
+import db_manager
+
+LEGACY_SCHEMA = """
+    CREATE TABLE telegraf_logs (
+        timestamp TIMESTAMP, process_pid INTEGER, process_name VARCHAR,
+        config_file VARCHAR, log_type VARCHAR, message VARCHAR
+    )
+"""
+
+START = datetime(2026, 4, 1, 10, 0)
+
+
+def _row(minutes, message, pid=500, name='telegraf_a'):
+    timestamp = START + timedelta(minutes=minutes)
+    return (timestamp, pid, name, f'/etc/telegraf/{name}.conf', 'stdout',
+            f"{timestamp.isoformat()}Z {message}")
+
+
+LEGACY_ROWS = [
+    _row(0, 'I! Starting Telegraf 1.30'),
+    _row(1, 'E! [inputs.opcua] read failed'),
+    _row(5, 'W! [inputs.opcua] slow read'),
+    # 同一 PID 再次出现启动消息：新的运行
+    _row(10, 'I! Starting Telegraf 1.30'),
+    _row(11, 'E! [inputs.opcua] read failed'),
+    # 超过 LOG_RUN_GAP_SECONDS（默认 1 小时）的间隔：新的运行
+    _row(120, 'I! [agent] tick'),
+    # 进程名变化：新的运行
+    _row(121, 'I! [agent] tick', name='telegraf_b'),
+]
+
+
+@pytest.fixture
+def legacy_db(tmp_path, monkeypatch):
+    path = str(tmp_path / 'legacy.duckdb')
+    conn = duckdb.connect(path)
+    conn.execute(LEGACY_SCHEMA)
+    conn.executemany("INSERT INTO telegraf_logs VALUES (?, ?, ?, ?, ?, ?)", LEGACY_ROWS)
+    conn.close()
+    monkeypatch.setattr(db_manager, 'DUCKDB_PATH', path)
+    db_manager.init_duckdb()
+    conn = db_manager.get_duckdb_connection()
+    yield conn
+    conn.close()
+
+
+def test_legacy_logs_split_into_runs_on_pid_reuse(legacy_db):
+    runs = legacy_db.execute(
+        "SELECT id, start_time, stop_time, process_name, log_count, status FROM process_runs ORDER BY start_time"
+    ).fetchall()
+    assert [(start, stop, name, count, status) for _, start, stop, name, count, status in runs] == [
+        (START, START + timedelta(minutes=5), 'telegraf_a', 3, 'stopped'),
+        (START + timedelta(minutes=10), START + timedelta(minutes=11), 'telegraf_a', 2, 'stopped'),
+        (START + timedelta(minutes=120), START + timedelta(minutes=120), 'telegraf_a', 1, 'stopped'),
+        (START + timedelta(minutes=121), START + timedelta(minutes=121), 'telegraf_b', 1, 'stopped'),
+    ]
+
+    run_ids = [run[0] for run in runs]
+    per_run = dict(legacy_db.execute("SELECT run_id, count(*) FROM telegraf_logs GROUP BY run_id").fetchall())
+    assert [per_run.get(run_id) for run_id in run_ids] == [3, 2, 1, 1]
+
+
+def test_legacy_logs_are_dictionary_encoded_and_rolled_up(legacy_db):
+    columns = [row[0] for row in legacy_db.execute(
+        "SELECT column_name FROM information_schema.columns WHERE table_name = 'telegraf_logs'").fetchall()]
+    assert 'process_name' not in columns and 'config_file' not in columns
+    assert legacy_db.execute("SELECT count(*) FROM log_sources").fetchone()[0] == 2
+    assert legacy_db.execute(
+        "SELECT count(*) FILTER (WHERE process_name = 'telegraf_b'), count(*) FROM telegraf_logs_expanded"
+    ).fetchone() == (1, len(LEGACY_ROWS))
+
+    assert legacy_db.execute(
+        "SELECT level::VARCHAR, plugin FROM telegraf_logs WHERE message LIKE '%read failed' ORDER BY timestamp"
+    ).fetchall() == [('E', 'inputs.opcua')] * 2
+    assert legacy_db.execute(
+        "SELECT sum(error_count), sum(warn_count), sum(line_count) FROM telegraf_log_rollups"
+    ).fetchone() == (2, 1, len(LEGACY_ROWS))
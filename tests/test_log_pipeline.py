@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+日志管道过载策略测试
+功能：不启动写入线程，直接向管道提交日志，确认各过载策略在队列超过高水位线和队列已满时的取舍，
+以及 E!/W! 日志从不丢弃、队列满时阻塞等待。
+"""
+
+import threading
+
+from log_pipeline import LogPipeline, _ProcessCounters
+
+PID = 4242
+
+
+def _pipeline(policy, max_queue=10, sample_rate=3):
+    pipeline = LogPipeline(max_queue=max_queue, policy=policy, sample_rate=sample_rate, high_watermark=0.5)
+    counters = _ProcessCounters(PID, 'telegraf_test', '/nonexistent/telegraf.log')
+    pipeline._processes[PID] = counters
+    return pipeline, counters
+
+
+def _submit(pipeline, counters, level, count=1):
+    for _ in range(count):
+        line = f'2026-01-01T00:00:00Z {level}! [agent] message'.encode()
+        pipeline._submit(counters, counters.bytes_read + len(line), line, PID, 'telegraf_test', 'test.conf', 'stdout')
+
+
+def _assert_blocks_until_space(pipeline, counters, level):
+    thread = threading.Thread(target=_submit, args=(pipeline, counters, level))
+    thread.start()
+    thread.join(0.2)
+    assert thread.is_alive()
+    pipeline._queue.get_nowait()
+    thread.join(2)
+    assert not thread.is_alive()
+    assert pipeline._queue.full()
+
+
+def test_drop_debug_first_drops_debug_above_watermark_and_info_when_full():
+    pipeline, counters = _pipeline('drop_debug_first')
+    _submit(pipeline, counters, 'D', 5)
+    assert pipeline._queue.qsize() == 5 and counters.lines_dropped == 0
+
+    _submit(pipeline, counters, 'D', 2)
+    assert counters.lines_dropped == 2
+    _submit(pipeline, counters, 'I', 7)
+    assert pipeline._queue.full()
+    assert counters.lines_dropped == 4
+    assert len(counters.pending) == pipeline._queue.qsize()
+
+    _assert_blocks_until_space(pipeline, counters, 'E')
+    assert pipeline.get_stats()['blocked_puts'] == 1
+
+
+def test_sample_keeps_one_in_n_above_watermark():
+    pipeline, counters = _pipeline('sample', max_queue=20)
+    _submit(pipeline, counters, 'W', 10)
+    _submit(pipeline, counters, 'I', 6)
+    _submit(pipeline, counters, 'E', 2)
+
+    stats = pipeline.get_stats()
+    assert stats['lines_sampled_out'] == 4
+    assert stats['queue_size'] == 10 + 2 + 2
+    assert stats['processes'][0]['lines_read'] == 18
+
+
+def test_block_never_drops():
+    pipeline, counters = _pipeline('block')
+    _submit(pipeline, counters, 'D', 10)
+    assert pipeline._queue.full()
+
+    _assert_blocks_until_space(pipeline, counters, 'D')
+    stats = pipeline.get_stats()
+    assert stats['lines_dropped'] == stats['lines_sampled_out'] == 0
+    assert stats['processes'][0]['lines_queued'] == 11
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+列表分页测试
+功能：确认键集分页按 (排序列, id) 逐页读取的结果与一次读取全部相同，包括排序列含 NULL 和重复值时；
+总数缓存在本进程写入相关表后失效。
+"""
+
+import pytest
+from sqlalchemy import insert
+
+from models import db, PointInfo
+from pagination import paginate_query
+
+BATCH = 'pagination_test'
+# (unit, point_comment)：unit 含 NULL 和重复值
+ROWS = [(None, 'c'), ('kPa', 'a'), (None, 'b'), ('bar', 'a'), ('kPa', None), ('bar', 'c'), (None, None)]
+
+
+@pytest.fixture(scope='module')
+def points(app):
+    with app.app_context():
+        db.session.execute(insert(PointInfo), [
+            {'measurement': f'pagination_{i}', 'unit': unit, 'point_comment': comment, 'import_batch': BATCH}
+            for i, (unit, comment) in enumerate(ROWS)
+        ])
+        db.session.commit()
+        return [(p.id, p.unit, p.point_comment) for p in PointInfo.query.filter_by(import_batch=BATCH)]
+
+
+def _page(app, **args):
+    with app.test_request_context(query_string=args):
+        return paginate_query(PointInfo.query.filter_by(import_batch=BATCH), PointInfo,
+                              serialize=lambda rows: [row.id for row in rows])
+
+
+def _keyset_ids(app, sort_by, sort_dir, per_page):
+    ids, cursor = [], ''
+    while True:
+        result = _page(app, sort_by=sort_by, sort_dir=sort_dir, per_page=per_page, cursor=cursor)
+        ids += result['items']
+        cursor = result['pagination']['next_cursor']
+        if cursor is None:
+            return ids
+
+
+def _expected(points, sort_by, descending):
+    # SQLite 中 NULL 小于任何值：升序在前、降序在后；id 为第二排序键
+    index = {'unit': 1, 'point_comment': 2}[sort_by]
+
+    def key(point):
+        value = point[index]
+        return (value is not None, value or '', point[0])
+    return [point[0] for point in sorted(points, key=key, reverse=descending)]
+
+
+@pytest.mark.parametrize('sort_by', ['unit', 'point_comment'])
+@pytest.mark.parametrize('sort_dir', ['asc', 'desc'])
+@pytest.mark.parametrize('per_page', [1, 2, 3])
+def test_keyset_pages_match_full_ordering(app, points, sort_by, sort_dir, per_page):
+    expected = _expected(points, sort_by, sort_dir == 'desc')
+    assert _page(app, sort_by=sort_by, sort_dir=sort_dir, per_page=-1)['items'] == expected
+    assert _keyset_ids(app, sort_by, sort_dir, per_page) == expected
+
+
+def test_cursor_bound_to_sort_column(app, points):
+    cursor = _page(app, sort_by='unit', per_page=2, cursor='')['pagination']['next_cursor']
+    with pytest.raises(ValueError):
+        _page(app, sort_by='point_comment', per_page=2, cursor=cursor)
+
+
+def test_count_cache_invalidated_by_writes(app, points):
+    assert _page(app, per_page=2)['pagination']['total'] == len(ROWS)
+    with app.app_context():
+        db.session.add(PointInfo(measurement='pagination_extra', import_batch=BATCH))
+        db.session.commit()
+        assert _page(app, per_page=2)['pagination']['total'] == len(ROWS) + 1
+        PointInfo.query.filter_by(measurement='pagination_extra').delete()
+        db.session.commit()
+    assert _page(app, per_page=2)['pagination']['total'] == len(ROWS)
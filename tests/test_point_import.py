@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+数据点导入测试
+功能：确认每次修改数据点都写入一条历史快照并把 current_version 加一，内容没有变化的导入不产生新版本；
+bulk_upsert_points 在 overwrite 和 skip 规则下的 created/updated/unchanged/skipped/errors 计数；
+import_points_file 分块读取 CSV 和 XLSX 时的计数和错误行号，preview_points_file 对整个文件的预测与实际导入一致；
+rollback_batch_points 删除批次创建的数据点，包括在同一批次后续块中再次导入（状态为 updated）的数据点。
+"""
+
+import openpyxl
+
+from models import db, PointInfo, PointInfoHistory
+from point_import import bulk_upsert_points, import_points_file, preview_points_file, rollback_batch_points
+
+BATCH = 'rollback_test'
+
+
+def test_rollback_deletes_points_reimported_in_same_batch(app):
+    with app.app_context():
+        bulk_upsert_points([(0, {'measurement': 'rollback_a'}), (1, {'measurement': 'rollback_b'})], batch_id=BATCH)
+        # 第二块再次导入 rollback_a：数据点状态变为 updated，历史中留下批次内 created 的快照
+        bulk_upsert_points([(0, {'measurement': 'rollback_a', 'point_comment': 'again'})], batch_id=BATCH)
+        point_ids = [p.id for p in PointInfo.query.filter_by(import_batch=BATCH)]
+        assert len(point_ids) == 2
+
+        result = rollback_batch_points(BATCH)
+        db.session.commit()
+
+        assert result['deleted'] == 2
+        assert PointInfo.query.filter(PointInfo.id.in_(point_ids)).count() == 0
+        assert PointInfoHistory.query.filter(PointInfoHistory.point_info_id.in_(point_ids)).count() == 0
+
+
+def _versions(measurement):
+    point = PointInfo.query.filter_by(measurement=measurement).one()
+    history = [(h.version, h.point_comment) for h in
+               PointInfoHistory.query.filter_by(point_info_id=point.id).order_by(PointInfoHistory.version)]
+    return point.current_version, point.point_comment, history
+
+
+def test_import_updates_increment_current_version(app):
+    with app.app_context():
+        bulk_upsert_points([(0, {'measurement': 'version_a', 'point_comment': 'v0'})], batch_id='version_1')
+        assert _versions('version_a') == (0, 'v0', [])
+
+        bulk_upsert_points([(0, {'measurement': 'version_a', 'point_comment': 'v1'})], batch_id='version_2')
+        bulk_upsert_points([(0, {'measurement': 'version_a', 'point_comment': 'v2'})], batch_id='version_3')
+        # 内容没有变化：不写入，也不产生新版本
+        summary = bulk_upsert_points([(0, {'measurement': 'version_a', 'point_comment': 'v2'})], batch_id='version_4')
+        assert summary['unchanged'] == 1
+        assert _versions('version_a') == (2, 'v2', [(1, 'v0'), (2, 'v1')])
+
+
+def test_bulk_operation_increments_current_version(app, client):
+    with app.app_context():
+        bulk_upsert_points([(0, {'measurement': 'version_b', 'point_comment': 'v0'}),
+                            (1, {'measurement': 'version_c', 'point_comment': 'v0'})], batch_id='version_5')
+        ids = [p.id for p in PointInfo.query.filter(PointInfo.measurement.in_(['version_b', 'version_c']))]
+
+    for fields in ({'point_comment': 'v1'}, {'point_comment': 'v2'}):
+        response = client.post('/api/point_info/bulk', json={'action': 'patch', 'ids': ids, 'fields': fields})
+        assert response.status_code == 200
+
+    with app.app_context():
+        for measurement in ('version_b', 'version_c'):
+            assert _versions(measurement) == (2, 'v2', [(1, 'v0'), (2, 'v1')])
+
+
+def _counts(summary):
+    return {name: summary[name] for name in ('total', 'created', 'updated', 'unchanged', 'skipped', 'errors')}
+
+
+def test_bulk_upsert_counts_overwrite(app):
+    records = [(0, {'measurement': 'count_a', 'point_comment': 'x'}),
+               (1, {'measurement': 'count_b'}),
+               # 同一次导入中重复的键合并到同一个数据点，计为 updated
+               (2, {'measurement': 'count_a', 'unit': 'kPa'}),
+               (3, {'point_comment': 'no key'})]
+    with app.app_context():
+        summary = bulk_upsert_points(records, batch_id='count_1')
+        assert _counts(summary) == {'total': 4, 'created': 2, 'updated': 1, 'unchanged': 0, 'skipped': 0, 'errors': 1}
+        assert [detail['index'] for detail in summary['error_details']] == [3]
+        point = PointInfo.query.filter_by(measurement='count_a').one()
+        assert (point.point_comment, point.unit) == ('x', 'kPa')
+
+        summary = bulk_upsert_points(records, batch_id='count_2')
+        assert _counts(summary) == {'total': 4, 'created': 0, 'updated': 0, 'unchanged': 3, 'skipped': 0, 'errors': 1}
+
+        summary = bulk_upsert_points([(0, {'measurement': 'count_a', 'unit': 'bar'}),
+                                      (1, {'measurement': 'count_b'}),
+                                      (2, {'measurement': 'count_c'})], batch_id='count_3')
+        assert _counts(summary) == {'total': 3, 'created': 1, 'updated': 1, 'unchanged': 1, 'skipped': 0, 'errors': 0}
+
+
+def test_bulk_upsert_counts_skip(app):
+    with app.app_context():
+        bulk_upsert_points([(0, {'measurement': 'count_skip_a', 'point_comment': 'old'})], batch_id='count_4')
+        summary = bulk_upsert_points([(0, {'measurement': 'count_skip_a', 'point_comment': 'new'}),
+                                      (1, {'measurement': 'count_skip_b'}),
+                                      (2, {'measurement': 'count_skip_b', 'point_comment': 'dup'}),
+                                      (3, {'measurement': ''})],
+                                     conflict_rule='skip', batch_id='count_5')
+        assert _counts(summary) == {'total': 4, 'created': 1, 'updated': 0, 'unchanged': 0, 'skipped': 2, 'errors': 1}
+        assert PointInfo.query.filter_by(measurement='count_skip_a').one().point_comment == 'old'
+        assert PointInfo.query.filter_by(measurement='count_skip_b').one().point_comment is None
+
+
+MAPPING = {'name': 'normalized_point_name', 'measurement': 'measurement', 'comment': 'point_comment',
+           'enabled': 'is_enabled'}
+
+CSV_TEXT = """name,measurement,comment,enabled,ignored
+csv_np_a,csv_a,c1,true,x
+csv_np_b,csv_b,c1,yes,x
+,csv_x,c1,true,x
+csv_np_c,csv_c,c1,maybe,x
+csv_np_a,,c2,,x
+csv_np_d,,c1,,x
+"""
+
+
+def test_import_csv_counts_across_chunks(app, tmp_path):
+    path = tmp_path / 'points.csv'
+    path.write_text(CSV_TEXT, encoding='utf-8')
+    with app.app_context():
+        # 每块 2 行：第 6 行的 csv_np_a 在第三块中更新第一块创建的数据点
+        summary = import_points_file(str(path), MAPPING, conflict_rule='overwrite', batch_id='csv_1', chunk_rows=2)
+        assert _counts(summary) == {'total': 6, 'created': 2, 'updated': 1, 'unchanged': 0, 'skipped': 0, 'errors': 3}
+        assert [(detail['index'], detail['error']) for detail in summary['error_details']] == [
+            (4, 'Unique key (normalized_point_name) is missing.'),
+            (5, 'Invalid is_enabled value.'),
+            (7, 'Missing required field: measurement'),
+        ]
+        point = PointInfo.query.filter_by(normalized_point_name='csv_np_a').one()
+        assert (point.measurement, point.point_comment, point.is_enabled) == ('csv_a', 'c2', True)
+
+        summary = import_points_file(str(path), MAPPING, conflict_rule='skip', batch_id='csv_2', chunk_rows=2)
+        assert _counts(summary) == {'total': 6, 'created': 0, 'updated': 0, 'unchanged': 0, 'skipped': 3, 'errors': 3}
+
+
+def test_preview_counts_whole_file(app, tmp_path):
+    path = tmp_path / 'preview.csv'
+    path.write_text(CSV_TEXT.replace('csv_', 'preview_'), encoding='utf-8')
+    with app.app_context():
+        # 每块 2 行：第 6 行的键在第一块中首次出现，预览为 overwrite 而不是 new
+        preview = preview_points_file(str(path), MAPPING, conflict_rule='overwrite', chunk_rows=2, sample_size=2)
+        assert preview['total_rows'] == 6
+        assert preview['summary'] == {'new': 2, 'overwrite': 1, 'skip': 0, 'error': 3}
+        assert [row['_row'] for row in preview['preview_data']] == [2, 3, 4, 5, 6]
+        assert [(row['_row'], row['_status']) for row in preview['conflicts']] == [(6, 'overwrite')]
+        assert [(row['_row'], row['_error']) for row in preview['errors']] == [
+            (4, 'Unique key (normalized_point_name) is missing.'),
+            (5, 'Invalid is_enabled value.'),
+        ]
+        assert PointInfo.query.filter(PointInfo.measurement.like('preview_%')).count() == 0
+
+        summary = import_points_file(str(path), MAPPING, conflict_rule='overwrite', batch_id='preview_1', chunk_rows=2)
+        assert (summary['created'], summary['updated'] + summary['unchanged'], summary['errors']) == (2, 1, 3)
+
+        preview = preview_points_file(str(path), MAPPING, conflict_rule='skip', chunk_rows=2)
+        assert preview['summary'] == {'new': 0, 'overwrite': 0, 'skip': 3, 'error': 3}
+
+
+def _write_workbook(path):
+    workbook = openpyxl.Workbook()
+    first = workbook.active
+    first.title = 'area1'
+    first.append(['name', 'measurement', 'comment', 'enabled'])
+    first.append(['xlsx_np_a', 'xlsx_a', 'c1', True])
+    first.append([None, None, None, None])
+    first.append(['xlsx_np_b', 'xlsx_b', 'c1', 'maybe'])
+    first.append(['xlsx_np_c', 'xlsx_c', 1.0, False])
+    notes = workbook.create_sheet('notes')
+    notes.append(['remark'])
+    notes.append(['no key column'])
+    second = workbook.create_sheet('area2')
+    second.append(['measurement', 'name', 'comment'])
+    second.append(['xlsx_a', 'xlsx_np_a', 'c2'])
+    second.append(['xlsx_d', None, 'c1'])
+    workbook.save(path)
+
+
+def test_import_xlsx_counts_across_sheets(app, tmp_path):
+    path = tmp_path / 'points.xlsx'
+    _write_workbook(path)
+    with app.app_context():
+        summary = import_points_file(str(path), MAPPING, conflict_rule='overwrite', batch_id='xlsx_1',
+                                     chunk_rows=2, file_format='xlsx')
+        # 空行不计入 total；area2 第 2 行更新 area1 创建的数据点
+        assert _counts(summary) == {'total': 5, 'created': 2, 'updated': 1, 'unchanged': 0, 'skipped': 0, 'errors': 2}
+        assert summary['skipped_sheets'] == ['notes']
+        assert [(detail['sheet'], detail['index'], detail['error']) for detail in summary['error_details']] == [
+            ('area1', 4, 'Invalid is_enabled value.'),
+            ('area2', 3, 'Unique key (normalized_point_name) is missing.'),
+        ]
+        point = PointInfo.query.filter_by(normalized_point_name='xlsx_np_c').one()
+        assert (point.point_comment, point.is_enabled) == ('1', False)
+        assert PointInfo.query.filter_by(normalized_point_name='xlsx_np_a').one().point_comment == 'c2'
+
+        summary = import_points_file(str(path), MAPPING, conflict_rule='overwrite', batch_id='xlsx_2',
+                                     chunk_rows=2, file_format='xlsx', sheets=['area2'])
+        assert _counts(summary) == {'total': 2, 'created': 0, 'updated': 0, 'unchanged': 1, 'skipped': 0, 'errors': 1}
+        assert summary['skipped_sheets'] == []
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+全文检索索引测试
+功能：确认不经过迁移（reinitialize_database 的 db.create_all()）建出的库与迁移后的库有相同的索引表和触发器，
+并且批量插入时延迟维护的索引能被搜索到。
+"""
+
+from flask import Flask
+from sqlalchemy import text
+
+from db_manager import DatabaseManager
+from models import db, PointInfo
+from point_search import apply_point_search, deferred_point_search_inserts
+
+FTS_OBJECTS = "SELECT type, name FROM sqlite_master WHERE name LIKE '%fts%' ORDER BY type, name"
+
+
+def _reinitialized_app(tmp_path):
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'reinit.db'}",
+                      SQLALCHEMY_TRACK_MODIFICATIONS=False)
+    db.init_app(app)
+    manager = DatabaseManager(app)
+    manager.db_file = str(tmp_path / 'reinit.db')
+    manager.backup_dir = str(tmp_path / 'backups')
+    result = manager.reinitialize_database(create_admin=False)
+    assert result['success'], result['message']
+    return app
+
+
+def test_reinitialized_database_matches_migrated_search_schema(app, tmp_path):
+    with app.app_context():
+        migrated = db.session.execute(text(FTS_OBJECTS)).all()
+    reinitialized_app = _reinitialized_app(tmp_path)
+    with reinitialized_app.app_context():
+        reinitialized = db.session.execute(text(FTS_OBJECTS)).all()
+    assert reinitialized == migrated
+
+
+def test_deferred_inserts_are_searchable_after_reinitialize(tmp_path):
+    reinitialized_app = _reinitialized_app(tmp_path)
+    with reinitialized_app.app_context():
+        connection = db.session.connection()
+        with deferred_point_search_inserts(connection):
+            connection.exec_driver_sql(
+                "INSERT INTO point_info (measurement, normalized_point_name, tags, fields, timestamp, data_source, "
+                "is_enabled, is_locked, created_at, current_version) "
+                "VALUES ('boiler_pressure', 'boiler_pressure_1', '{}', '{}', '2026-01-01', 'opcua', 1, 0, '2026-01-01', 0)")
+        db.session.commit()
+        # 插入触发器已恢复，逐行写入的数据点同样进入索引
+        db.session.add(PointInfo(measurement='boiler_level', normalized_point_name='boiler_level_1'))
+        db.session.commit()
+
+        query, rank = apply_point_search(PointInfo.query, 'boiler')
+        assert rank is not None
+        assert sorted(p.measurement for p in query) == ['boiler_level', 'boiler_pressure']
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""
+列表接口查询次数测试
+功能：统计一次请求执行的 SQL 语句数，确认每页 10 行和 100 行时相同，即序列化不会逐行触发延迟加载 (N+1)。
+"""
+
+import pytest
+
+# (请求地址模板, 返回数据所在的键)；{size} 为每页行数
+LIST_ENDPOINTS = [
+    ('/api/point_info?per_page={size}', 'items'),
+    ('/api/config_files?start=0&length={size}', 'data'),
+    ('/api/processes/managed?start=0&length={size}', 'data'),
+]
+
+
+def _rows(response, key):
+    assert response.status_code == 200
+    body = response.get_json()
+    return body[key]
+
+
+@pytest.mark.parametrize('url, key', LIST_ENDPOINTS)
+def test_query_count_is_constant_per_page(client, statements, url, key):
+    # 先请求一次，使总数缓存等进程内状态在两次计数时一致
+    _rows(client.get(url.format(size=10)), key)
+
+    counts = {}
+    for size in (10, 100):
+        statements.clear()
+        rows = _rows(client.get(url.format(size=size)), key)
+        assert len(rows) == size
+        counts[size] = len(statements)
+    assert counts[10] == counts[100], f"{url}: {counts}"
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+查询计划回归测试
+功能：对列表、搜索、历史等热点接口实际执行的 SQL 运行 EXPLAIN QUERY PLAN，
+确认使用了迁移 cdb8529d4973 添加的索引，且没有退化为 point_info / point_info_history 全表扫描或临时排序。
+
+不带过滤条件的第一页（按主键顺序读取 LIMIT 行）和总数统计（由 pagination 缓存）本身就需要遍历，不在检查范围内；
+翻页一律通过游标取下一页，与前端的键集分页一致。
+"""
+
+import re
+
+import pytest
+
+from api_utils import encode_cursor
+from models import db, ConfigFile, TelegrafProcess
+from point_import import _existing_query, rollback_batch_points
+from conftest import IMPORT_BATCH
+
+FULL_SCAN = re.compile(r'SCAN (point_info|point_info_history)\b')
+TEMP_SORT = 'USE TEMP B-TREE FOR ORDER BY'
+
+
+def _explain(statements):
+    """对记录的 SQL 逐条执行 EXPLAIN QUERY PLAN，返回 [(SQL, [计划步骤, ...])]"""
+    recorded = [(sql, params) for sql, params in statements
+                if sql.lstrip().upper().startswith(('SELECT', 'INSERT', 'UPDATE', 'DELETE'))]
+    connection = db.session.connection()
+    return [(sql, [row[3] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", params)])
+            for sql, params in recorded]
+
+
+def _assert_plans(plans, expected_index, allow_sort=False):
+    assert plans, "no statements were recorded"
+    for sql, steps in plans:
+        for step in steps:
+            assert not FULL_SCAN.match(step), f"full table scan '{step}' in:\n{sql}"
+            if not allow_sort:
+                assert TEMP_SORT not in step, f"'{step}' in:\n{sql}"
+    used = [step for _, steps in plans for step in steps if expected_index in step]
+    assert used, f"{expected_index} not used; plans: {[steps for _, steps in plans]}"
+
+
+# (请求地址, 期望使用的索引)；地址含 cursor= 时先取第一页，再检查用 next_cursor 取下一页的查询
+ROUTE_QUERIES = [
+    ('/api/point_info?cursor=&per_page=20', 'INTEGER PRIMARY KEY'),
+    ('/api/point_info?cursor=&per_page=20&sort_by=measurement&sort_dir=desc', 'ix_point_info_measurement'),
+    ('/api/point_info?cursor=&per_page=20&sort_by=normalized_point_name', 'ix_point_info_normalized_point_name'),
+    (f'/api/point_info?import_batch={IMPORT_BATCH}', 'ix_point_info_import_batch'),
+    (f'/api/point_info?import_batch={IMPORT_BATCH}&cursor=&per_page=20', 'ix_point_info_import_batch'),
+    ('/api/point_info?config_file_id=3', 'ix_point_info_config_file_id'),
+    ('/api/point_info?unlinked_only=true&page=2', 'ix_point_info_config_file_id'),
+    ('/api/point_info/500/history', 'uq_point_info_history_point_version'),
+    ('/api/config_files', 'ix_point_info_config_file_id'),
+    ('/api/config_files/telegraf_3.conf/versions', 'uq_config_files_file_name_version'),
+]
+
+
+@pytest.mark.parametrize('url, expected_index', ROUTE_QUERIES)
+def test_route_query_plans(app, client, statements, url, expected_index):
+    if 'cursor=' in url:
+        first = client.get(url)
+        assert first.status_code == 200
+        next_cursor = first.get_json()['pagination']['next_cursor']
+        assert next_cursor
+        url = url.replace('cursor=', f'cursor={next_cursor}')
+    statements.clear()
+    response = client.get(url)
+    assert response.status_code == 200
+    with app.app_context():
+        _assert_plans(_explain(statements), expected_index)
+
+
+@pytest.mark.parametrize('last_value, sort_dir', [(None, 'asc'), (None, 'desc'), ('area3_tag3', 'desc')])
+def test_nullable_sort_cursor_query_plans(app, client, statements, last_value, sort_dir):
+    # 游标位于 NULL 段，或降序翻页后还要读取排在最后的 NULL 段：每段都应按索引定位，而不是从索引一端逐行过滤
+    cursor = encode_cursor(['normalized_point_name', last_value, 1])
+    response = client.get(f'/api/point_info?sort_by=normalized_point_name&sort_dir={sort_dir}'
+                          f'&per_page=20&cursor={cursor}')
+    assert response.status_code == 200
+    with app.app_context():
+        plans = _explain(statements)
+        _assert_plans(plans, 'ix_point_info_normalized_point_name')
+        steps = [step for _, steps in plans for step in steps if 'ix_point_info_normalized_point_name' in step]
+        assert all(step.startswith('SEARCH') for step in steps), steps
+
+
+def test_search_query_plan(app, client, statements):
+    # 全文检索从 point_info_fts 取匹配行再按主键回表；按 bm25 相关度排序只能对匹配行排序，允许临时排序
+    response = client.get('/api/point_info?search=tag123&per_page=20')
+    assert response.status_code == 200
+    assert response.get_json()['items']
+    with app.app_context():
+        plans = _explain(statements)
+        _assert_plans(plans, 'point_info_fts', allow_sort=True)
+        assert any('SEARCH point_info USING INTEGER PRIMARY KEY' in step for _, steps in plans for step in steps)
+
+
+def test_import_lookup_query_plans(app, statements):
+    # 导入时按键列批量查找已有数据点；结果按 id 排序只涉及匹配到的行
+    with app.app_context():
+        db.session.execute(_existing_query('measurement', ['area3_temperature_3', 'area4_temperature_4'])).all()
+        _assert_plans(_explain(statements), 'ix_point_info_measurement', allow_sort=True)
+        statements.clear()
+        db.session.execute(_existing_query('normalized_point_name', ['area3_tag3'])).all()
+        _assert_plans(_explain(statements), 'ix_point_info_normalized_point_name', allow_sort=True)
+
+
+@pytest.mark.parametrize('lookup, expected_index', [
+    (lambda: ConfigFile.query.filter_by(file_name='telegraf_3.conf', is_active=True).first(),
+     'ix_config_files_file_name_is_active'),
+    (lambda: TelegrafProcess.query.filter_by(pid=100004).first(), 'ix_telegraf_processes_pid'),
+    (lambda: TelegrafProcess.query.filter_by(config_file_id=3, status='running').first(),
+     'ix_telegraf_processes_config_file_id'),
+])
+def test_lookup_query_plans(app, statements, lookup, expected_index):
+    with app.app_context():
+        lookup()
+        _assert_plans(_explain(statements), expected_index)
+
+
+def test_rollback_query_plans(app, statements):
+    with app.app_context():
+        try:
+            rollback_batch_points(IMPORT_BATCH)
+            plans = _explain(statements)
+        finally:
+            db.session.rollback()
+        _assert_plans(plans, 'ix_point_info_import_batch')
+        _assert_plans(plans, 'uq_point_info_history_point_version')